@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MLS Deeplink pipeline benchmarks
+================================
+Times each stage on synthetic canvases (benchmarks/synthetic_canvas.py) and
+records peak traced memory per stage:
+
+  parse_canvas, load_hero_maps (full / streaming), build_rows_from_scrapeonly,
+  write_m3u, write_xmltv, and canvas JSON load / dump (compact, pretty) with
+  the active mls_json backend next to stdlib json
+
+Timing passes run without tracemalloc (best of --repeat); a separate traced
+pass measures peak memory. Results go to a JSON file keyed by git commit so
+runs can be diffed before rolling out a new image:
+
+    python3 benchmarks/bench_pipeline.py --sizes 100 1000 10000 --out bench_results.json
+"""
+
+import sys, io, json, time, argparse, platform, subprocess, tempfile, tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import scrape_mls_schedule as scraper
+import export_mls_outputs as exporter
+import mls_json
+from synthetic_canvas import make_canvas
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return ""
+
+
+def _measure(fn: Callable[[], object], repeat: int, reset: Callable[[], None] = lambda: None) -> Dict:
+    best = None
+    for _ in range(max(1, repeat)):
+        reset()
+        with redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter(); fn(); dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    reset()
+    tracemalloc.start()
+    try:
+        with redirect_stdout(io.StringIO()):
+            fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": round(best, 6), "peak_bytes": peak}
+
+
+def bench_size(n_events: int, repeat: int, workdir: Path) -> Dict:
+    canvas = make_canvas(n_events)
+    raw_path = workdir / "raw_canvas.json"
+    raw_path.write_text(json.dumps(canvas, indent=2, ensure_ascii=False), encoding="utf-8")
+    m3u_path = workdir / "mls.m3u"; xml_path = workdir / "guide.xml"
+    client = scraper.MLSAPIClient()
+
+    def _unlink(*paths):
+        def reset():
+            for p in paths:
+                try: p.unlink()
+                except OSError: pass
+        return reset
+
+    raw_bytes = raw_path.read_bytes()
+    matches = client.parse_canvas(canvas)
+    hero_by_umc, hero_by_title = exporter.load_hero_maps(raw_path)
+    summaries, _ = exporter.build_rows_from_scrapeonly(matches, hero_by_umc, hero_by_title)
+
+    stages = {
+        "parse_canvas": _measure(lambda: client.parse_canvas(canvas), repeat),
+        "load_hero_maps": _measure(lambda: exporter.load_hero_maps(raw_path), repeat),
+        "load_hero_maps_stream": _measure(lambda: exporter.load_hero_maps(raw_path, streaming=True), repeat),
+        "build_rows_from_scrapeonly": _measure(
+            lambda: exporter.build_rows_from_scrapeonly(matches, hero_by_umc, hero_by_title), repeat),
+        "write_m3u": _measure(lambda: exporter.write_m3u(summaries, m3u_path, "MLS", 9910), repeat, _unlink(m3u_path)),
+        "write_xmltv": _measure(lambda: exporter.write_xmltv(summaries, xml_path, 9910, "MLS"), repeat, _unlink(xml_path)),
+        f"json_loads[{mls_json.BACKEND}]": _measure(lambda: mls_json.loads(raw_bytes), repeat),
+        f"json_dumps_compact[{mls_json.BACKEND}]": _measure(lambda: mls_json.dumps(canvas), repeat),
+        f"json_dumps_pretty[{mls_json.BACKEND}]": _measure(lambda: mls_json.dumps(canvas, pretty=True), repeat),
+        "json_loads[stdlib]": _measure(lambda: json.loads(raw_bytes), repeat),
+        "json_dumps_pretty[stdlib]": _measure(lambda: json.dumps(canvas, indent=2, ensure_ascii=False), repeat),
+    }
+    return {
+        "events": n_events,
+        "canvas_bytes": raw_path.stat().st_size,
+        "canvas_bytes_compact": len(mls_json.dumps(canvas)),
+        "matches": len(matches),
+        "summaries": len(summaries),
+        "hero_entries": len(hero_by_umc),
+        "guide_bytes": xml_path.stat().st_size if xml_path.exists() else 0,
+        "stages": stages,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark MLS pipeline stages on synthetic canvases")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    ap.add_argument("--repeat", type=int, default=3, help="Timing passes per stage (best is kept)")
+    ap.add_argument("--out", default="bench_results.json", help="Machine-readable results file")
+    args = ap.parse_args()
+
+    results: List[Dict] = []
+    with tempfile.TemporaryDirectory(prefix="mls-bench-") as tmp:
+        for n in args.sizes:
+            r = bench_size(n, args.repeat, Path(tmp))
+            results.append(r)
+            print(f"events={n:>6}  canvas={r['canvas_bytes'] / 1e6:7.2f} MB (compact {r['canvas_bytes_compact'] / 1e6:.2f} MB)"
+                  f"  summaries={r['summaries']}")
+            for stage, m in r["stages"].items():
+                print(f"    {stage:<28} {m['seconds'] * 1000:10.1f} ms   peak {m['peak_bytes'] / 1e6:8.2f} MB")
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"📝 wrote benchmark results: {Path(args.out).resolve()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synthetic Apple TV channel canvas generator (benchmarks / offline testing).
+
+Produces the same shape MLSAPIClient.get_channel_canvas returns:
+data.canvas.shelves[].items[] with SportingEvent items carrying nested
+images, competitors (with logos), playables (with the contentImage
+composite) and heroDescription nodes, plus a hero shelf like Apple's.
+
+    python3 benchmarks/synthetic_canvas.py --events 5000 > canvas.json
+"""
+
+import sys, json, random, argparse
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List
+
+TEAMS = [
+    ("Atlanta United", "ATL"), ("Austin FC", "ATX"), ("Charlotte FC", "CLT"), ("Chicago Fire FC", "CHI"),
+    ("FC Cincinnati", "CIN"), ("Colorado Rapids", "COL"), ("Columbus Crew", "CLB"), ("D.C. United", "DC"),
+    ("FC Dallas", "DAL"), ("Houston Dynamo FC", "HOU"), ("Inter Miami CF", "MIA"), ("LA Galaxy", "LA"),
+    ("LAFC", "LAFC"), ("Minnesota United", "MIN"), ("CF Montréal", "MTL"), ("Nashville SC", "NSH"),
+    ("New England Revolution", "NE"), ("New York City FC", "NYC"), ("New York Red Bulls", "RBNY"),
+    ("Orlando City", "ORL"), ("Philadelphia Union", "PHI"), ("Portland Timbers", "POR"),
+    ("Real Salt Lake", "RSL"), ("San Diego FC", "SD"), ("San Jose Earthquakes", "SJ"),
+    ("Seattle Sounders FC", "SEA"), ("Sporting Kansas City", "SKC"), ("St. Louis CITY SC", "STL"),
+    ("Toronto FC", "TOR"), ("Vancouver Whitecaps FC", "VAN"),
+]
+AIRING = ["Live", "Live", "Live", "Upcoming", "Future", "Past"]
+IMG = "https://is1-ssl.mzstatic.com/image/thumb/{path}/{{w}}x{{h}}{suffix}.{{f}}"
+
+
+def _image(rng: random.Random, suffix: str = "") -> Dict:
+    path = f"Features{rng.randint(100, 999)}/v4/{rng.getrandbits(64):016x}"
+    return {"url": IMG.format(path=path, suffix=suffix), "width": 1920, "height": 1080,
+            "bgColor": f"{rng.getrandbits(24):06x}", "supportsLayeredImage": False}
+
+
+def _team(rng: random.Random, name: str, abbr: str, idx: int) -> Dict:
+    return {"id": f"umc.cst.{idx:08d}", "name": name, "abbreviation": abbr,
+            "images": {"logo": _image(rng), "teamLogo": _image(rng)}}
+
+
+def make_event(rng: random.Random, i: int, base: datetime) -> Dict:
+    (home, habbr), (away, aabbr) = rng.sample(TEAMS, 2)
+    kickoff = base + timedelta(minutes=30 * rng.randint(-96, 4000))
+    title = f"{away} vs. {home}" if rng.random() < 0.7 else f"{away} at {home}"
+    event_id = f"umc.cse.{i:06d}{rng.getrandbits(24):06x}"
+    slug = title.lower().replace(" ", "-").replace(".", "")
+    item = {
+        "type": "SportingEvent",
+        "id": event_id,
+        "title": title,
+        "shortTitle": f"{aabbr} @ {habbr}",
+        "leagueName": "Major League Soccer",
+        "leagueAbbreviation": "MLS",
+        "sportName": "Soccer",
+        "venueName": f"{home} Stadium",
+        "url": f"/us/sporting-event/{slug}/{event_id}",
+        "airingType": rng.choice(AIRING),
+        "badge": "LIVE" if rng.random() < 0.3 else None,
+        "eventTime": kickoff.isoformat().replace("+00:00", "Z"),
+        "endAirTime": (kickoff + timedelta(minutes=rng.choice([110, 120, 135]))).isoformat().replace("+00:00", "Z"),
+        "images": {"contentLogo": _image(rng), "shelfItemImage": _image(rng), "coverArt16X9": _image(rng)},
+        "competitors": [_team(rng, home, habbr, 2 * i), _team(rng, away, aabbr, 2 * i + 1)],
+        "playables": [{
+            "id": f"tvs.sbd.7000:{event_id}:{rng.getrandbits(32):08x}",
+            "type": "SportingEvent",
+            "images": {"previewFrame": _image(rng)},
+            "canonicalMetadata": {"images": {"contentImage": _image(rng, "Sports.TVAPrM04")}},
+        }],
+    }
+    if rng.random() < 0.15:
+        item["heroDescription"] = f"{away} visit {home} in a matchday {i % 34 + 1} clash."
+    return item
+
+
+def make_canvas(n_events: int, seed: int = 7, shelf_size: int = 40) -> Dict:
+    rng = random.Random(seed)
+    base = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    events = [make_event(rng, i, base) for i in range(n_events)]
+    shelves: List[Dict] = []
+    for k in range(0, len(events), shelf_size):
+        chunk = events[k:k + shelf_size]
+        # Apple repeats some events across shelves ("Live Now", "Upcoming", ...)
+        if k and rng.random() < 0.3:
+            chunk = chunk + events[k - 3:k]
+        shelves.append({"id": f"edt.shelf.{k // shelf_size:05d}", "title": f"Matchday {k // shelf_size + 1}", "items": chunk})
+    heroes = [
+        {"type": "Hero", "id": f"hero.{e['id']}", "title": e["title"].replace(" vs. ", " vs "),
+         "url": f"https://tv.apple.com{e['url']}", "heroDescription": f"Hero: {e['title']} — don't miss it.",
+         "images": {"heroImage": _image(rng)}}
+        for e in rng.sample(events, k=max(1, n_events // 10))
+    ]
+    shelves.insert(0, {"id": "edt.shelf.hero", "title": "Featured", "items": heroes})
+    return {"data": {"canvas": {"id": "tvs.sbd.7000", "shelves": shelves}}}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate a synthetic Apple TV MLS canvas")
+    ap.add_argument("--events", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+    json.dump(make_canvas(args.events, args.seed), sys.stdout, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,8 +19,24 @@ if [ ! -f "$TEMPLATE" ]; then
   sleep 5; exit 1
 fi
 
+# Cache lifetime for artifacts: the scheduler's shortest refresh interval
+# (game-day cadence); ETags keep revalidation on quiet days a cheap 304
+REFRESH_GAMEDAY_MIN="${REFRESH_GAMEDAY_MIN:-15}"
+export NGINX_EXPIRES="$(( ${REFRESH_GAMEDAY_MIN%.*} > 0 ? ${REFRESH_GAMEDAY_MIN%.*} : 1 ))m"
+
+# Windowed guide service behind NGINX (/guide.xml?hours=&channels=)
+export GUIDE_PORT="${GUIDE_PORT:-8097}"
+
+# Serve *.br siblings too when the brotli_static module is installed
+export NGINX_LOAD_MODULES="" BROTLI_STATIC=""
+BROTLI_MOD=/usr/lib/nginx/modules/ngx_http_brotli_static_module.so
+if [ -f "$BROTLI_MOD" ]; then
+  NGINX_LOAD_MODULES="load_module $BROTLI_MOD;"
+  BROTLI_STATIC="brotli_static on;"
+fi
+
 render_nginx_conf() {
-  envsubst '${PORT}' < "$TEMPLATE" > "$1"
+  envsubst '${PORT} ${NGINX_EXPIRES} ${NGINX_LOAD_MODULES} ${BROTLI_STATIC} ${GUIDE_PORT}' < "$TEMPLATE" > "$1"
 }
 
 # Try to render directly into /etc/nginx/nginx.conf if writable
@@ -46,12 +62,15 @@ if ! nginx -t -c "$NGINX_CONF"; then
   sleep 10; exit 1
 fi
 
-# Start the daily runner in background
+# Start the refresh scheduler in background
 if [ -x /daily_runner.sh ]; then
   /daily_runner.sh &
 else
   echo "[entrypoint] WARNING: /daily_runner.sh not found or not executable"
 fi
 
+# Start the windowed guide service in background (reloads on every published run)
+python3 -u /app/mls_guide_server.py --port "$GUIDE_PORT" &
+
 echo "[entrypoint] Starting nginx on port ${PORT} with config $NGINX_CONF"
 exec nginx -c "$NGINX_CONF" -g 'daemon off;'
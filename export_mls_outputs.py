@@ -15,15 +15,28 @@
 
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Dict, Any, List, Tuple, Optional
+from typing import Optional, Dict, Any, FrozenSet, List, Tuple, Optional
 from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
-import json, html, argparse, re, os
+import json, html, argparse, re, os, time, math, hashlib, heapq, gzip, io, filecmp, functools, unicodedata
+from contextlib import contextmanager, nullcontext
+import mls_json
+import mls_models
+from mls_archive import open_text, read_snapshot
+from mls_models import Match, Summary, DEFAULT_EVENT_SECONDS, _coerce_time_value, parse_event_time, _normalize_duration_seconds
 
 pd = None
+try:  # optional: .br siblings are only written when the brotli package is installed
+    import brotli
+except ImportError:
+    brotli = None
+
+# One channel's share of a playlist/guide: (summaries, group, base_ch)
+Segment = Tuple[List[Summary], str, int]
+
 # -------------------- Basics --------------------
 
-def load_matches(path: Path) -> List[dict]:
-    data = json.loads(path.read_text(encoding="utf-8"))
+def _load_match_rows(path: Path) -> List[dict]:
+    data = mls_json.load(path)
     if isinstance(data, dict):
         if "matches" in data and isinstance(data["matches"], list):
             return data["matches"]
@@ -33,13 +46,11 @@ def load_matches(path: Path) -> List[dict]:
         return []
     return data if isinstance(data, list) else []
 
-def _normalize_airing_type(v: Optional[str]) -> str:
-    return (v or "").strip().lower()
+def load_matches(path: Path) -> List[Match]:
+    return [Match.from_dict(r) for r in _load_match_rows(path) if isinstance(r, dict)]
 
-def is_live_with_teams(m: dict) -> bool:
-    if _normalize_airing_type(m.get("airing_type")) != "live":
-        return False
-    return bool(m.get("team1_name")) and bool(m.get("team2_name"))
+def is_live_with_teams(m: Match) -> bool:
+    return m.is_live_with_teams
 
 # -------------------- URLs --------------------
 
@@ -87,13 +98,65 @@ def build_deeplink(page_url: str, playable_id: str) -> str:
 # -------------------- Hero maps --------------------
 
 def _walk(obj: Any):
-    if isinstance(obj, dict):
-        yield obj
-        for v in obj.values():
-            yield from _walk(v)
-    elif isinstance(obj, list):
-        for it in obj:
-            yield from _walk(it)
+    # Iterative pre-order walk (parents before children, document order);
+    # avoids deep `yield from` chains on large canvases.
+    stack = [obj]
+    while stack:
+        cur = stack.pop()
+        if isinstance(cur, dict):
+            yield cur
+            stack.extend(v for v in reversed(list(cur.values())) if isinstance(v, (dict, list)))
+        elif isinstance(cur, list):
+            stack.extend(v for v in reversed(cur) if isinstance(v, (dict, list)))
+
+# One JSON token: string, punctuation, or bare scalar (number/true/false/null)
+_JSON_TOKEN_RE = re.compile(r'\s*("(?:[^"\\]|\\.)*"|[{}\[\]:,]|[^\s{}\[\]:,"]+)')
+_HERO_KEYS = ("heroDescription", "url", "title")
+
+def _iter_hero_nodes_streaming(path: Path, chunk_size: int = 1 << 16):
+    """
+    Incrementally tokenize a JSON file and yield (preorder_seq, hero, url, title)
+    for every object that carries a heroDescription. Only the string values of
+    those three keys are kept per open object, so memory stays bounded by the
+    nesting depth plus one chunk, not by the file size.
+    """
+    stack: List[list] = []   # frames: [is_obj, seq, key, want_value, captured]
+    seq = 0
+    buf = ""; pos = 0; eof = False
+    with open_text(path) as f:
+        while True:
+            m = _JSON_TOKEN_RE.match(buf, pos)
+            if m is None or (m.end() == len(buf) and not eof):
+                if eof:
+                    return
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf = buf[pos:] + chunk; pos = 0
+                continue
+            tok = m.group(1); pos = m.end()
+            top = stack[-1] if stack else None
+            c = tok[0]
+            if c == "{" or c == "[":
+                if top is not None and top[0]:
+                    top[2] = None; top[3] = False
+                stack.append([c == "{", seq, None, False, {}])
+                seq += 1
+            elif c == "}" or c == "]":
+                frame = stack.pop()
+                cap = frame[4]
+                if frame[0] and cap.get("heroDescription"):
+                    yield frame[1], cap["heroDescription"], cap.get("url") or "", cap.get("title") or ""
+            elif c == ":":
+                if top is not None: top[3] = True
+            elif c == ",":
+                if top is not None: top[2] = None; top[3] = False
+            elif top is not None and top[0]:
+                if not top[3]:
+                    top[2] = (tok[1:-1] if "\\" not in tok else json.loads(tok)) if c == '"' else tok
+                else:
+                    if c == '"' and top[2] in _HERO_KEYS:
+                        top[4][top[2]] = json.loads(tok)
+                    top[3] = False
 
 def _normalize_team_bits(s: str) -> List[str]:
     s = (s or "").lower()
@@ -101,117 +164,138 @@ def _normalize_team_bits(s: str) -> List[str]:
     s = re.sub(r"[^a-z0-9\s]", " ", s)
     return [p for p in re.split(r"\s+", s) if p]
 
-def _title_key_variants(title: str) -> List[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+def _split_title_sides(title: str) -> Tuple[str, str]:
     t = (title or "").lower().replace(" vs. ", " vs ").replace(" at ", " at ")
-    if " vs " in t: a, b = t.split(" vs ", 2)
-    elif " at " in t: a, b = t.split(" at ", 2)
+    if " vs " in t: a, b = t.split(" vs ", 2)[:2]
+    elif " at " in t: a, b = t.split(" at ", 2)[:2]
     else: a, b = t, ""
+    return a, b
+
+def _title_key_variants(title: str) -> List[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+    a, b = _split_title_sides(title)
     away_bits = tuple(_normalize_team_bits(a)); home_bits = tuple(_normalize_team_bits(b))
     return [(away_bits, home_bits), (home_bits, away_bits)]
 
-def load_hero_maps(raw_canvas_path: Path) -> Tuple[Dict[str, str], Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], str]]:
-    hero_by_umc: Dict[str, str] = {}
-    hero_by_title: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], str] = {}
-    try:
-        if not raw_canvas_path.exists(): return hero_by_umc, hero_by_title
-        data = json.loads(raw_canvas_path.read_text(encoding="utf-8"))
-        for d in _walk(data):
-            h = d.get("heroDescription")
-            if not h: continue
-            u = d.get("url") or ""
-            umc = extract_umc_cse_id_from_url(u)
-            if umc: hero_by_umc.setdefault(umc, h)
-            t = d.get("title") or ""
-            for key in _title_key_variants(t):
-                hero_by_title.setdefault(key, h)
-    except Exception:
-        pass
-    return hero_by_umc, hero_by_title
+# Fuzzy hero matching: accent-folded team tokens minus club boilerplate, so
+# "CF Montréal" / "Club de Foot Montreal" both reduce to {"montreal"}. Tokens
+# are IDF-weighted over the indexed titles, so shared club words ("united",
+# "city", "new york") carry little, and each team side must pass on its own.
+# Off by default (0); a threshold around 0.8 only accepts near-identical names.
+HERO_FUZZY_THRESHOLD = 0.0
+HERO_FUZZY_MARGIN = 0.1
+_FUZZY_STOPWORDS = frozenset({"fc", "sc", "cf", "afc", "club", "de", "foot", "football", "the"})
 
-# -------------------- Time & duration --------------------
+def _fuzzy_team_tokens(name: str) -> FrozenSet[str]:
+    s = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode("ascii").lower()
+    return frozenset(t for t in re.split(r"[^a-z0-9]+", s) if t and t not in _FUZZY_STOPWORDS)
 
-def _coerce_time_value(v) -> str:
+class HeroTitleIndex(dict):
     """
-    Accept ISO string, epoch sec/ms, or dict containing those -> ISO with Z when possible.
+    hero_by_title: exact (away_bits, home_bits) keys -> hero, as a plain dict,
+    plus an inverted index token -> hero entries for fuzzy(). A lookup only
+    visits the postings of the event's own team tokens, so it stays
+    proportional to the heroes sharing a team, not to all heroes.
     """
-    def _to_iso(val):
-        try:
-            if isinstance(val, (int, float)):
-                sec = float(val) / (1000.0 if val >= 1_000_000_000_000 else 1.0)
-                dt = datetime.fromtimestamp(sec, tz=timezone.utc)
-                return dt.isoformat().replace("+00:00","Z")
-            if isinstance(val, str):
-                return val.strip()
-        except Exception:
-            pass
-        return ""
-
-    if v is None or v == "": return ""
-    if isinstance(v, (str, int, float)): return _to_iso(v)
-    if isinstance(v, dict):
-        for k in ("gameKickOffStartTime","kickoff","start","startTime","iso","utc","epoch","ms","millis"):
-            if k in v:
-                iso = _to_iso(v[k]); 
-                if iso: return iso
-        for vv in v.values():
-            iso = _coerce_time_value(vv)
-            if iso: return iso
-    return ""
 
-def parse_event_time(iso_like) -> Optional[datetime]:
-    if iso_like is None or iso_like == "": return None
-    if isinstance(iso_like, dict):
-        iso_like = _coerce_time_value(iso_like) or ""
-        if not iso_like: return None
-    if isinstance(iso_like, (int, float)):
-        try:
-            sec = float(iso_like) / (1000.0 if iso_like >= 1_000_000_000_000 else 1.0)
-            return datetime.fromtimestamp(sec, tz=timezone.utc)
-        except Exception:
+    def __init__(self):
+        super().__init__()
+        self._entries: List[Tuple[FrozenSet[str], FrozenSet[str], str]] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._seen: set = set()
+
+    def add(self, title: str, hero: str) -> None:
+        for key in _title_key_variants(title):
+            self.setdefault(key, hero)
+        a, b = (_fuzzy_team_tokens(side) for side in _split_title_sides(title))
+        if not a or not b or (a, b) in self._seen:
+            return
+        self._seen.add((a, b))
+        idx = len(self._entries)
+        self._entries.append((a, b, hero))
+        for tok in a | b:
+            self._postings.setdefault(tok, []).append(idx)
+
+    def _weight(self, tok: str) -> float:
+        return math.log(1 + len(self._entries) / max(1, len(self._postings.get(tok, ()))))
+
+    def _side_score(self, q: FrozenSet[str], t: FrozenSet[str]) -> float:
+        """IDF-weighted Jaccard overlap of one team's tokens with one title side."""
+        union = sum(self._weight(tok) for tok in q | t)
+        return sum(self._weight(tok) for tok in q & t) / union if union else 0.0
+
+    def fuzzy(self, team1: str, team2: str, threshold: float) -> Optional[str]:
+        """
+        Best hero whose title names both teams (either order): each team is scored
+        against its side separately and both must reach `threshold`. None when no
+        entry qualifies or the runner-up with a different hero is within
+        HERO_FUZZY_MARGIN. Ties go to the earliest entry.
+        """
+        x, y = _fuzzy_team_tokens(team1), _fuzzy_team_tokens(team2)
+        if not x or not y:
             return None
-    s = str(iso_like).strip()
-    try:
-        if s.endswith("Z"):
-            return datetime.fromisoformat(s.replace("Z","+00:00")).astimezone(timezone.utc)
-        dt = datetime.fromisoformat(s)
-        return dt.astimezone(timezone.utc) if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-    except Exception:
-        for fmt in ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S"):
-            try:
-                return datetime.strptime(s, fmt).replace(tzinfo=timezone.utc)
-            except Exception:
-                pass
-    return None
+        candidates = sorted({idx for tok in x | y for idx in self._postings.get(tok, ())})
+        scored: List[Tuple[float, int]] = []
+        for idx in candidates:
+            a, b, _ = self._entries[idx]
+            score = max(min(self._side_score(x, a), self._side_score(y, b)),
+                        min(self._side_score(x, b), self._side_score(y, a)))
+            if score > 0:
+                scored.append((score, idx))
+        if not scored:
+            return None
+        scored.sort(key=lambda e: (-e[0], e[1]))
+        score, idx = scored[0]
+        hero = self._entries[idx][2]
+        if score < threshold:
+            return None
+        runner_up = next((sc for sc, i in scored[1:] if self._entries[i][2] != hero), 0.0)
+        return hero if score - runner_up >= HERO_FUZZY_MARGIN else None
+
+def _hero_maps_from_nodes(nodes) -> Tuple[Dict[str, str], HeroTitleIndex]:
+    """Build (hero_by_umc, hero_by_title) from (hero, url, title) tuples in document order."""
+    hero_by_umc: Dict[str, str] = {}
+    hero_by_title = HeroTitleIndex()
+    for h, u, t in nodes:
+        umc = extract_umc_cse_id_from_url(u or "")
+        if umc: hero_by_umc.setdefault(umc, h)
+        hero_by_title.add(t or "", h)
+    return hero_by_umc, hero_by_title
+
+def build_hero_maps(data: Any) -> Tuple[Dict[str, str], HeroTitleIndex]:
+    """Hero maps from an already-parsed canvas."""
+    return _hero_maps_from_nodes(
+        (d["heroDescription"], d.get("url"), d.get("title"))
+        for d in _walk(data) if d.get("heroDescription")
+    )
 
-def _normalize_duration_seconds(v) -> int:
+def load_hero_maps(raw_canvas_path: Path, streaming: bool = False) -> Tuple[Dict[str, str], HeroTitleIndex]:
     """
-    Convert duration fields (seconds or milliseconds or dicts containing them) -> integer seconds.
-    >= 10^7 -> treat as ms. Returns 0 if unknown.
+    Hero maps from raw_canvas.json or an archived snapshot (.json.gz / .json.zst,
+    see mls_archive.py). streaming=True scans the file incrementally instead of
+    loading the whole tree (for large archived canvases / small boxes).
     """
     try:
-        if v is None: return 0
-        if isinstance(v, (int, float)): val = float(v)
-        elif isinstance(v, str) and v.strip(): val = float(v.strip())
-        elif isinstance(v, dict):
-            for k in ("ms","millis","milliseconds","durationMs","durationMS","duration_ms","durationMsValue"):
-                if k in v: return _normalize_duration_seconds(v[k])
-            for k in ("s","sec","seconds","durationS","duration_s","secondsValue"):
-                if k in v: return _normalize_duration_seconds(v[k])
-            for vv in v.values():
-                sec = _normalize_duration_seconds(vv)
-                if sec: return sec
-            return 0
-        else:
-            return 0
-        return int(val // 1000) if val >= 10_000_000 else int(val)
+        if not raw_canvas_path.exists(): return {}, HeroTitleIndex()
+        if streaming:
+            nodes = sorted(_iter_hero_nodes_streaming(raw_canvas_path))  # back to pre-order
+            return _hero_maps_from_nodes((h, u, t) for _, h, u, t in nodes)
+        return build_hero_maps(read_snapshot(raw_canvas_path))
     except Exception:
-        return 0
+        return {}, HeroTitleIndex()
+
+# -------------------- Time & duration --------------------
 
 # :00/:30 helpers
+def placeholder_anchor(now: datetime) -> datetime:
+    """Start of the pre-event placeholder window: floor(now to :00/:30) - 30m."""
+    return floor_30(now) - timedelta(minutes=30)
+
 def floor_30(dt: datetime) -> datetime:
     minute = 0 if dt.minute < 30 else 30
     return dt.replace(minute=minute, second=0, microsecond=0)
 
+_HALF_HOUR = 1800
+
 def ceil_30(dt: datetime) -> datetime:
     f = floor_30(dt)
     return f if f == dt else (f + timedelta(minutes=30))
@@ -228,29 +312,26 @@ def pretty_local(dt: datetime) -> str:
 
 # -------------------- Transform --------------------
 
-def build_rows_from_scrapeonly(matches: List[dict],
+def build_rows_from_scrapeonly(matches: List[Match],
                                hero_by_umc: Dict[str, str],
-                               hero_by_title: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], str]) -> Tuple[List[dict], List[dict]]:
+                               hero_by_title: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], str],
+                               fuzzy_threshold: float = HERO_FUZZY_THRESHOLD) -> Tuple[List[Summary], List[dict]]:
+    """fuzzy_threshold <= 0 disables the token-overlap fallback (it needs a HeroTitleIndex)."""
     summaries, playables = [], []
     for m in matches:
-        if not is_live_with_teams(m): continue
+        if isinstance(m, dict): m = Match.from_dict(m)
+        if not m.is_live_with_teams: continue
 
-        home = m.get("team1_name") or ""
-        away = m.get("team2_name") or ""
-        title = m.get("title") or f"{home} vs. {away}"
+        home = m.team1_name or ""
+        away = m.team2_name or ""
+        title = m.title or f"{home} vs. {away}"
 
-        page_url = normalize_page_url(m.get("deep_link") or m.get("url") or "")
-        playable_id = m.get("playable_id") or ""
+        page_url = normalize_page_url(m.deep_link or m.url or "")
+        playable_id = m.playable_id or ""
         deeplink = build_deeplink(page_url, playable_id)
 
-        start_time = _coerce_time_value(m.get("event_time"))
-        end_time   = _coerce_time_value(m.get("end_time"))
-        venue      = m.get("venue") or ""
-        sport_name = m.get("sportName") or m.get("sport") or "Soccer"
-        duration_s = _normalize_duration_seconds(m.get("duration") or m.get("duration_s"))
-
         # Hero
-        hero_desc = (m.get("heroDescription") or m.get("hero_description") or "").strip()
+        hero_desc = (m.hero_description or "").strip()
         if not hero_desc:
             umc = extract_umc_cse_id_from_url(page_url) or extract_umc_cse_id_from_url(deeplink)
             if umc and umc in hero_by_umc: hero_desc = hero_by_umc[umc]
@@ -258,26 +339,32 @@ def build_rows_from_scrapeonly(matches: List[dict],
             for key in _title_key_variants(title):
                 if key in hero_by_title:
                     hero_desc = hero_by_title[key]; break
+        if not hero_desc and fuzzy_threshold > 0 and isinstance(hero_by_title, HeroTitleIndex):
+            hero_desc = hero_by_title.fuzzy(home, away, fuzzy_threshold) or ""
 
-        summaries.append({
-            "title": title,
-            "short_title": m.get("shortTitle") or m.get("short_title") or "",
-            "sport_name": sport_name,
-            "type": m.get("type") or "SportingEvent",
-            "hero_description": hero_desc,
-            "home_team": home, "away_team": away,
-            "start_time": start_time, "end_time": end_time,
-            "duration_s": duration_s,
-            "venue": venue,
-            "primary_playable_id": playable_id,
-            "primary_url": page_url,
-            "deeplink_url": deeplink,
+        s = Summary(
+            title=title,
+            short_title=m.short_title or "",
+            sport_name=m.sport or "Soccer",
+            type=m.type or "SportingEvent",
+            hero_description=hero_desc,
+            home_team=home, away_team=away,
+            start_time=_coerce_time_value(m.event_time), end_time=_coerce_time_value(m.end_time),
+            duration_s=_normalize_duration_seconds(m.duration),
+            venue=m.venue or "",
+            primary_playable_id=playable_id,
+            primary_url=page_url,
+            deeplink_url=deeplink,
             # Preserve image fields from scraper
-            "images": m.get("images"),
-            "team1_images": m.get("team1_images"),
-            "team2_images": m.get("team2_images"),
-            "playable_images": m.get("playable_images"),
-        })
+            images=m.images,
+            team1_images=m.team1_images,
+            team2_images=m.team2_images,
+            playable_images=m.playable_images,
+        )
+        # Resolve artwork once per event; writers reuse it
+        s.image_src = resolve_image_source(s)
+        s.icon_url = pick_best_image_url(s)
+        summaries.append(s)
 
         if playable_id or deeplink:
             playables.append({
@@ -296,6 +383,7 @@ _DIM_TPL_RE = _re_img.compile(r"/\{w\}x\{h\}(Sports\.TVAPrM04)?\.\{f\}(\?|$)")
 # Match dimensions like /1920x1080.jpg OR /1920x1080Sports.TVAPrM04.jpg
 _DIM_NUM_RE = _re_img.compile(r"/\d+x\d+(?:Sports)?(?:\.[A-Za-z0-9]+)?\.(png|jpg|jpeg|webp)(\?|$)")
 
+@functools.lru_cache(maxsize=4096)
 def materialize_apple_thumb(url: str, w: int = 800, h: int = 600, fmt: str = "jpg") -> str:
     """
     Convert Apple CDN image URLs to specific dimensions.
@@ -353,12 +441,14 @@ def _gather_img_urls(obj, acc: list[str]) -> None:
         for v in obj:
             _gather_img_urls(v, acc)
 
-def pick_best_image_url(match: dict) -> Optional[str]:
+def resolve_image_source(match) -> Optional[str]:
     """
-    Pick the best image URL from match data.
+    Pick the best *source* image URL (template or concrete, not yet sized) from a
+    Match/Summary or a raw dict.
     Priority: contentImage composite (has team logos!) > playable images > event images > team logos
-    Returns 4:3 aspect ratio (800x600 JPG) for Channels DVR compatibility.
     """
+    if not isinstance(match, dict):
+        match = match.image_fields()
     candidates: list[str] = []
     
     # HIGHEST PRIORITY: Check for contentImage in playable_images (the beautiful composite with team logos)
@@ -366,8 +456,7 @@ def pick_best_image_url(match: dict) -> Optional[str]:
     if playable_imgs and isinstance(playable_imgs, dict):
         content_img = playable_imgs.get("contentImage")
         if content_img and isinstance(content_img, str):
-            # Transform to 4:3 aspect ratio (800x600 JPG) for Channels DVR
-            return materialize_apple_thumb(content_img, 800, 600, "jpg")
+            return content_img
     
     # Primary keys from original implementation
     primary_keys = ("playable_images", "images", "team1_images", "team2_images")
@@ -390,144 +479,566 @@ def pick_best_image_url(match: dict) -> Optional[str]:
     
     seen=set(); uniq=[u for u in candidates if not (u in seen or seen.add(u))]
     if not uniq: return None
-    # prefer template URLs we can stamp to 800x600.jpg (4:3 for Channels DVR)
+    # prefer template URLs we can stamp to any size
     for u in uniq:
         uu = _urlparse_img.unquote(u)
         if "{w}" in uu and "{h}" in uu and "{f}" in uu:
-            return materialize_apple_thumb(u, 800, 600, "jpg")
-    # else normalize first concrete URL to 800x600.jpg (keeps path, swaps size if templated)
-    return materialize_apple_thumb(uniq[0], 800, 600, "jpg")
+            return u
+    # else the first concrete URL (materialize swaps its size if it has one)
+    return uniq[0]
+
+def pick_best_image_url(match, w: int = 800, h: int = 600, fmt: str = "jpg") -> Optional[str]:
+    """
+    Best image URL for `match` at w x h. Defaults to 4:3 (800x600 JPG) for Channels DVR.
+    Summaries carry the resolved source in "image_src" (see build_rows_from_scrapeonly),
+    so per-client size variants (e.g. 1280x720) reuse it without walking the image trees.
+    """
+    if isinstance(match, Summary):
+        src = match.image_src
+    else:
+        src = match["image_src"] if isinstance(match, dict) and "image_src" in match else resolve_image_source(match)
+    return materialize_apple_thumb(src, w, h, fmt) if src else None
 
 # -------------------- Writers --------------------
 
-def write_json(summaries: List[dict], playables: List[dict], out_json: Path) -> None:
-    out_json.write_text(json.dumps({"summary": summaries, "playables": playables}, indent=2, ensure_ascii=False), encoding="utf-8")
-    print(f"📝 wrote JSON: {out_json.resolve()}  (summary={len(summaries)}, playables={len(playables)})")
+def _write_text_if_changed(path: Path, text: str) -> bool:
+    return _write_bytes_if_changed(path, text.encode("utf-8"))
+
+def _write_bytes_if_changed(path: Path, data: bytes) -> bool:
+    """
+    Replace `path` only when its bytes would differ (keeps mtime stable for clients).
+    Always via temp file + rename: never a half-written file, and hardlinked
+    copies (previous releases, see mls_publish.py) are left untouched.
+    """
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return True
+
+def write_json_artifact(path: Path, obj: Any, pretty: bool = False) -> Dict[str, Any]:
+    """
+    JSON artifact (raw_canvas.json, mls_schedule.json, ...) via mls_json, compact
+    unless `pretty`, written atomically if changed. Returns bytes / serialize_s / changed.
+    """
+    data, seconds = mls_json.timed_dumps(obj, pretty)
+    changed = _write_bytes_if_changed(path, data)
+    return {"bytes": len(data), "serialize_s": round(seconds, 6), "changed": int(changed)}
+
+def describe_json_write(path: Path, result: Dict[str, Any], pretty: bool = False) -> str:
+    """'raw_canvas.json 812.4 KiB, 6.1 ms (orjson, compact)' for run output."""
+    return (f"{path.name} {result['bytes'] / 1024:.1f} KiB, {result['serialize_s'] * 1000:.1f} ms "
+            f"({mls_json.BACKEND}, {'pretty' if pretty else 'compact'}{'' if result['changed'] else ', unchanged'})")
+
+@contextmanager
+def _artifact_writer(path: Path, result: Dict[str, bool], buffer_size: int = 1 << 16):
+    """
+    Yield a buffered text sink that streams into a temp file beside `path`
+    (through gzip when `path` ends in .gz; mtime=0 keeps output reproducible).
+    On success the temp file replaces `path` only if the bytes differ;
+    result["changed"] reports which happened.
+    """
+    tmp = path.with_name(f".{path.name}.tmp")
+    raw = open(tmp, "wb", buffering=buffer_size)
+    try:
+        if path.suffix == ".gz":
+            gz = gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0)
+            out = io.TextIOWrapper(gz, encoding="utf-8", newline="")
+        else:
+            out = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        yield out
+        out.close()
+        raw.close()
+        if path.exists() and filecmp.cmp(tmp, path, shallow=False):
+            tmp.unlink()
+            result["changed"] = False
+        else:
+            os.replace(tmp, path)
+            result["changed"] = True
+    except BaseException:
+        raw.close()
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+
+def write_compressed_siblings(path: Path) -> List[Path]:
+    """
+    Write `path`.gz (and `path`.br when brotli is available) for NGINX gzip_static /
+    brotli_static. Siblings newer than the source are left alone, so unchanged
+    artifacts keep their ETag. Returns the siblings that were (re)written.
+    """
+    written: List[Path] = []
+    if not path.exists() or path.suffix in (".gz", ".br"):
+        return written
+    src_mtime = path.stat().st_mtime
+    encoders = [(".gz", lambda b: gzip.compress(b, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoders.append((".br", lambda b: brotli.compress(b, quality=11)))
+    data = None
+    for suffix, encode in encoders:
+        sib = path.with_name(path.name + suffix)
+        try:
+            if sib.stat().st_mtime >= src_mtime:
+                continue
+        except OSError:
+            pass
+        if data is None:
+            data = path.read_bytes()
+        tmp = sib.with_name(f".{sib.name}.tmp")
+        tmp.write_bytes(encode(data))
+        os.replace(tmp, sib)
+        written.append(sib)
+    return written
 
-def write_m3u(summaries: List[dict], out_m3u: Path, group: str, base_ch: int) -> int:
-    lines = ["#EXTM3U\n"]; ch = base_ch
+def write_json(summaries: List[Summary], playables: List[dict], out_json: Path, pretty: bool = False) -> None:
+    res = write_json_artifact(out_json, {"summary": [s.to_dict() for s in summaries], "playables": playables}, pretty)
+    print(f"📝 wrote JSON: {out_json.resolve()}  (summary={len(summaries)}, playables={len(playables)}; "
+          f"{describe_json_write(out_json, res, pretty)})")
+
+def _m3u_entries(summaries: List[Summary], group: str, base_ch: int) -> List[str]:
+    lines = []; ch = base_ch
     for s in summaries:
-        url = s.get("primary_url") or s.get("deeplink_url") or ""
+        url = s.primary_url or s.deeplink_url or ""
         if not url: continue
-        title = s.get("title") or "MLS Match"
+        title = s.title or "MLS Match"
         tvg_id = f"mls.apple.{ch}"
         
         # Add tvg-logo with 4:3 image for Channels DVR
-        icon_src = pick_best_image_url(s)
+        icon_src = s.icon_url
         logo_attr = f' tvg-logo="{icon_src}"' if icon_src else ''
         
         lines.append(f'#EXTINF:-1 tvg-id="{tvg_id}" tvg-name="{title}" tvg-chno="{ch}"{logo_attr} group-title="{group}",{title}\n{url}\n')
         ch += 1
-    out_m3u.write_text("".join(lines), encoding="utf-8")
-    print(f"📺 wrote M3U:  {out_m3u.resolve()}  (entries={ch - base_ch})")
-    return (ch - base_ch)
+    return lines
+
+def write_m3u(summaries: List[Summary], out_m3u: Path, group: str, base_ch: int, lineup: int = 0) -> int:
+    return write_m3u_segments([(summaries, group, base_ch)], out_m3u, lineup=lineup)
+
+def write_m3u_segments(segments: List[Segment], out_m3u: Path, lineup: int = 0,
+                       now: Optional[datetime] = None) -> int:
+    """
+    One playlist from several (summaries, group, base_ch) channel segments, in order.
+    lineup > 0 writes the fixed channel pool instead (see allocate_lineup).
+    """
+    now_ts = int((now or datetime.now(timezone.utc)).timestamp())
+    lines = ["#EXTM3U\n"]
+    for summaries, group, base_ch in segments:
+        if lineup:
+            lines.extend(_m3u_lineup_entries(allocate_lineup(summaries, lineup, now_ts), group, base_ch, now_ts))
+        else:
+            lines.extend(_m3u_entries(summaries, group, base_ch))
+    count = len(lines) - 1
+    if _write_text_if_changed(out_m3u, "".join(lines)):
+        print(f"📺 wrote M3U:  {out_m3u.resolve()}  (entries={count})")
+    else:
+        print(f"📺 M3U unchanged: {out_m3u.resolve()}  (entries={count})")
+    return count
 
 
 
 def write_xlsx_or_csv(*args, **kwargs) -> None:
     return
 
-def _emit_programme(parts: List[str], chan_id: str, start_dt: datetime, stop_dt: datetime,
+@functools.lru_cache(maxsize=16384)
+def _xmltv_time(ts: int) -> str:
+    """UTC epoch seconds -> XMLTV timestamp (placeholder grid times repeat across channels)."""
+    return time.strftime("%Y%m%d%H%M%S +0000", time.gmtime(ts))
+
+def _emit_programme(out, chan_id: str, start_ts: int, stop_ts: int,
                     title: str, subtitle: Optional[str]=None, desc: Optional[str]=None,
                     categories: Optional[List[str]]=None, live: bool=False, icon_src: Optional[str]=None) -> None:
-    start_s = start_dt.astimezone(timezone.utc).strftime("%Y%m%d%H%M%S +0000")
-    stop_s  = stop_dt.astimezone(timezone.utc).strftime("%Y%m%d%H%M%S +0000")
-    parts.append(f'  <programme channel="{html.escape(chan_id)}" start="{start_s}" stop="{stop_s}">\n')
-    parts.append(f'    <title lang="en">{html.escape(title)}</title>\n')
+    start_s = _xmltv_time(start_ts)
+    stop_s  = _xmltv_time(stop_ts)
+    out.write(f'  <programme channel="{html.escape(chan_id)}" start="{start_s}" stop="{stop_s}">\n')
+    out.write(f'    <title lang="en">{html.escape(title)}</title>\n')
     if icon_src:
-        parts.append(f'    <icon src="{html.escape(icon_src)}"/>\n')
+        out.write(f'    <icon src="{html.escape(icon_src)}"/>\n')
     if subtitle:
-        parts.append(f'    <sub-title lang="en">{html.escape(subtitle)}</sub-title>\n')
+        out.write(f'    <sub-title lang="en">{html.escape(subtitle)}</sub-title>\n')
     if desc:
-        parts.append(f'    <desc lang="en">{html.escape(desc)}</desc>\n')
+        out.write(f'    <desc lang="en">{html.escape(desc)}</desc>\n')
     if categories:
         for cat in categories:
-            parts.append(f'    <category lang="en">{cat}</category>\n')
+            out.write(f'    <category lang="en">{cat}</category>\n')
     if live:
-        parts.append('    <live>1</live>\n')
-    parts.append('  </programme>\n')
+        out.write('    <live>1</live>\n')
+    out.write('  </programme>\n')
 
-def _emit_placeholders(parts: List[str], chan_id: str, window_start: datetime, window_end: datetime,
+def _emit_placeholders(out, chan_id: str, window_start: int, window_end: int,
                        label: str, base_minutes: int = 60, desc_text: Optional[str]=None) -> None:
     """
     Emit placeholders on :00/:30 grid using 1-hour base blocks (<=2h each).
     Desc (if provided) will be attached to each emitted placeholder.
     """
     t = window_start
-    step = timedelta(minutes=base_minutes)
-    max_block = timedelta(hours=2)
+    step = base_minutes * 60
+    max_block = 2 * 3600
     while t < window_end:
         t_next = min(window_end, t + step)
         if (t_next - t) > max_block:
             t_next = t + max_block
-        _emit_programme(parts, chan_id, t, t_next, title=label, desc=desc_text)
+        _emit_programme(out, chan_id, t, t_next, title=label, desc=desc_text)
         t = t_next
 
-def write_xmltv(summaries: List[dict], out_xml: Path, base_ch: int, group: str) -> None:
-    parts: List[str] = []
-    parts.append('<?xml version="1.0" encoding="UTF-8"?>\n')
-    parts.append('<tv generator-info-name="MLS-AppleTV Exporter v0.9">\n')
+XMLTV_HEAD = '<?xml version="1.0" encoding="UTF-8"?>\n<tv generator-info-name="MLS-AppleTV Exporter v0.9">\n'
 
-    ch = base_ch
-    for s in summaries:
-        chan_id = f"mls.apple.{ch}"; title = s.get("title") or "MLS Match"
-        parts.append(f'  <channel id="{html.escape(chan_id)}">\n')
-        parts.append(f'    <display-name>{html.escape(title)}</display-name>\n')
-        parts.append(f'    <display-name>{ch}</display-name>\n')
-        parts.append(f'    <display-name>{html.escape(group)}</display-name>\n')
-        parts.append('  </channel>\n')
-        ch += 1
+def write_xmltv(summaries: List[Summary], out_xml: Path, base_ch: int, group: str,
+                now: Optional[datetime] = None, lineup: int = 0) -> int:
+    return write_xmltv_segments([(summaries, group, base_ch)], out_xml, now=now, lineup=lineup)
+
+def write_xmltv_segments(segments: List[Segment], out_xml: Path, now: Optional[datetime] = None,
+                         lineup: int = 0) -> int:
+    """
+    Stream the guide to `out_xml` (gzip-compressed when it ends in .gz) as each
+    programme is produced; the file is only replaced if its bytes changed.
+    """
+    result: Dict[str, bool] = {}
+    now = now or datetime.now(timezone.utc)
+    with _artifact_writer(out_xml, result) as out:
+        n = _write_xmltv_body(out, segments, now, lineup)
+    if result.get("changed"):
+        print(f"🗓️  wrote XMLTV: {out_xml.resolve()}  (channels={n} programmes=varies with placeholders)")
+    else:
+        print(f"🗓️  XMLTV unchanged: {out_xml.resolve()}  (channels={n})")
+    return n
 
-    now = datetime.now(timezone.utc)
-    pre_anchor = floor_30(now) - timedelta(minutes=30)
+def _write_xmltv_body(out, segments: List[Segment], now: Optional[datetime], lineup: int = 0) -> int:
+    """Write the whole document; returns the number of <channel>s."""
+    out.write(XMLTV_HEAD)
+    now = now or datetime.now(timezone.utc)
+    n = 0
+    if lineup:
+        now_ts = int(now.timestamp())
+        pools = [(allocate_lineup(summaries, lineup, now_ts), group, base_ch) for summaries, group, base_ch in segments]
+        for slots, group, base_ch in pools:
+            _write_lineup_channels(out, slots, base_ch, group)
+            n += len(slots)
+        for slots, group, base_ch in pools:
+            _write_lineup_programmes(out, slots, base_ch, now, idle=True)
+    else:
+        for summaries, group, base_ch in segments:
+            _write_xmltv_channels(out, summaries, base_ch, group)
+            n += len(summaries)
+        for summaries, group, base_ch in segments:
+            _write_xmltv_programmes(out, summaries, base_ch, now)
+    out.write('</tv>\n')
+    return n
 
-    ch = base_ch
-    for s in summaries:
-        chan_id = f"mls.apple.{ch}"; title = s.get("title") or "MLS Match"
-        away = s.get("away_team") or ""; home = s.get("home_team") or ""
-        short_title = s.get("short_title") or ""; sport_name = s.get("sport_name") or ""
-        ev_type = s.get("type") or ""; venue = s.get("venue") or ""
-        hero = (s.get("hero_description") or "").strip()
-        start_dt = parse_event_time(s.get("start_time") or "") or now  # fallback to now if missing
-        stop_dt = parse_event_time(s.get("end_time") or "")
-        if start_dt and not stop_dt:
-            dur_sec = _normalize_duration_seconds(s.get("duration_s") or s.get("duration") or 0)
-            stop_dt = start_dt + timedelta(seconds=dur_sec if dur_sec > 0 else 7200)
-
-        # PRE placeholders: 1-hour base blocks from pre_anchor to start
-        desc_pre = f'{title} starts {pretty_local(start_dt)}'
-        if start_dt > pre_anchor:
-            _emit_placeholders(parts, chan_id, pre_anchor, start_dt, label="Event not started", base_minutes=60, desc_text=desc_pre)
-
-        # REAL programme
-        desc_bits = []
-        if short_title: desc_bits.append(short_title)
-        if sport_name:  desc_bits.append(sport_name)
-        if ev_type:     desc_bits.append(ev_type)
-        pretty = " · ".join(desc_bits) if desc_bits else ""
-        if hero:        pretty = f"{hero} — {pretty}" if pretty else hero
-        if venue:       pretty = f"{pretty} @ {venue}" if pretty else f"@ {venue}"
-        subtitle = f"{away} at {home}" if (home or away) else None
-        cats = ["MLS","Soccer","Sports","Sports Event"]
-        # choose icon from scraped JSON fields (640x360 png)
-        icon_src = pick_best_image_url(s)
-
-        _emit_programme(parts, chan_id, start_dt, stop_dt, title=title, subtitle=subtitle, desc=(pretty or None), categories=cats, live=True, icon_src=icon_src)
-
-        # POST placeholders: 1-hour base blocks from ceil_30(stop_dt) to +4h (no desc)
-        post_start = ceil_30(stop_dt)
-        post_end = post_start + timedelta(hours=4)
-        _emit_placeholders(parts, chan_id, post_start, post_end, label="Event ended", base_minutes=60, desc_text=None)
+def _write_xmltv_channels(out, summaries: List[Summary], base_ch: int, group: str) -> None:
+    for i, s in enumerate(summaries):
+        _emit_channel(out, base_ch + i, s.title or "MLS Match", group)
 
-        ch += 1
+def _emit_channel(out, ch: int, name: str, group: str) -> None:
+    out.write(f'  <channel id="{html.escape(f"mls.apple.{ch}")}">\n')
+    out.write(f'    <display-name>{html.escape(name)}</display-name>\n')
+    out.write(f'    <display-name>{ch}</display-name>\n')
+    out.write(f'    <display-name>{html.escape(group)}</display-name>\n')
+    out.write('  </channel>\n')
+
+def _event_span(s: Summary, now_ts: int) -> Tuple[int, int]:
+    """(start, stop) epoch seconds for a programme: start falls back to now, stop to duration/+2h."""
+    start_ts = s.start_ts if s.start_ts is not None else now_ts  # fallback to now if missing
+    stop_ts = s.stop_ts
+    if stop_ts is None:
+        dur_sec = s.duration_s or 0
+        stop_ts = start_ts + (dur_sec if dur_sec > 0 else DEFAULT_EVENT_SECONDS)
+    return start_ts, stop_ts
+
+def _emit_event(out, chan_id: str, s: Summary, start_ts: int, stop_ts: int) -> None:
+    title = s.title or "MLS Match"
+    away = s.away_team or ""; home = s.home_team or ""
+    short_title = s.short_title or ""; sport_name = s.sport_name or ""
+    ev_type = s.type or ""; venue = s.venue or ""
+    hero = (s.hero_description or "").strip()
+    desc_bits = []
+    if short_title: desc_bits.append(short_title)
+    if sport_name:  desc_bits.append(sport_name)
+    if ev_type:     desc_bits.append(ev_type)
+    pretty = " · ".join(desc_bits) if desc_bits else ""
+    if hero:        pretty = f"{hero} — {pretty}" if pretty else hero
+    if venue:       pretty = f"{pretty} @ {venue}" if pretty else f"@ {venue}"
+    subtitle = f"{away} at {home}" if (home or away) else None
+    cats = ["MLS","Soccer","Sports","Sports Event"]
+    # choose icon from scraped JSON fields (800x600 jpg, resolved once per event)
+    icon_src = s.icon_url
+    _emit_programme(out, chan_id, start_ts, stop_ts, title=title, subtitle=subtitle, desc=(pretty or None), categories=cats, live=True, icon_src=icon_src)
+
+def _write_xmltv_programmes(out, summaries: List[Summary], base_ch: int, now: datetime) -> None:
+    # Times are the epoch seconds resolved on each Summary (start_ts/stop_ts)
+    pre_anchor = int(placeholder_anchor(now).timestamp())
+    now_ts = int(now.timestamp())
+    for i, s in enumerate(summaries):
+        start_ts, stop_ts = _event_span(s, now_ts)
+        _emit_event_programmes(out, f"mls.apple.{base_ch + i}", s, start_ts, stop_ts, pre_anchor, now)
+
+def _post_window(stop_ts: int) -> Tuple[int, int]:
+    """POST placeholder span: ceil_30(stop) to +4h."""
+    post_start = -(-stop_ts // _HALF_HOUR) * _HALF_HOUR
+    return post_start, post_start + 4 * 3600
+
+def _emit_event_programmes(out, chan_id: str, s: Summary, start_ts: int, stop_ts: int,
+                           pre_anchor: int, now: datetime, until: Optional[int] = None) -> None:
+    """One per-event channel: PRE placeholders, the event, POST placeholders (cut at `until`)."""
+    # PRE placeholders: 1-hour base blocks from pre_anchor to start
+    if start_ts > pre_anchor:
+        desc_pre = f'{s.title or "MLS Match"} starts {pretty_local(s.start_dt or now)}'
+        _emit_placeholders(out, chan_id, pre_anchor, start_ts, label="Event not started", base_minutes=60, desc_text=desc_pre)
+
+    # REAL programme
+    _emit_event(out, chan_id, s, start_ts, stop_ts)
+
+    # POST placeholders: 1-hour base blocks from ceil_30(stop) to +4h (no desc)
+    post_start, post_end = _post_window(stop_ts)
+    if until is not None:
+        post_end = min(post_end, until)
+    _emit_placeholders(out, chan_id, post_start, post_end, label="Event ended", base_minutes=60, desc_text=None)
+
+# -------------------- Lineup (fixed channel pool) --------------------
+# Optional mode: instead of one channel per event, events are packed onto a
+# fixed pool of N reusable channels (interval partitioning), and each
+# channel's idle time is filled once between its events rather than per
+# event. All N channels are always listed, so DVR lineups stay stable.
+
+IDLE_HOURS = 24
+
+def allocate_lineup(summaries: List[Summary], n: int, now_ts: int) -> List[List[Tuple[Summary, int, int]]]:
+    """
+    Greedy interval partitioning: events in kickoff order take the lowest-numbered
+    channel already free at their start; a channel is only added when all are busy.
+    Overlapping games are never stacked: past `n` channels the pool grows (callers warn).
+    Returns per-channel lists of (summary, start_ts, stop_ts) in time order, at least
+    `n` of them (idle channels get an empty list).
+    """
+    events = sorted(((s,) + _event_span(s, now_ts) for s in summaries), key=lambda e: (e[1], e[2]))
+    slots: List[List[Tuple[Summary, int, int]]] = []
+    free: List[int] = []                    # heap of idle channel indexes
+    busy: List[Tuple[int, int]] = []        # heap of (free_at, channel index)
+    for ev in events:
+        while busy and busy[0][0] <= ev[1]:
+            heapq.heappush(free, heapq.heappop(busy)[1])
+        if free:
+            idx = heapq.heappop(free)
+        else:
+            idx = len(slots)
+            slots.append([])
+        slots[idx].append(ev)
+        heapq.heappush(busy, (ev[2], idx))
+    slots.extend([] for _ in range(n - len(slots)))
+    return slots
+
+def _lineup_now_event(events: List[Tuple[Summary, int, int]], now_ts: int) -> Summary:
+    """What a lineup channel's stream URL points at: the live or next game, else the last one."""
+    for s, _, stop_ts in events:
+        if stop_ts > now_ts and (s.primary_url or s.deeplink_url):
+            return s
+    return next((s for s, _, _ in reversed(events) if s.primary_url or s.deeplink_url), events[-1][0])
+
+def _m3u_lineup_entries(slots, group: str, base_ch: int, now_ts: int) -> List[str]:
+    """Idle channels stream the pool's live/next game (a playlist entry needs a URL), without a logo."""
+    every = sorted((e for events in slots for e in events), key=lambda e: (e[1], e[2]))
+    pool_now = _lineup_now_event(every, now_ts) if every else None
+    lines = []
+    for i, events in enumerate(slots):
+        ch = base_ch + i
+        s = _lineup_now_event(events, now_ts) if events else pool_now
+        if s is None: continue
+        url = s.primary_url or s.deeplink_url or ""
+        if not url: continue
+        name = f"{group} {i + 1}"
+        logo_attr = f' tvg-logo="{s.icon_url}"' if s.icon_url and events else ''
+        lines.append(f'#EXTINF:-1 tvg-id="mls.apple.{ch}" tvg-name="{name}" tvg-chno="{ch}"{logo_attr} group-title="{group}",{name}\n{url}\n')
+    return lines
+
+def _write_lineup_channels(out, slots, base_ch: int, group: str) -> None:
+    for i in range(len(slots)):
+        _emit_channel(out, base_ch + i, f"{group} {i + 1}", group)
+
+def _write_lineup_programmes(out, slots, base_ch: int, now: datetime, until: Optional[int] = None,
+                             idle: bool = False) -> None:
+    """
+    Empty slots are skipped (windowed guides) unless `idle`, which fills them with
+    IDLE_HOURS of placeholders. `until` cuts the trailing placeholders; a slot's
+    event starting at or after `until` only contributes its PRE placeholders up to it.
+    """
+    pre_anchor = int(placeholder_anchor(now).timestamp())
+    for i, events in enumerate(slots):
+        chan_id = f"mls.apple.{base_ch + i}"
+        if not events:
+            if idle:
+                idle_end = pre_anchor + IDLE_HOURS * 3600
+                if until is not None:
+                    idle_end = min(idle_end, until)
+                _emit_placeholders(out, chan_id, pre_anchor, idle_end,
+                                   label="No game scheduled", base_minutes=60, desc_text=None)
+            continue
+        t = pre_anchor
+        for s, start_ts, stop_ts in events:
+            # One filler per idle gap, pointing at the channel's next game
+            gap_end = start_ts if until is None else min(start_ts, until)
+            if gap_end > t:
+                desc_pre = f'{s.title or "MLS Match"} starts {pretty_local(s.start_dt or now)}'
+                _emit_placeholders(out, chan_id, t, gap_end, label="Event not started", base_minutes=60, desc_text=desc_pre)
+            if until is not None and start_ts >= until:
+                break
+            _emit_event(out, chan_id, s, start_ts, stop_ts)
+            t = max(t, stop_ts)
+        else:
+            post_start, post_end = _post_window(t)
+            if until is not None:
+                post_end = min(post_end, until)
+            _emit_placeholders(out, chan_id, post_start, post_end, label="Event ended", base_minutes=60, desc_text=None)
+
+# -------------------- Incremental export --------------------
+# A manifest next to the artifacts records, per output path, a hash of
+# everything the writer consumes (summaries, writer params, exporter code).
+# M3U is skipped outright when that hash is unchanged. XMLTV also depends on
+# the clock through the pre-event placeholder anchor; an unchanged guide is
+# still valid as long as its anchor is not newer than now's (its placeholders
+# then still cover "now") and not older than placeholder_max_age, after which
+# it is regenerated to drop stale past blocks.
+
+def _stable_hash(obj: Any) -> str:
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+_CODE_FINGERPRINT: Optional[str] = None
+
+def _code_fingerprint() -> str:
+    global _CODE_FINGERPRINT
+    if _CODE_FINGERPRINT is None:
+        # The guide/M3U writers also depend on the time parsing and defaults in mls_models.
+        h = hashlib.sha256()
+        try:
+            for src in (__file__, mls_models.__file__):
+                h.update(Path(src).read_bytes())
+            _CODE_FINGERPRINT = h.hexdigest()
+        except OSError:
+            _CODE_FINGERPRINT = ""
+    return _CODE_FINGERPRINT
+
+def _manifest_key(artifact: Path, manifest_path: Path) -> str:
+    """Artifact path relative to the manifest's directory, so a release directory can move."""
+    return os.path.relpath(artifact.resolve(), manifest_path.resolve().parent)
 
-    parts.append('</tv>\n')
-    out_xml.write_text("".join(parts), encoding="utf-8")
-    print(f"🗓️  wrote XMLTV: {out_xml.resolve()}  (channels={len(summaries)} programmes=varies with placeholders)")
-    return len(summaries)
+def load_manifest(path: Path) -> Dict[str, Any]:
+    try:
+        data = mls_json.load(path)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+def save_manifest(path: Path, manifest: Dict[str, Any]) -> None:
+    _write_text_if_changed(path, json.dumps(manifest, indent=2, sort_keys=True))
+
+def export_incremental(summaries: List[Summary], out_m3u: Path, out_xml: Path, group: str, base_ch: int,
+                       manifest_path: Path, force: bool = False,
+                       placeholder_max_age: timedelta = timedelta(hours=12),
+                       now: Optional[datetime] = None, precompress: bool = True,
+                       metrics=None, stage_prefix: str = "", lineup: int = 0) -> Tuple[int, int]:
+    """
+    Run write_m3u/write_xmltv only for artifacts whose inputs changed. Returns (m3u_count, xml_ch_count).
+    `metrics` (mls_metrics.RunMetrics) gets a write_m3u / write_xmltv stage each.
+    lineup > 0 packs events onto that many reusable channels (allocate_lineup).
+    """
+    return export_segments_incremental([(summaries, group, base_ch)], out_m3u, out_xml, manifest_path,
+                                       force=force, placeholder_max_age=placeholder_max_age, now=now,
+                                       precompress=precompress, metrics=metrics, stage_prefix=stage_prefix,
+                                       lineup=lineup)
+
+def export_segments_incremental(segments: List[Segment], out_m3u: Path, out_xml: Path,
+                                manifest_path: Path, force: bool = False,
+                                placeholder_max_age: timedelta = timedelta(hours=12),
+                                now: Optional[datetime] = None, precompress: bool = True,
+                                metrics=None, stage_prefix: str = "", lineup: int = 0) -> Tuple[int, int]:
+    """export_incremental for several channel segments sharing one playlist/guide (the combined outputs)."""
+    def _stage(name):
+        return metrics.stage(stage_prefix + name) if metrics is not None else nullcontext({})
+
+    now = now or datetime.now(timezone.utc)
+    anchor = placeholder_anchor(now)
+    manifest = {} if force else load_manifest(manifest_path)
+    segments_key = [[_stable_hash([s.to_dict() for s in summaries]), group, base_ch]
+                    for summaries, group, base_ch in segments]
+    # Lineup channels stream whichever game is live/next, so the playlist also depends on the
+    # clock: key it on the rendered entries (URL and logo), which are cheap to produce
+    now_entries = []
+    if lineup:
+        now_ts = int(now.timestamp())
+        for summaries, group, base_ch in segments:
+            slots = allocate_lineup(summaries, lineup, now_ts)
+            if len(slots) > lineup:
+                print(f"⚠️  lineup {group}: {len(slots)} concurrent games need more than {lineup} channels; added {len(slots) - lineup}")
+            now_entries.append(_m3u_lineup_entries(slots, group, base_ch, now_ts))
+
+    m3u_key = _manifest_key(out_m3u, manifest_path)
+    m3u_inputs = _stable_hash(["m3u", segments_key, lineup, now_entries, _code_fingerprint()])
+    prev = manifest.get(m3u_key) or {}
+    with _stage("write_m3u") as rec:
+        if prev.get("inputs") == m3u_inputs and out_m3u.exists():
+            m3u_count = int(prev.get("count", 0))
+            rec["skipped"] = 1
+            print(f"📺 M3U inputs unchanged, skipped: {out_m3u.resolve()}  (entries={m3u_count})")
+        else:
+            m3u_count = write_m3u_segments(segments, out_m3u, lineup=lineup, now=now)
+            manifest[m3u_key] = {"inputs": m3u_inputs, "count": m3u_count}
+            rec["skipped"] = 0
+        rec["entries"] = m3u_count
+        rec["bytes"] = out_m3u.stat().st_size if out_m3u.exists() else 0
+
+    xml_key = _manifest_key(out_xml, manifest_path)
+    xml_inputs = _stable_hash(["xmltv", segments_key, lineup, _code_fingerprint()])
+    prev = manifest.get(xml_key) or {}
+    prev_anchor = parse_event_time(prev.get("anchor") or "")
+    anchor_ok = prev_anchor is not None and prev_anchor <= anchor and (anchor - prev_anchor) <= placeholder_max_age
+    with _stage("write_xmltv") as rec:
+        if prev.get("inputs") == xml_inputs and anchor_ok and out_xml.exists():
+            xml_ch_count = int(prev.get("count", 0))
+            rec["skipped"] = 1
+            print(f"🗓️  XMLTV inputs unchanged, skipped: {out_xml.resolve()}  (placeholders from {prev.get('anchor')})")
+        else:
+            xml_ch_count = write_xmltv_segments(segments, out_xml, now=now, lineup=lineup)
+            manifest[xml_key] = {"inputs": xml_inputs, "count": xml_ch_count, "anchor": anchor.isoformat()}
+            rec["skipped"] = 0
+        rec["channels"] = xml_ch_count
+        rec["bytes"] = out_xml.stat().st_size if out_xml.exists() else 0
+
+    save_manifest(manifest_path, manifest)
+    if precompress:
+        with _stage("precompress"):
+            for path in (out_m3u, out_xml):
+                for sib in write_compressed_siblings(path):
+                    print(f"🗜️  wrote {sib.name}: {sib.stat().st_size} bytes")
+    return m3u_count, xml_ch_count
 
 # -------------------- CLI --------------------
 
+def export_counts(rows: List[Match]) -> Dict[str, int]:
+    """Funnel counts: raw -> live -> live with teams -> with a playable URL."""
+    def _down(v):
+        return (v or '').lower()
+    live_rows = [r for r in rows if _down(r.airing_type) == 'live']
+    live_with_teams = [r for r in live_rows if (r.team1_name or '').strip() and (r.team2_name or '').strip()]
+    with_url = [r for r in live_with_teams if (r.deep_link or r.url or '').strip()]
+    return {"raw": len(rows), "live": len(live_rows), "live_with_teams": len(live_with_teams), "with_url": len(with_url)}
+
+def print_export_summary(rows: List[Match], m3u_count: int, xml_ch_count: int) -> None:
+    c = export_counts(rows)
+    print('\n' + '='*70)
+    print(' SUMMARY (Export)')
+    print('='*70)
+    print(f'📚 Raw matches from API: {c["raw"]}')
+    print(f'🔎 Live only:            {c["live"]}')
+    print(f'✅ Live with teams:      {c["live_with_teams"]}')
+    print(f'🔗 With a playable URL:  {c["with_url"]}')
+    print('-'*70)
+    print(f'📺 M3U entries written:  {m3u_count}')
+    print(f'🗓️  XMLTV channels:       {xml_ch_count}  (programmes vary with placeholders)')
+
 from pathlib import Path
 def main():
     ap = argparse.ArgumentParser(description="MLS Apple TV — Exporter (v0.9 placeholders with desc)")
@@ -536,41 +1047,45 @@ def main():
     ap.add_argument("--src", default=str(OUT_DIR / 'mls_schedule.json'))
     ap.add_argument("--out-json", default=str(OUT_DIR / 'mls_deeplinks_preview.json'))
     ap.add_argument("--out-m3u",  default=str(OUT_DIR / 'mls.m3u'))
-    ap.add_argument("--out-xml",  default=str(OUT_DIR / 'guide.xml'))
+    ap.add_argument("--out-xml",  default=str(OUT_DIR / 'guide.xml'), help="XMLTV path; a .gz suffix writes a gzip stream")
     ap.add_argument("--out-xlsx", default="mls_deeplinks_preview.xlsx")
     ap.add_argument("--group", default="MLS")
     ap.add_argument("--base-ch", type=int, default=9910)
     ap.add_argument("--raw-canvas", default=str(OUT_DIR / 'raw_canvas.json'))
     ap.add_argument("--preview", action="store_true", help="Also write preview JSON")
+    ap.add_argument("--hero-stream", action="store_true", help="Scan raw canvas incrementally (bounded memory) for hero descriptions")
+    ap.add_argument("--hero-fuzzy-threshold", type=float, default=HERO_FUZZY_THRESHOLD, help="Min IDF-weighted token overlap (0-1) each team must reach for a fuzzy hero match, e.g. 0.8; 0 (default) disables")
+    ap.add_argument("--manifest", default=str(OUT_DIR / '.export_manifest.json'))
+    ap.add_argument("--force", action="store_true", help="Regenerate every artifact even if its inputs are unchanged")
+    ap.add_argument("--placeholder-max-age", type=float, default=12, help="Hours an unchanged guide's placeholder window may age before it is rebuilt")
+    ap.add_argument("--no-precompress", action="store_true", help="Do not write .gz/.br siblings for NGINX")
+    ap.add_argument("--lineup", type=int, default=0, help="Pack events onto N reusable channels instead of one channel per event (0 = off)")
+    ap.add_argument("--pretty-json", action="store_true", help="Indent the preview JSON (default compact)")
+    ap.add_argument("--event-store", help="Read matches from this SQLite event store (mls_store.py) instead of --src")
+    ap.add_argument("--store-channel", default="mls", help="Channel slug to read from --event-store")
+    ap.add_argument("--store-lookback-hours", type=float, default=12, help="Besides the last listed events, include unlisted ones that already kicked off and ended less than this long ago")
     args = ap.parse_args()
 
-    hero_by_umc, hero_by_title = load_hero_maps(Path(args.raw_canvas))
-    matches = load_matches(Path(args.src))
-    summaries, playables = build_rows_from_scrapeonly(matches, hero_by_umc, hero_by_title)
+    hero_by_umc, hero_by_title = load_hero_maps(Path(args.raw_canvas), streaming=args.hero_stream)
+    if args.event_store:
+        from mls_store import EventStore
+        with EventStore(Path(args.event_store)) as store:
+            now_ts = int(time.time())
+            matches = store.backfill(args.store_channel, store.last_seen(args.store_channel) or now_ts,
+                                     now_ts - int(args.store_lookback_hours * 3600), include_listed=True)
+    else:
+        matches = load_matches(Path(args.src))
+    summaries, playables = build_rows_from_scrapeonly(matches, hero_by_umc, hero_by_title, args.hero_fuzzy_threshold)
     if args.preview:
-        write_json(summaries, playables, Path(args.out_json))
-    m3u_count = write_m3u(summaries, Path(args.out_m3u), args.group, args.base_ch)
-    xml_ch_count = write_xmltv(summaries, Path(args.out_xml), args.base_ch, args.group)
+        write_json(summaries, playables, Path(args.out_json), pretty=args.pretty_json)
+    m3u_count, xml_ch_count = export_incremental(
+        summaries, Path(args.out_m3u), Path(args.out_xml), args.group, args.base_ch,
+        Path(args.manifest), force=args.force, placeholder_max_age=timedelta(hours=args.placeholder_max_age),
+        precompress=not args.no_precompress, lineup=max(0, args.lineup))
 
     # --- Clear, step-by-step summary to align expectations ---
     try:
-        rows = json.loads(Path(args.src).read_text(encoding='utf-8'))
-        total_raw = len(rows)
-        def _down(v):
-            return (v or '').lower()
-        live_rows = [r for r in rows if _down(r.get('airing_type')) == 'live']
-        live_with_teams = [r for r in live_rows if (r.get('team1_name') or '').strip() and (r.get('team2_name') or '').strip()]
-        with_url = [r for r in live_with_teams if (r.get('deep_link') or r.get('url') or '').strip()]
-        print('\n' + '='*70)
-        print(' SUMMARY (Export)')
-        print('='*70)
-        print(f'📚 Raw matches from API: {total_raw}')
-        print(f'🔎 Live only:            {len(live_rows)}')
-        print(f'✅ Live with teams:      {len(live_with_teams)}')
-        print(f'🔗 With a playable URL:  {len(with_url)}')
-        print('-'*70)
-        print(f'📺 M3U entries written:  {m3u_count}')
-        print(f'🗓️  XMLTV channels:       {xml_ch_count}  (programmes vary with placeholders)')
+        print_export_summary(matches, m3u_count, xml_ch_count)
         print('\nFiles created:')
         print('  📄 mls_schedule.json - All match data')
         print('  📄 raw_canvas.json   - Raw API response')
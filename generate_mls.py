@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MLS Deeplink — single-process pipeline
+======================================
+scrape -> parse -> transform -> M3U/XMLTV in one interpreter.
+
+The parsed matches and canvas are handed straight from MLSAPIClient to the
+exporter; nothing is serialised and read back. mls_schedule.json and
+raw_canvas.json are only written with --write-json (debug / served copies).
+
+Each run records per-stage timings and counts to run_metrics.json and
+metrics.prom (Prometheus text format) in the output directory.
+
+Every channel in --channels (mls_channels.py; MLS Season Pass by default)
+is fetched concurrently over one shared session and exported to its own
+M3U/XMLTV and channel-number range; with several channels all.m3u /
+all_guide.xml merge them.
+
+Runs are built in a staging release and published with one symlink swap
+(mls_publish.py), so clients never see a half-written or mismatched
+M3U/XMLTV pair; --keep-releases 0 writes straight into --out-dir instead.
+
+Parsed matches are upserted into a persistent SQLite event store
+(mls_store.py) and the guide is built from every listed match plus the
+stored ones that already kicked off and ended less than
+--store-lookback-hours ago, so games Apple stops listing mid-match keep their
+guide entries until they are over; future events that drop off the canvas
+(cancelled or rescheduled) are not backfilled.
+
+Every fetched canvas is also kept in a compressed, content-addressed snapshot
+archive (mls_archive.py) so earlier runs can be inspected or replayed.
+
+With --art-base-url / ART_BASE_URL the posters are mirrored into <out>/art/
+(mls_art.py) and the M3U/XMLTV icons point at the local copies.
+
+run() accepts an existing MLSAPIClient so a resident process (mls_scheduler.py
+--daemon) can reuse one warm session and response cache across refreshes.
+"""
+
+import os, time, argparse
+from datetime import timedelta
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import scrape_mls_schedule as scraper
+import export_mls_outputs as exporter
+from mls_channels import Channel, COMBINED_M3U, COMBINED_XML, check_ranges, load_channels
+from mls_metrics import RunMetrics
+from mls_publish import KEEP_RELEASES, Publisher
+from mls_archive import SnapshotArchive, archive_from_env
+from mls_art import ArtMirror, mirror_from_env
+from mls_store import EventStore, STORE_NAME
+
+
+def build_client(args: argparse.Namespace) -> scraper.MLSAPIClient:
+    """One client whose session/cache every configured channel shares (pool sized for all of them)."""
+    return scraper.client_from_args(args, channels=len(_channels(args)))
+
+
+def _channels(args: argparse.Namespace) -> List[Channel]:
+    return load_channels(args.channels, group=args.group, base_ch=args.base_ch)
+
+
+def run(args: argparse.Namespace, client: Optional[scraper.MLSAPIClient] = None) -> int:
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    metrics = RunMetrics()
+    publisher = Publisher(out_dir, keep=args.keep_releases) if args.keep_releases > 0 else None
+    work_dir = publisher.stage() if publisher else out_dir
+    store = None if args.no_event_store else EventStore(Path(args.event_store or out_dir / STORE_NAME))
+    archive = None if args.no_archive else archive_from_env(out_dir)
+    art = mirror_from_env(out_dir, args.art_base_url)
+    ok = False
+    try:
+        ok = _run(args, work_dir, metrics, client or build_client(args), store, archive, art)
+    finally:
+        if store:
+            store.close()
+        if publisher:
+            if ok:
+                with metrics.stage("publish") as rec:
+                    version = publisher.publish(work_dir)
+                    rec.update(version=version or "", unchanged=int(version is None), live=publisher.current() or "")
+                if version is None:
+                    print(f"🟰 Artifacts unchanged; no new release (live: {publisher.current() or '(none)'})")
+                elif publisher.current() == version:
+                    print(f"🚀 Published release {version} -> {out_dir / 'current'}")
+            else:
+                publisher.discard(work_dir)
+                print(f"↩️  Run failed; live release {publisher.current() or '(none)'} left in place")
+        metrics.finish(ok)
+        if not args.no_metrics:
+            metrics.write(out_dir)
+    return 0 if ok else 1
+
+
+def _run(args: argparse.Namespace, out_dir: Path, metrics: RunMetrics, client: scraper.MLSAPIClient,
+         store: Optional[EventStore] = None, archive: Optional[SnapshotArchive] = None,
+         art: Optional[ArtMirror] = None) -> bool:
+    SYM = scraper._symbols(use_emoji=not args.no_emoji)
+    channels = _channels(args)
+    multi = len(channels) > 1
+    clients = [client.for_channel(ch.id, ch.referer_url) for ch in channels]
+
+    # Fetch every canvas concurrently over the shared session
+    print(f"Fetching {', '.join(ch.name or ch.slug for ch in channels)} channel data...")
+    canvases: List[Optional[dict]] = [None] * len(channels)
+    with metrics.stage("fetch") as fetch_rec:
+        with ThreadPoolExecutor(max_workers=len(channels)) as pool:
+            futures = {pool.submit(c.get_channel_canvas, not args.no_paginate): i for i, c in enumerate(clients)}
+            for fut in as_completed(futures):
+                canvases[futures[fut]] = fut.result()
+
+    segments: List[exporter.Segment] = []
+    counts: Dict[str, int] = {}
+    ok = True
+    for ch, c, canvas in zip(channels, clients, canvases):
+        prefix = f"{ch.slug}." if multi else ""
+        if multi:
+            print(f"\n{SYM['trophy']} {ch.name or ch.slug} ({ch.id})")
+        ts = c.stats.summary()
+        fields = dict(http_status=c.canvas_status or 0, cache=c.canvas_cache, bytes=ts["bytes"],
+                      requests=ts["requests"], retries=ts["retries"], failures=ts["failures"],
+                      latency_p95_s=ts["latency_p95_s"])
+        if multi:
+            metrics.record(prefix + "fetch", **fields)
+        else:
+            fetch_rec.update(fields)
+        scraper.print_transport_summary(c, SYM)
+        if not canvas:
+            print(f"{SYM['err']} Failed to fetch data for {ch.slug}")
+            ok = False
+            continue
+        if archive:
+            with metrics.stage(prefix + "archive") as rec:
+                snap = archive.put(canvas, ch.slug)
+                rec.update(new=int(snap.new), bytes=snap.bytes, raw_bytes=snap.raw_bytes)
+            state = "stored" if snap.new else "unchanged, deduplicated"
+            print(f"{SYM['file']} Snapshot {snap.sha256[:12]} ({state}; {snap.bytes // 1024} KiB of {snap.raw_bytes // 1024} KiB)")
+        summaries, xml_ch_count = _export_channel(args, out_dir, metrics, SYM, ch, canvas, c, prefix, store, art)
+        segments.append((summaries, ch.group, ch.base_ch))
+        counts[ch.slug] = xml_ch_count
+
+    if archive:
+        with metrics.stage("archive_prune") as rec:
+            rec.update(archive.prune())
+    for warning in check_ranges(counts, channels):
+        print(f"{SYM['err']} Channel numbers overlap: {warning}")
+    if multi and ok:
+        print(f"\n{SYM['book']} Combined guide ({len(segments)} channels)")
+        exporter.export_segments_incremental(
+            segments, out_dir / COMBINED_M3U, out_dir / COMBINED_XML, out_dir / '.export_manifest.json',
+            force=args.force, placeholder_max_age=timedelta(hours=args.placeholder_max_age),
+            precompress=not args.no_precompress, metrics=metrics, stage_prefix="combined.", lineup=max(0, args.lineup))
+    elif multi:
+        print(f"{SYM['info']} Some channels failed; keeping the previous {COMBINED_M3U} / {COMBINED_XML}")
+    return ok
+
+
+def _export_channel(args: argparse.Namespace, out_dir: Path, metrics: RunMetrics, SYM: Dict[str, str],
+                    ch: Channel, canvas: dict, client: scraper.MLSAPIClient, prefix: str,
+                    store: Optional[EventStore] = None, art: Optional[ArtMirror] = None) -> Tuple[List, int]:
+    with metrics.stage(prefix + "parse_canvas") as rec:
+        matches = scraper.sort_matches(client.parse_canvas(canvas))
+        rec["matches"] = len(matches)
+    print(f"{SYM['done']} Found {len(matches)} unique matches")
+
+    if store:
+        with metrics.stage(prefix + "event_store") as rec:
+            seen_at = int(time.time())
+            rec.update(store.upsert(ch.slug, matches, seen_at))
+            # Listed matches are kept as parsed; the store only adds events Apple stopped listing
+            backfill = store.backfill(ch.slug, seen_at, seen_at - int(args.store_lookback_hours * 3600))
+            matches = scraper.sort_matches(matches + backfill)
+            rec.update(window=len(matches), backfilled=len(backfill))
+        print(f"{SYM['file']} Event store: {rec['inserted']} new, {rec['updated']} changed, "
+              f"{rec['window']} in window ({rec['backfilled']} no longer listed)")
+
+    if args.write_json:
+        with metrics.stage(prefix + "write_json") as rec:
+            written = [(out_dir / ch.raw_canvas, exporter.write_json_artifact(out_dir / ch.raw_canvas, canvas, args.pretty_json)),
+                       (out_dir / ch.schedule, exporter.write_json_artifact(out_dir / ch.schedule,
+                                                                            [m.to_dict() for m in matches], args.pretty_json))]
+            rec.update(bytes=sum(r["bytes"] for _, r in written), serialize_s=sum(r["serialize_s"] for _, r in written))
+            if not args.no_precompress:
+                for name in (ch.raw_canvas, ch.schedule):
+                    exporter.write_compressed_siblings(out_dir / name)
+        for path, res in written:
+            print(f"{SYM['file']} Saved: {exporter.describe_json_write(path, res, args.pretty_json)}")
+
+    with metrics.stage(prefix + "hero_maps") as rec:
+        hero_by_umc, hero_by_title = exporter.build_hero_maps(canvas)
+        rec.update(by_umc=len(hero_by_umc), by_title=len(hero_by_title))
+    with metrics.stage(prefix + "transform") as rec:
+        summaries, playables = exporter.build_rows_from_scrapeonly(matches, hero_by_umc, hero_by_title,
+                                                                   args.hero_fuzzy_threshold)
+        rec.update(exporter.export_counts(matches), summaries=len(summaries),
+                   with_hero=sum(1 for s in summaries if s.hero_description))
+    if art:
+        with metrics.stage(prefix + "artwork") as rec:
+            local = art.rewrite(summaries, art.prefetch(s.icon_url for s in summaries))
+            rec.update(art.stats, local=local)
+        st = art.stats
+        print(f"🖼️  Artwork: {local}/{len(summaries)} icons served locally ({st['fetched']} fetched, "
+              f"{st['revalidated']} revalidated, {st['fresh']} fresh, {st['failed'] + st['broken']} failed, "
+              f"{st['evicted']} evicted)")
+    if args.preview:
+        exporter.write_json(summaries, playables, out_dir / f"{Path(ch.m3u).stem}_deeplinks_preview.json", args.pretty_json)
+    m3u_count, xml_ch_count = exporter.export_incremental(
+        summaries, out_dir / ch.m3u, out_dir / ch.xml, ch.group, ch.base_ch,
+        out_dir / '.export_manifest.json', force=args.force,
+        placeholder_max_age=timedelta(hours=args.placeholder_max_age),
+        precompress=not args.no_precompress, metrics=metrics, stage_prefix=prefix, lineup=max(0, args.lineup))
+
+    exporter.print_export_summary(matches, m3u_count, xml_ch_count)
+    return summaries, xml_ch_count
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="MLS Apple TV — single-process scrape + export")
+    ap.add_argument("--out-dir", default=os.environ.get("OUTPUT_DIR") or str(scraper.OUT_DIR))
+    ap.add_argument("--channels", default=os.environ.get("CHANNELS_FILE") or None,
+                    help="JSON channel list (see mls_channels.py); default is MLS Season Pass only")
+    ap.add_argument("--group", default=None, help="M3U group for the default MLS channel (default MLS)")
+    ap.add_argument("--base-ch", type=int, default=None, help="First channel number (default 9910)")
+    ap.add_argument("--write-json", action="store_true", help="Also write raw_canvas.json and mls_schedule.json")
+    ap.add_argument("--preview", action="store_true", help="Also write preview JSON")
+    ap.add_argument("--pretty-json", action="store_true", default=bool(os.environ.get("PRETTY_JSON")),
+                    help="Indent the JSON artifacts for reading (default compact)")
+    ap.add_argument("--no-emoji", action="store_true", help="Use ASCII-only symbols")
+    ap.add_argument("--force", action="store_true", help="Regenerate every artifact even if its inputs are unchanged")
+    ap.add_argument("--placeholder-max-age", type=float, default=12, help="Hours an unchanged guide's placeholder window may age before it is rebuilt")
+    ap.add_argument("--no-precompress", action="store_true", help="Do not write .gz/.br siblings for NGINX")
+    ap.add_argument("--lineup", type=int, default=int(os.environ.get("LINEUP_CHANNELS") or 0),
+                    help="Pack events onto N reusable channels per source instead of one channel per event (0 = off)")
+    ap.add_argument("--hero-fuzzy-threshold", type=float, default=exporter.HERO_FUZZY_THRESHOLD, help="Min IDF-weighted token overlap (0-1) each team must reach for a fuzzy hero match, e.g. 0.8; 0 (default) disables")
+    ap.add_argument("--keep-releases", type=int, default=int(os.environ.get("KEEP_RELEASES") or KEEP_RELEASES),
+                    help="Build each run in releases/<version> and publish it with an atomic symlink swap, keeping this many (0 = write in place)")
+    ap.add_argument("--event-store", default=os.environ.get("EVENT_STORE") or None,
+                    help=f"SQLite event store (default <out-dir>/{STORE_NAME})")
+    ap.add_argument("--no-event-store", action="store_true", help="Export the fetched canvas only; do not merge with stored events")
+    ap.add_argument("--store-lookback-hours", type=float, default=12,
+                    help="Stored events no longer listed that already kicked off stay in the guide until they ended this long ago")
+    ap.add_argument("--no-archive", action="store_true", help="Do not keep a compressed snapshot of each fetched canvas")
+    ap.add_argument("--art-base-url", default=os.environ.get("ART_BASE_URL") or None,
+                    help="Mirror posters into <out-dir>/art and point icons at this URL (e.g. http://host:8096/art)")
+    ap.add_argument("--no-metrics", action="store_true", help="Do not write run_metrics.json / metrics.prom")
+    scraper.add_client_args(ap)
+    return ap
+
+
+def main():
+    args = build_parser().parse_args()
+    scraper.force_utf8_stdout()
+    raise SystemExit(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Raw canvas snapshot archive.
+
+Every fetched canvas is kept as compact JSON, compressed (zstd when the
+zstandard package is installed, else gzip) and stored once per content hash:
+
+    <root>/objects/ab/ab12…ef.json.gz   one file per distinct canvas
+    <root>/index.jsonl                  one line per run: when, channel, sha256, object
+
+An unchanged canvas only adds an index line. Retention drops index lines
+older than max_age_days, then the oldest ones while the objects exceed
+max_mb (each channel's newest snapshot always stays), and deletes objects
+no line references any more.
+
+open_text() / read_snapshot() open any snapshot (.json, .json.gz, .json.zst)
+as a stream, so load_hero_maps and replay tooling read archived canvases
+directly:
+
+    python mls_archive.py list [--channel mls]
+    python mls_archive.py extract latest|<sha256 prefix>|<ISO time> [-o raw_canvas.json]
+"""
+
+import io, os, sys, json, gzip, hashlib, argparse
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, TextIO
+
+import mls_json
+
+try:  # optional: smaller/faster snapshots when installed
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_DIR = ".state/snapshots"
+MAX_AGE_DAYS = 30
+MAX_MB = 256
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    when: str
+    channel: str
+    sha256: str
+    object: str          # path relative to the archive root
+    bytes: int           # compressed size
+    raw_bytes: int
+    new: bool = False    # stored by this put() (False: content already archived)
+
+
+def open_text(path: Path) -> TextIO:
+    """Text stream over a canvas file, transparently decompressing .gz / .zst."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError(f"{path}: zstd snapshot but the zstandard package is not installed")
+        raw = open(path, "rb")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True), encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def read_snapshot(path: Path) -> Any:
+    path = Path(path)
+    if path.suffix not in (".gz", ".zst"):
+        return mls_json.load(path)
+    with open_text(path) as f:
+        return mls_json.loads(f.read())
+
+
+class SnapshotArchive:
+    def __init__(self, root: Path, max_age_days: float = MAX_AGE_DAYS, max_mb: float = MAX_MB):
+        self.root = Path(root)
+        self.max_age = timedelta(days=max_age_days) if max_age_days > 0 else None
+        self.max_bytes = int(max_mb * 1024 * 1024) if max_mb > 0 else None
+        self.index = self.root / "index.jsonl"
+
+    # ---- write ----
+    def put(self, canvas: Any, channel: str = "mls", when: Optional[datetime] = None) -> Snapshot:
+        """Archive one canvas; returns its Snapshot (new=False when the content was already stored)."""
+        data = mls_json.dumps(canvas)
+        # The content key must not depend on the installed JSON backend (orjson and
+        # stdlib spell some floats differently), so it hashes stdlib's serialization;
+        # with the stdlib backend that is exactly `data`, so only orjson pays a second dump
+        canonical = data if mls_json.BACKEND == "json" else \
+            json.dumps(canvas, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(canonical).hexdigest()
+        existing = next(self.root.glob(f"objects/{digest[:2]}/{digest}.json.*"), None)
+        new = existing is None
+        if new:
+            suffix, blob = (".zst", zstandard.ZstdCompressor(level=10).compress(data)) if zstandard is not None \
+                else (".gz", gzip.compress(data, compresslevel=6, mtime=0))
+            existing = self.root / "objects" / digest[:2] / f"{digest}.json{suffix}"
+            existing.parent.mkdir(parents=True, exist_ok=True)
+            tmp = existing.with_name(f".{existing.name}.tmp")
+            tmp.write_bytes(blob)
+            os.replace(tmp, existing)
+        snap = Snapshot(when=(when or datetime.now(timezone.utc)).isoformat(timespec="seconds"),
+                        channel=channel, sha256=digest, object=existing.relative_to(self.root).as_posix(),
+                        bytes=existing.stat().st_size, raw_bytes=len(data), new=new)
+        with open(self.index, "a", encoding="utf-8") as f:
+            row = snap.__dict__.copy(); row.pop("new")
+            f.write(json.dumps(row, separators=(",", ":")) + "\n")
+        return snap
+
+    # ---- read ----
+    def entries(self, channel: Optional[str] = None) -> List[Snapshot]:
+        """Index lines, oldest first."""
+        out = []
+        try:
+            with open(self.index, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        snap = Snapshot(**json.loads(line))
+                    except (ValueError, TypeError):
+                        continue
+                    if channel is None or snap.channel == channel:
+                        out.append(snap)
+        except FileNotFoundError:
+            pass
+        return out
+
+    def find(self, ref: str = "latest", channel: Optional[str] = None) -> Optional[Snapshot]:
+        """'latest', a sha256 prefix, or an ISO time (the snapshot current at that time)."""
+        snaps = self.entries(channel)
+        if not snaps:
+            return None
+        if ref == "latest":
+            return snaps[-1]
+        matches = [s for s in snaps if s.sha256.startswith(ref.lower())]
+        if matches:
+            return matches[-1]
+        try:
+            at = datetime.fromisoformat(ref.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if at.tzinfo is None:
+            at = at.astimezone()
+        before = [s for s in snaps if datetime.fromisoformat(s.when) <= at]
+        return before[-1] if before else None
+
+    def path(self, snap: Snapshot) -> Path:
+        return self.root / snap.object
+
+    # ---- retention ----
+    def prune(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Apply age/size retention; returns counts of dropped index lines / objects and freed bytes."""
+        snaps = self.entries()
+        if not snaps:
+            return {"entries": 0, "objects": 0, "bytes": 0}
+        now = now or datetime.now(timezone.utc)
+        newest = {s.channel: s for s in snaps}            # last line per channel always stays
+        keep_always = set(id(s) for s in newest.values())
+        kept = [s for s in snaps if id(s) in keep_always or self.max_age is None
+                or now - datetime.fromisoformat(s.when) <= self.max_age]
+        sizes = {s.object: s.bytes for s in kept}
+        if self.max_bytes is not None:
+            total = sum(sizes.values())
+            while total > self.max_bytes:
+                victim = next((s for s in kept if id(s) not in keep_always), None)
+                if victim is None:
+                    break
+                kept.remove(victim)
+                if all(s.object != victim.object for s in kept):
+                    total -= sizes.pop(victim.object, 0)
+        dropped_lines = len(snaps) - len(kept)
+        live = {s.object for s in kept}
+        removed = freed = 0
+        for obj in self.root.glob("objects/*/*.json.*"):
+            rel = obj.relative_to(self.root).as_posix()
+            if rel not in live and not obj.name.startswith("."):
+                freed += obj.stat().st_size
+                obj.unlink()
+                removed += 1
+        if dropped_lines:
+            tmp = self.index.with_name(".index.jsonl.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                for s in kept:
+                    row = s.__dict__.copy(); row.pop("new")
+                    f.write(json.dumps(row, separators=(",", ":")) + "\n")
+            os.replace(tmp, self.index)
+        return {"entries": dropped_lines, "objects": removed, "bytes": freed}
+
+
+def archive_from_env(out_dir: Path) -> SnapshotArchive:
+    return SnapshotArchive(Path(os.environ.get("SNAPSHOT_DIR") or Path(out_dir) / ARCHIVE_DIR),
+                           float(os.environ.get("SNAPSHOT_MAX_AGE_DAYS") or MAX_AGE_DAYS),
+                           float(os.environ.get("SNAPSHOT_MAX_MB") or MAX_MB))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Inspect / extract archived raw canvas snapshots")
+    ap.add_argument("--out-dir", default=os.environ.get("OUTPUT_DIR") or str(Path(__file__).parent / "out"))
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ls = sub.add_parser("list", help="Show archived snapshots, oldest first")
+    ls.add_argument("--channel")
+    ex = sub.add_parser("extract", help="Write one snapshot as plain JSON")
+    ex.add_argument("ref", nargs="?", default="latest", help="latest, a sha256 prefix or an ISO time")
+    ex.add_argument("--channel", default="mls")
+    ex.add_argument("-o", "--output", help="Output file (default stdout)")
+    args = ap.parse_args()
+
+    archive = archive_from_env(Path(args.out_dir))
+    if args.cmd == "list":
+        snaps = archive.entries(args.channel)
+        for s in snaps:
+            print(f"{s.when}  {s.channel:<10} {s.sha256[:12]}  {s.bytes / 1024:8.1f} KiB  (raw {s.raw_bytes / 1024:.0f} KiB)")
+        objects = {s.object: s.bytes for s in snaps}
+        print(f"📦 {len(snaps)} snapshots, {len(objects)} distinct, {sum(objects.values()) / 1024 / 1024:.1f} MiB stored")
+    elif args.cmd == "extract":
+        snap = archive.find(args.ref, args.channel)
+        if snap is None:
+            print(f"❌ no snapshot matches {args.ref!r}", file=sys.stderr); sys.exit(1)
+        with open_text(archive.path(snap)) as f:
+            if args.output:
+                with open(args.output, "w", encoding="utf-8") as out:
+                    for chunk in iter(lambda: f.read(1 << 16), ""):
+                        out.write(chunk)
+                print(f"📄 {snap.when} {snap.sha256[:12]} -> {args.output}")
+            else:
+                for chunk in iter(lambda: f.read(1 << 16), ""):
+                    sys.stdout.write(chunk)
+
+
+if __name__ == "__main__":
+    main()
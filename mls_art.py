@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local artwork mirror (optional).
+
+Without it every tvg-logo / XMLTV <icon> points at Apple's CDN, so every
+client on the network fetches every poster upstream. With ART_BASE_URL set
+(e.g. http://myhost.local:8096/art) the pipeline prefetches the resolved
+800x600 images into <out>/art/ and rewrites icon URLs to the local copies:
+
+- fetched concurrently through a bounded pool (ART_WORKERS)
+- files younger than ART_REVALIDATE_H are reused as-is; older ones are
+  revalidated with If-None-Match / If-Modified-Since (mostly 304s)
+- the directory is capped at ART_MAX_MB, evicting least recently used files
+- an image that fails with 4xx (or is not an image) gets no icon, so clients
+  show their own fallback instead of a blank tile; on network / 5xx errors
+  the previous copy, else the upstream URL, is used
+
+State (validators, last use) lives in <out>/art/.index.json. The CDN host
+is arbitrary, so tests can point summaries at a local stand-in server.
+"""
+
+import os, time, hashlib, threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import mls_json
+from mls_models import Summary
+
+ART_DIR = "art"
+ART_WORKERS = 8
+ART_MAX_MB = 200
+ART_REVALIDATE_H = 24
+_EXTS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+class ArtMirror:
+    def __init__(self, root: Path, base_url: str, max_mb: float = ART_MAX_MB, workers: int = ART_WORKERS,
+                 revalidate_h: float = ART_REVALIDATE_H, timeout: float = 15.0,
+                 session: Optional[requests.Session] = None):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+        self.max_bytes = int(max_mb * 1024 * 1024) if max_mb > 0 else None
+        self.workers = max(1, workers)
+        self.revalidate_s = revalidate_h * 3600
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=self.workers))
+            session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=self.workers))
+        self.session = session
+        self.index_path = self.root / ".index.json"
+        self.lock = threading.Lock()
+        self.started = time.time()      # files used since then are never evicted
+        self.stats: Dict[str, int] = {}
+        try:
+            self.index: Dict[str, dict] = mls_json.load(self.index_path)
+        except (OSError, ValueError):
+            self.index = {}
+
+    @staticmethod
+    def local_name(url: str) -> str:
+        ext = os.path.splitext(urlsplit(url).path)[1].lower()
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()[:24] + (ext if ext in _EXTS else ".jpg")
+
+    def local_url(self, name: str) -> str:
+        return f"{self.base_url}/{name}"
+
+    # ---- fetch ----
+    def _fetch(self, url: str, now: float) -> Dict:
+        """Make sure `url` is mirrored; returns {"name", "status"} (status: fresh/fetched/revalidated/kept/failed/broken)."""
+        name = self.local_name(url)
+        path = self.root / name
+        with self.lock:
+            meta = dict(self.index.get(name) or {})
+        have = path.exists() and bool(meta)
+        if have and now - meta.get("checked", 0) < self.revalidate_s:
+            return {"name": name, "status": "fresh"}
+        headers = {}
+        if have and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if have and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            r = self.session.get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException:
+            return {"name": name, "status": "kept" if have else "failed"}
+        if r.status_code == 304 and have:
+            meta["checked"] = now
+            status = "revalidated"
+        elif r.status_code == 200 and r.headers.get("Content-Type", "image/").lower().startswith("image/"):
+            tmp = path.with_name(f".{name}.tmp")
+            tmp.write_bytes(r.content)
+            os.replace(tmp, path)
+            meta = {"url": url, "etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified"),
+                    "bytes": len(r.content), "checked": now}
+            status = "fetched"
+        elif r.status_code >= 500 or r.status_code == 429:
+            return {"name": name, "status": "kept" if have else "failed"}
+        else:
+            return {"name": name, "status": "broken"}
+        with self.lock:
+            self.index[name] = meta
+        return {"name": name, "status": status}
+
+    def prefetch(self, urls: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Mirror every distinct URL; returns url -> icon URL to publish (local URL,
+        the upstream URL on a transient failure, or None for a broken image).
+        Stats of the last call are in self.stats.
+        """
+        now = time.time()
+        todo = sorted({u for u in urls if u})
+        mapping: Dict[str, Optional[str]] = {}
+        stats = {k: 0 for k in ("fresh", "fetched", "revalidated", "kept", "failed", "broken")}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for url, res in zip(todo, pool.map(lambda u: self._fetch(u, now), todo)):
+                stats[res["status"]] += 1
+                if res["status"] == "broken":
+                    mapping[url] = None
+                elif res["status"] == "failed":
+                    mapping[url] = url
+                else:
+                    mapping[url] = self.local_url(res["name"])
+                    with self.lock:
+                        self.index[res["name"]]["used"] = now
+        stats.update(self.evict())
+        self.save()
+        self.stats = stats
+        return mapping
+
+    # ---- cache housekeeping ----
+    def evict(self) -> Dict[str, int]:
+        """Drop least recently used files until under max_bytes (never ones this mirror used), and orphans."""
+        evicted = freed = 0
+        names = {p.name for p in self.root.glob("*") if not p.name.startswith(".")}
+        with self.lock:
+            for name in list(self.index):
+                if name not in names:
+                    del self.index[name]
+            for name in names - set(self.index):       # files without metadata
+                (self.root / name).unlink(missing_ok=True)
+            total = sum(m.get("bytes", 0) for m in self.index.values())
+            if self.max_bytes is not None and total > self.max_bytes:
+                for name in sorted(self.index, key=lambda n: self.index[n].get("used", 0)):
+                    if total <= self.max_bytes:
+                        break
+                    if self.index[name].get("used", 0) >= self.started:
+                        continue
+                    size = self.index.pop(name).get("bytes", 0)
+                    (self.root / name).unlink(missing_ok=True)
+                    total -= size; freed += size; evicted += 1
+        return {"evicted": evicted, "evicted_bytes": freed, "bytes": total}
+
+    def save(self) -> None:
+        with self.lock:
+            data = mls_json.dumps(self.index)
+        tmp = self.index_path.with_name(".index.json.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, self.index_path)
+
+    # ---- rewriting ----
+    def rewrite(self, summaries: List[Summary], mapping: Optional[Dict[str, Optional[str]]] = None) -> int:
+        """
+        Point icon_url at the local copies. Without `mapping` only already-mirrored
+        images are rewritten (no network). Returns how many icons now point here.
+        """
+        n = 0
+        for s in summaries:
+            if not s.icon_url:
+                continue
+            if mapping is not None:
+                if s.icon_url in mapping:
+                    s.icon_url = mapping[s.icon_url]
+            else:
+                name = self.local_name(s.icon_url)
+                if name in self.index and (self.root / name).exists():
+                    s.icon_url = self.local_url(name)
+            n += bool(s.icon_url and s.icon_url.startswith(self.base_url + "/"))
+        return n
+
+
+def mirror_from_env(out_dir: Path, base_url: Optional[str] = None) -> Optional[ArtMirror]:
+    """The mirror configured by ART_BASE_URL & co., or None when artwork mirroring is off."""
+    base_url = base_url or os.environ.get("ART_BASE_URL")
+    if not base_url:
+        return None
+    root = Path(out_dir) / ART_DIR
+    root.mkdir(parents=True, exist_ok=True)
+    return ArtMirror(root, base_url,
+                     max_mb=float(os.environ.get("ART_MAX_MB") or ART_MAX_MB),
+                     workers=int(os.environ.get("ART_WORKERS") or ART_WORKERS),
+                     revalidate_h=float(os.environ.get("ART_REVALIDATE_H") or ART_REVALIDATE_H))
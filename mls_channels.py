@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Apple TV channels scraped in one run.
+
+Each Channel is one Apple TV sports canvas (tvs.sbd.*) with its own output
+files, M3U group and channel-number range. The default list is MLS Season
+Pass alone, written to the historical mls.m3u / guide.xml names. More
+channels come from a JSON file (--channels / CHANNELS_FILE):
+
+    [
+      {"slug": "mls", "id": "tvs.sbd.7000", "name": "MLS Season Pass",
+       "referer": "mls-season-pass", "group": "MLS", "base_ch": 9910,
+       "m3u": "mls.m3u", "xml": "guide.xml",
+       "schedule": "mls_schedule.json", "raw_canvas": "raw_canvas.json"},
+      {"slug": "nextpro", "id": "tvs.sbd.XXXX", "group": "MLS NEXT Pro"}
+    ]
+
+Only slug and id are required. Other files default to <slug>.m3u,
+<slug>_guide.xml, <slug>_schedule.json and <slug>_raw_canvas.json; base_ch
+defaults to the previous channel's base + CHANNEL_BLOCK. With more than one
+channel, all.m3u / all_guide.xml merge every channel.
+"""
+
+import json
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, List, Optional
+
+CHANNEL_BLOCK = 100
+COMBINED_M3U = "all.m3u"
+COMBINED_XML = "all_guide.xml"
+
+
+@dataclass(frozen=True, slots=True)
+class Channel:
+    slug: str
+    id: str
+    name: str = ""
+    referer: str = ""
+    group: str = ""
+    base_ch: int = 0
+    m3u: str = ""
+    xml: str = ""
+    schedule: str = ""
+    raw_canvas: str = ""
+
+    @property
+    def referer_url(self) -> str:
+        return f"https://tv.apple.com/us/channel/{self.referer or self.slug}/{self.id}"
+
+    @classmethod
+    def from_dict(cls, d: Dict, base_ch: int) -> "Channel":
+        slug = str(d.get("slug") or "").strip()
+        cid = str(d.get("id") or "").strip()
+        if not slug or not cid:
+            raise ValueError(f"channel entry needs 'slug' and 'id': {d!r}")
+        return cls(
+            slug=slug, id=cid,
+            name=d.get("name") or "",
+            referer=d.get("referer") or "",
+            group=d.get("group") or d.get("name") or slug.upper(),
+            base_ch=int(d.get("base_ch") or base_ch),
+            m3u=d.get("m3u") or f"{slug}.m3u",
+            xml=d.get("xml") or f"{slug}_guide.xml",
+            schedule=d.get("schedule") or f"{slug}_schedule.json",
+            raw_canvas=d.get("raw_canvas") or f"{slug}_raw_canvas.json",
+        )
+
+
+MLS = Channel(slug="mls", id="tvs.sbd.7000", name="MLS Season Pass", referer="mls-season-pass",
+              group="MLS", base_ch=9910, m3u="mls.m3u", xml="guide.xml",
+              schedule="mls_schedule.json", raw_canvas="raw_canvas.json")
+
+
+def load_channels(path: Optional[str], group: Optional[str] = None, base_ch: Optional[int] = None) -> List[Channel]:
+    """
+    Channels from a JSON list at `path`, or [MLS] when no path is given
+    (`group` / `base_ch` then override the MLS defaults, as --group/--base-ch always did).
+    """
+    if not path:
+        return [replace(MLS, group=group or MLS.group, base_ch=MLS.base_ch if base_ch is None else base_ch)]
+    rows = json.loads(Path(path).read_text(encoding="utf-8"))
+    if not isinstance(rows, list) or not rows:
+        raise ValueError(f"{path}: expected a non-empty JSON list of channels")
+    channels: List[Channel] = []
+    next_base = MLS.base_ch if base_ch is None else base_ch
+    for row in rows:
+        ch = Channel.from_dict(row, next_base)
+        channels.append(ch)
+        next_base = ch.base_ch + CHANNEL_BLOCK
+    _validate(channels, path)
+    return channels
+
+
+def _validate(channels: List[Channel], path: str) -> None:
+    seen: Dict[str, str] = {}
+    for ch in channels:
+        for kind, value in (("slug", ch.slug), ("id", ch.id), ("m3u", ch.m3u), ("xml", ch.xml),
+                            ("schedule", ch.schedule), ("raw_canvas", ch.raw_canvas)):
+            key = f"{kind}:{value}"
+            if key in seen:
+                raise ValueError(f"{path}: duplicate {kind} {value!r} ({seen[key]} and {ch.slug})")
+            seen[key] = ch.slug
+        if ch.m3u == COMBINED_M3U or ch.xml == COMBINED_XML:
+            raise ValueError(f"{path}: {ch.slug} uses a reserved combined output name")
+    ordered = sorted(channels, key=lambda c: c.base_ch)
+    for a, b in zip(ordered, ordered[1:]):
+        if a.base_ch == b.base_ch:
+            raise ValueError(f"{path}: {a.slug} and {b.slug} share base_ch {a.base_ch}")
+
+
+def check_ranges(counts: Dict[str, int], channels: List[Channel]) -> List[str]:
+    """Warnings for channels whose numbers (base_ch .. base_ch+count-1) run into the next range."""
+    ordered = sorted(channels, key=lambda c: c.base_ch)
+    warnings = []
+    for a, b in zip(ordered, ordered[1:]):
+        last = a.base_ch + counts.get(a.slug, 0) - 1
+        if last >= b.base_ch:
+            warnings.append(f"{a.slug} channels {a.base_ch}-{last} overlap {b.slug} starting at {b.base_ch}")
+    return warnings
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MLS Deeplink — time-windowed guide service
+==========================================
+The static guide.xml carries the whole season. This small HTTP service
+(behind NGINX, which forwards any guide request with a query string) returns
+only the slice a client asks for:
+
+    /guide.xml?hours=6                 programmes from now to +6h
+    /guide.xml?hours=3&channels=9911,9914-9916
+    /all_guide.xml?channels=cup        one source of a multi-channel run
+
+`channels` takes channel numbers, N-M ranges, tvg-ids (mls.apple.N) or
+source slugs from CHANNELS_FILE; no `hours` means no upper bound.
+
+Summaries are rebuilt from the published schedule/raw canvas JSON (reloaded
+when a new release goes live) into one list per guide sorted by start time.
+A request bisects that index, so its cost follows the size of the window, not
+the season. Output is rendered with `now` snapped to the :00/:30 placeholder
+grid, so every request in the same half-hour bucket gets the same bytes:
+responses are cached per (guide, bucket, hours, channels) with an ETag and a
+max-age running to the end of the bucket.
+"""
+
+import os, io, gzip, math, bisect, hashlib, argparse, threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import export_mls_outputs as exporter
+from mls_art import mirror_from_env
+from mls_channels import Channel, COMBINED_XML, load_channels
+from mls_models import Summary
+
+GUIDE_PORT = 8097
+CACHE_ENTRIES = 256
+_FOREVER = 1 << 62
+
+# (start_ts, stop_ts, last_ts, segment index, slot in segment, summary); last_ts is
+# the end of the event's POST placeholders, i.e. the last moment it shows in a guide
+Entry = Tuple[int, int, int, int, int, Summary]
+
+
+class GuideIndex:
+    """One guide's events sorted by start time, laid out as the static writer numbers them."""
+
+    def __init__(self, segments: List[exporter.Segment], slugs: List[str], lineup: int, now_ts: int):
+        self.segments = segments
+        self.slugs = slugs
+        self.lineup = lineup
+        entries: List[Entry] = []
+        # Lineup mode: every segment's full pool, so all of its channels are listed and
+        # each slot's next game past a window can still fill the window's tail
+        self.pools: List[List[List[Tuple[Summary, int, int]]]] = []
+        self.pool_starts: List[List[List[int]]] = []
+        for seg, (summaries, _, _) in enumerate(segments):
+            if lineup:
+                pool = exporter.allocate_lineup(summaries, lineup, now_ts)
+                self.pools.append(pool)
+                self.pool_starts.append([[a for _, a, _ in events] for events in pool])
+                for slot, events in enumerate(pool):
+                    entries.extend((a, b, exporter._post_window(b)[1], seg, slot, s) for s, a, b in events)
+            else:
+                for slot, s in enumerate(summaries):
+                    a, b = exporter._event_span(s, now_ts)
+                    entries.append((a, b, exporter._post_window(b)[1], seg, slot, s))
+        entries.sort(key=lambda e: (e[0], e[1]))
+        self.entries = entries
+        self.starts = [e[0] for e in entries]
+        # Longest start -> last_ts reach bounds how far back an event can still be visible
+        self.reach = max((e[2] - e[0] for e in entries), default=0)
+
+    def query(self, window_start: int, window_end: int) -> List[Entry]:
+        """Events visible in [window_start, window_end): start < end and last_ts > start."""
+        lo = bisect.bisect_left(self.starts, window_start - self.reach)
+        hi = bisect.bisect_left(self.starts, window_end)
+        return [e for e in self.entries[lo:hi] if e[2] > window_start]
+
+    def render(self, bucket: datetime, hours: float, wanted: Optional[FrozenSet[str]]) -> Tuple[str, int]:
+        """XMLTV for `hours` after `bucket` (a :00/:30 instant); returns (document, channels)."""
+        anchor = int(exporter.placeholder_anchor(bucket).timestamp())
+        until = int(bucket.timestamp() + hours * 3600) if hours > 0 else _FOREVER
+        until = -(-until // exporter._HALF_HOUR) * exporter._HALF_HOUR
+        picked = [e for e in self.query(anchor, until) if wanted is None or self._matches(e, wanted)]
+
+        # Regroup per segment / channel slot, in the static guide's channel order
+        per_seg: List[Dict[int, List[Tuple[Summary, int, int]]]] = [{} for _ in self.segments]
+        for a, b, _, seg, slot, s in picked:
+            per_seg[seg].setdefault(slot, []).append((s, a, b))
+        out = io.StringIO()
+        out.write(exporter.XMLTV_HEAD)
+        if self.lineup:
+            n = self._render_lineup(out, per_seg, bucket, until, wanted)
+            out.write('</tv>\n')
+            return out.getvalue(), n
+        n = 0
+        for (_, group, base_ch), slots in zip(self.segments, per_seg):
+            for slot in sorted(slots):
+                exporter._emit_channel(out, base_ch + slot, slots[slot][0][0].title or "MLS Match", group)
+                n += 1
+        for (_, group, base_ch), slots in zip(self.segments, per_seg):
+            for slot in sorted(slots):
+                for s, a, b in slots[slot]:
+                    exporter._emit_event_programmes(out, f"mls.apple.{base_ch + slot}", s, a, b,
+                                                    anchor, bucket, until=until)
+        out.write('</tv>\n')
+        return out.getvalue(), n
+
+    def _render_lineup(self, out, per_seg, bucket: datetime, until: int,
+                       wanted: Optional[FrozenSet[str]]) -> int:
+        """
+        Every pool channel, as the static guide lists them; each slot's first game at
+        or after `until` is carried along so its PRE placeholders run up to `until`.
+        """
+        listed = []
+        for seg, ((_, group, base_ch), pool) in enumerate(zip(self.segments, self.pools)):
+            for slot, events in enumerate(pool):
+                if wanted is None or self._wanted(seg, slot, wanted):
+                    listed.append((seg, slot))
+                    exporter._emit_channel(out, base_ch + slot, f"{group} {slot + 1}", group)
+        for seg, slot in listed:
+            events = self.pools[seg][slot]
+            shown = per_seg[seg].get(slot, [])
+            nxt = bisect.bisect_left(self.pool_starts[seg][slot], until)
+            if nxt < len(events):
+                shown = shown + [events[nxt]]
+            exporter._write_lineup_programmes(out, [shown], self.segments[seg][2] + slot, bucket,
+                                              until=until, idle=not events)
+        return len(listed)
+
+    def _matches(self, e: Entry, wanted: FrozenSet[str]) -> bool:
+        return self._wanted(e[3], e[4], wanted)
+
+    def _wanted(self, seg: int, slot: int, wanted: FrozenSet[str]) -> bool:
+        return str(self.segments[seg][2] + slot) in wanted or self.slugs[seg] in wanted
+
+
+def parse_channels(value: str) -> Optional[FrozenSet[str]]:
+    """'9911,9914-9916,mls.apple.9920,cup' -> {'9911','9914','9915','9916','9920','cup'}."""
+    wanted = set()
+    for tok in (t.strip() for t in value.split(",")):
+        if not tok:
+            continue
+        if tok.startswith("mls.apple."):
+            tok = tok[len("mls.apple."):]
+        lo, sep, hi = tok.partition("-")
+        if sep and lo.isdigit() and hi.isdigit():
+            if int(hi) - int(lo) > 10000:
+                raise ValueError(f"channel range too wide: {tok}")
+            wanted.update(str(c) for c in range(int(lo), int(hi) + 1))
+        else:
+            wanted.add(tok)
+    return frozenset(wanted) or None
+
+
+class GuideStore:
+    """
+    Guide indexes built from the live release's JSON, rebuilt when it changes,
+    plus the per-window-bucket response cache.
+    """
+
+    def __init__(self, out_dir: Path, channels_file: Optional[str], lineup: int,
+                 fuzzy_threshold: float = exporter.HERO_FUZZY_THRESHOLD, cache_entries: int = CACHE_ENTRIES):
+        self.out_dir = Path(out_dir)
+        self.channels_file = channels_file
+        self.lineup = max(0, lineup)
+        self.fuzzy_threshold = fuzzy_threshold
+        self.cache_entries = cache_entries
+        self.lock = threading.Lock()
+        self.version: Optional[Tuple] = None
+        self.guides: Dict[str, GuideIndex] = {}
+        self.cache: "OrderedDict[Tuple, Tuple[bytes, bytes, str]]" = OrderedDict()
+
+    def _source(self) -> Tuple[Path, Tuple]:
+        """Directory holding the live artifacts and a cheap fingerprint of them."""
+        base = Path(os.path.realpath(self.out_dir / "current")) if (self.out_dir / "current").is_dir() else self.out_dir
+        stamps = []
+        for ch in load_channels(self.channels_file):
+            for name in (ch.schedule, ch.raw_canvas):
+                try:
+                    st = (base / name).stat()
+                    stamps.append((name, st.st_mtime_ns, st.st_size))
+                except OSError:
+                    stamps.append((name, 0, 0))
+        return base, (str(base), tuple(stamps))
+
+    def refresh(self) -> None:
+        base, version = self._source()
+        with self.lock:
+            if version == self.version:
+                return
+        channels = load_channels(self.channels_file)
+        segments: List[exporter.Segment] = []
+        for ch in channels:
+            segments.append((self._summaries(base, ch), ch.group, ch.base_ch))
+        art = mirror_from_env(self.out_dir)
+        if art:  # same local icon URLs as the static files (no fetching here)
+            for summaries, _, _ in segments:
+                art.rewrite(summaries)
+        now_ts = int(datetime.now(timezone.utc).timestamp())
+        guides = {ch.xml: GuideIndex([seg], [ch.slug], self.lineup, now_ts) for ch, seg in zip(channels, segments)}
+        if len(channels) > 1:
+            guides[COMBINED_XML] = GuideIndex(segments, [ch.slug for ch in channels], self.lineup, now_ts)
+        with self.lock:
+            self.guides, self.version = guides, version
+            self.cache.clear()
+        print(f"🗓️  guide index loaded from {base}: "
+              + ", ".join(f"{name}={len(g.entries)}" for name, g in guides.items()), flush=True)
+
+    def _summaries(self, base: Path, ch: Channel) -> List[Summary]:
+        schedule = base / ch.schedule
+        if not schedule.exists():
+            return []
+        hero_by_umc, hero_by_title = exporter.load_hero_maps(base / ch.raw_canvas)
+        matches = exporter.load_matches(schedule)
+        return exporter.build_rows_from_scrapeonly(matches, hero_by_umc, hero_by_title, self.fuzzy_threshold)[0]
+
+    def get(self, guide: str, hours: float, wanted: Optional[FrozenSet[str]],
+            now: Optional[datetime] = None) -> Optional[Tuple[bytes, bytes, str, int]]:
+        """(body, gzipped body, etag, seconds left in the bucket) or None for an unknown guide."""
+        self.refresh()
+        now = now or datetime.now(timezone.utc)
+        bucket = exporter.floor_30(now)
+        ttl = max(1, int((bucket.timestamp() + exporter._HALF_HOUR) - now.timestamp()))
+        with self.lock:
+            index = self.guides.get(guide)
+            if index is None:
+                return None
+            key = (guide, bucket, hours, wanted, self.version)
+            hit = self.cache.get(key)
+            if hit is not None:
+                self.cache.move_to_end(key)
+                return hit + (ttl,)
+        text, _ = index.render(bucket, hours, wanted)
+        body = text.encode("utf-8")
+        entry = (body, gzip.compress(body, compresslevel=6, mtime=0), f'"{hashlib.sha1(body).hexdigest()[:20]}"')
+        with self.lock:
+            self.cache[key] = entry
+            while len(self.cache) > self.cache_entries:
+                self.cache.popitem(last=False)
+        return entry + (ttl,)
+
+
+class GuideHandler(BaseHTTPRequestHandler):
+    store: GuideStore
+    quiet = True
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head: bool = False):
+        parts = urlsplit(self.path)
+        if parts.path == "/health":
+            return self._send(200, b"ok", "text/plain", head=head)
+        guide = parts.path.rsplit("/", 1)[-1]  # NGINX forwards /_guide/<name>.xml
+        try:
+            q = parse_qs(parts.query)
+            hours = float((q.get("hours") or ["0"])[0] or 0)
+            if hours < 0 or not math.isfinite(hours):
+                raise ValueError("hours must be a number >= 0")
+            wanted = parse_channels(",".join(q.get("channels", [])))
+        except ValueError as e:
+            return self._send(400, f"{e}\n".encode("utf-8"), "text/plain", head=head)
+        try:
+            hit = self.store.get(guide, hours, wanted)
+        except Exception as e:  # bad/missing JSON mid-publish: let clients retry
+            print(f"❌ guide {guide}: {e}", flush=True)
+            return self._send(503, b"guide unavailable\n", "text/plain", head=head)
+        if hit is None:
+            return self._send(404, b"unknown guide\n", "text/plain", head=head)
+        body, gz, etag, ttl = hit
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={ttl}", "Vary": "Accept-Encoding"}
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, b"", None, headers, head=True)
+        if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            body = gz
+            headers["Content-Encoding"] = "gzip"
+        self._send(200, body, "application/xml; charset=utf-8", headers, head=head)
+
+    def _send(self, code: int, body: bytes, ctype: Optional[str], headers: Optional[Dict[str, str]] = None,
+              head: bool = False) -> None:
+        self.send_response(code)
+        if ctype:
+            self.send_header("Content-Type", ctype)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        if not self.quiet:
+            super().log_message(fmt, *args)
+
+
+def serve(store: GuideStore, host: str, port: int, quiet: bool = True) -> ThreadingHTTPServer:
+    handler = type("Handler", (GuideHandler,), {"store": store, "quiet": quiet})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Time-windowed XMLTV guide service (behind NGINX)")
+    ap.add_argument("--out-dir", default=os.environ.get("OUTPUT_DIR") or str(Path(__file__).parent / "out"))
+    ap.add_argument("--channels", default=os.environ.get("CHANNELS_FILE") or None,
+                    help="JSON channel list (see mls_channels.py); default is MLS Season Pass only")
+    ap.add_argument("--lineup", type=int, default=int(os.environ.get("LINEUP_CHANNELS") or 0),
+                    help="Match the generator's fixed channel lineup (0 = one channel per event)")
+    ap.add_argument("--hero-fuzzy-threshold", type=float, default=exporter.HERO_FUZZY_THRESHOLD)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=int(os.environ.get("GUIDE_PORT") or GUIDE_PORT))
+    ap.add_argument("--cache-entries", type=int, default=CACHE_ENTRIES, help="Cached window responses kept")
+    ap.add_argument("--verbose", action="store_true", help="Log every request")
+    args = ap.parse_args()
+
+    store = GuideStore(Path(args.out_dir), args.channels, args.lineup, args.hero_fuzzy_threshold, args.cache_entries)
+    server = serve(store, args.host, args.port, quiet=not args.verbose)
+    print(f"🗓️  guide service on http://{args.host}:{args.port}/<guide>.xml?hours=&channels=", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
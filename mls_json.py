@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON backend shared by scraper, exporter, store and archive.
+
+orjson is used when installed (several times faster on large canvases),
+otherwise the stdlib json module; MLS_JSON=json forces stdlib. dumps()
+returns UTF-8 bytes, compact unless pretty=True (2-space indent, for files
+people read).
+"""
+
+import os, json, time
+from pathlib import Path
+from typing import Any, Tuple, Union
+
+try:  # optional: faster parse/serialise
+    import orjson
+except ImportError:
+    orjson = None
+if os.environ.get("MLS_JSON", "").lower() in ("json", "stdlib"):
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load(path: Path) -> Any:
+    return loads(Path(path).read_bytes())
+
+
+def dumps(obj: Any, pretty: bool = False) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+        except TypeError:  # non-str keys, ints beyond 64 bit, ...: stdlib copes
+            pass
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def timed_dumps(obj: Any, pretty: bool = False) -> Tuple[bytes, float]:
+    """dumps() plus the seconds it took (for run output / metrics)."""
+    t0 = time.perf_counter()
+    data = dumps(obj, pretty)
+    return data, time.perf_counter() - t0
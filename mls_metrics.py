@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-run stage timings and counters.
+
+RunMetrics collects one run's stage durations (fetch, parse_canvas,
+hero_maps, transform, write_*) plus arbitrary numeric/string fields per
+stage, and writes them next to the artifacts as:
+
+- run_metrics.json  — full detail, for humans and tooling
+- metrics.prom      — Prometheus text exposition format (scrape via NGINX)
+"""
+
+import os, json, re, time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+_LABEL_RE = re.compile(r"[^a-zA-Z0-9_]")
+
+
+class RunMetrics:
+    def __init__(self, prefix: str = "mls"):
+        self.prefix = prefix
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.success: Optional[bool] = None
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    @contextmanager
+    def stage(self, name: str, **fields):
+        """Time a stage; fields (and anything set on the yielded dict) are recorded with it."""
+        rec = self.stages.setdefault(name, {})
+        rec.update(fields)
+        t0 = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            rec["seconds"] = round(rec.get("seconds", 0.0) + (time.perf_counter() - t0), 6)
+
+    def record(self, name: str, **fields) -> None:
+        self.stages.setdefault(name, {}).update(fields)
+
+    def finish(self, success: bool) -> None:
+        self.finished_at = time.time()
+        self.success = success
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            "started_at": datetime.fromtimestamp(self.started_at, tz=timezone.utc).isoformat(),
+            "finished_at": datetime.fromtimestamp(end, tz=timezone.utc).isoformat(),
+            "duration_s": round(end - self.started_at, 6),
+            "success": self.success,
+            "stages": self.stages,
+        }
+
+    def to_prometheus(self) -> str:
+        p = self.prefix
+        end = self.finished_at or time.time()
+        lines = [
+            f"# HELP {p}_run_duration_seconds Wall time of the last run.",
+            f"# TYPE {p}_run_duration_seconds gauge",
+            f"{p}_run_duration_seconds {end - self.started_at:.6f}",
+            f"# HELP {p}_run_success Whether the last run succeeded (1) or failed (0).",
+            f"# TYPE {p}_run_success gauge",
+            f"{p}_run_success {1 if self.success else 0}",
+            f"# HELP {p}_run_finished_timestamp_seconds Unix time the last run finished.",
+            f"# TYPE {p}_run_finished_timestamp_seconds gauge",
+            f"{p}_run_finished_timestamp_seconds {end:.3f}",
+            f"# HELP {p}_stage_duration_seconds Wall time per pipeline stage in the last run.",
+            f"# TYPE {p}_stage_duration_seconds gauge",
+        ]
+        for name, rec in self.stages.items():
+            if "seconds" in rec:
+                lines.append(f'{p}_stage_duration_seconds{{stage="{name}"}} {rec["seconds"]:.6f}')
+        # Every other numeric field becomes <prefix>_<stage>_<field>
+        for name, rec in self.stages.items():
+            for key, val in rec.items():
+                if key == "seconds" or isinstance(val, bool) or not isinstance(val, (int, float)):
+                    continue
+                metric = _LABEL_RE.sub("_", f"{p}_{name}_{key}")
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {val}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, out_dir: Path, json_name: str = "run_metrics.json", prom_name: str = "metrics.prom") -> None:
+        out_dir = Path(out_dir)
+        for name, text in ((json_name, json.dumps(self.to_dict(), indent=2)), (prom_name, self.to_prometheus())):
+            tmp = out_dir / f".{name}.tmp"
+            tmp.write_text(text, encoding="utf-8")
+            os.replace(tmp, out_dir / name)
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Record / replay fixtures and a local mock of the Apple TV UTS API.
+
+MLSAPIClient normally talks to tv.apple.com, which makes scraper runs slow
+to repeat and impossible to measure deterministically. Three pieces fix that:
+
+- record: `--record DIR` (MLS_RECORD_DIR) saves every response the client
+  gets (status, headers, body) as a fixture, keyed by path below BASE_URL and
+  query parameters (the session tokens utsk/utscf are ignored):
+
+      <DIR>/canvases_channels_tvs.sbd.7000-3f2a9c1b.json   status, headers, request
+      <DIR>/canvases_channels_tvs.sbd.7000-3f2a9c1b.body   response body
+
+- replay: `--replay DIR` (MLS_REPLAY_DIR) answers the client from those
+  fixtures in-process, without sockets (unknown requests get a 404);
+  If-None-Match against a recorded ETag yields a 304 like upstream.
+
+- serve: an HTTP server answering from fixtures, a canvas file (raw canvas
+  or archived snapshot) or a synthetic canvas, with configurable latency,
+  injected errors (status, Retry-After, dropped connections) and shelf
+  pagination. Point the client at it with `--base-url` (MLS_API_BASE_URL):
+
+      python mls_mock.py serve --fixtures fixtures/ --latency-ms 80 --page-size 10
+      python generate_mls.py --base-url http://127.0.0.1:8099 --no-cache
+      curl -s http://127.0.0.1:8099/_mock/stats    # requests, statuses, peak concurrency
+
+  /_mock/reset clears the counters (and the --fail-first bookkeeping).
+  With --art, artwork URLs in a --canvas/--synthetic canvas point at the mock
+  (/_mock/art/...), which answers them with small placeholder images, so the
+  artwork mirror (mls_art.py) runs offline too.
+
+scripts/smoke.sh drives generate_mls.py end to end against this server
+(pagination, publishing, artwork, record and replay).
+
+    python mls_mock.py list fixtures/
+"""
+
+import os, sys, time, random, hashlib, argparse, threading
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+import mls_json
+
+MOCK_PORT = 8099
+# Apple's artwork CDN, rehosted under ART_PATH by `serve --art`
+ART_CDN = "https://is1-ssl.mzstatic.com/"
+ART_PATH = "/_mock/art/"
+# Query parameters that identify the session rather than the resource
+VOLATILE_PARAMS = frozenset({"utsk", "utscf"})
+# Headers describing the wire encoding of the recorded response, not its content
+_WIRE_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"})
+
+
+@dataclass
+class Fixture:
+    path: str                      # relative to the client's BASE_URL, e.g. /canvases/channels/tvs.sbd.7000
+    params: Dict[str, str]
+    status: int
+    headers: Dict[str, str]
+    body: bytes = field(repr=False)
+    recorded_at: float = 0.0
+
+
+def split_url(base_url: str, url: str) -> Tuple[str, Dict[str, str]]:
+    """(path below base_url, query parameters) of a request URL."""
+    parts = urlsplit(url)
+    prefix = urlsplit(base_url).path.rstrip("/")
+    path = parts.path[len(prefix):] if prefix and parts.path.startswith(prefix) else parts.path
+    return path or "/", dict(parse_qsl(parts.query, keep_blank_values=True))
+
+
+class Fixtures:
+    """A directory of recorded responses (see module docstring for the layout)."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    @staticmethod
+    def key(path: str, params: Dict[str, str]) -> str:
+        stable = sorted((k, v) for k, v in params.items() if k not in VOLATILE_PARAMS)
+        digest = hashlib.sha256((path + "?" + "&".join(f"{k}={v}" for k, v in stable)).encode("utf-8")).hexdigest()
+        slug = "".join(c if c.isalnum() or c in "._-" else "_" for c in path.strip("/"))[:80] or "root"
+        return f"{slug}-{digest[:8]}"
+
+    def _paths(self, key: str) -> Tuple[Path, Path]:
+        return self.root / f"{key}.json", self.root / f"{key}.body"
+
+    def save(self, fx: Fixture) -> str:
+        key = self.key(fx.path, fx.params)
+        meta_path, body_path = self._paths(key)
+        self.root.mkdir(parents=True, exist_ok=True)
+        meta = {"path": fx.path, "params": {k: v for k, v in fx.params.items() if k not in VOLATILE_PARAMS},
+                "status": fx.status, "headers": fx.headers, "bytes": len(fx.body),
+                "recorded_at": fx.recorded_at or time.time()}
+        for path, data in ((body_path, fx.body), (meta_path, mls_json.dumps(meta, pretty=True))):
+            tmp = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        return key
+
+    def load(self, path: str, params: Dict[str, str]) -> Optional[Fixture]:
+        meta_path, body_path = self._paths(self.key(path, params))
+        try:
+            meta = mls_json.load(meta_path)
+            body = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        return Fixture(meta["path"], meta.get("params", {}), int(meta["status"]), meta.get("headers", {}),
+                       body, meta.get("recorded_at", 0.0))
+
+    def entries(self) -> List[Fixture]:
+        out = []
+        for meta_path in sorted(self.root.glob("*.json")):
+            try:
+                meta = mls_json.load(meta_path)
+                out.append(Fixture(meta["path"], meta.get("params", {}), int(meta["status"]),
+                                   meta.get("headers", {}), b"", meta.get("recorded_at", 0.0)))
+            except (OSError, ValueError, KeyError):
+                continue
+        return out
+
+
+# ---- client side: record / replay adapters ----
+class RecordingAdapter(HTTPAdapter):
+    """HTTPAdapter that also saves every response (except 304s) as a fixture."""
+
+    def __init__(self, fixtures: Fixtures, base_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.fixtures = fixtures
+        self.base_url = base_url
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if response.status_code != 304:  # a revalidation says nothing about the body
+            path, params = split_url(self.base_url, request.url)
+            headers = {k: v for k, v in response.headers.items() if k.lower() not in _WIRE_HEADERS}
+            self.fixtures.save(Fixture(path, params, response.status_code, headers, response.content, time.time()))
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Answers requests from fixtures without touching the network."""
+
+    def __init__(self, fixtures: Fixtures, base_url: str):
+        super().__init__()
+        self.fixtures = fixtures
+        self.base_url = base_url
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        path, params = split_url(self.base_url, request.url)
+        fx = self.fixtures.load(path, params)
+        if fx is None:
+            return _response(request, 404, {"Content-Type": "text/plain"}, f"no fixture for {path}\n".encode("utf-8"))
+        etag = CaseInsensitiveDict(fx.headers).get("ETag")
+        if etag and request.headers.get("If-None-Match") == etag:
+            return _response(request, 304, {"ETag": etag}, b"")
+        return _response(request, fx.status, fx.headers, fx.body)
+
+    def close(self):
+        pass
+
+
+def _response(request, status: int, headers: Dict[str, str], body: bytes) -> requests.Response:
+    r = requests.Response()
+    r.status_code = status
+    r.headers = CaseInsensitiveDict(headers)
+    r.headers["Content-Length"] = str(len(body))
+    r._content = body
+    r.url = request.url
+    r.request = request
+    r.reason = "Not Modified" if status == 304 else ("OK" if status == 200 else "")
+    r.encoding = "utf-8"
+    return r
+
+
+def install(client, record: Optional[str] = None, replay: Optional[str] = None) -> None:
+    """Mount a recording or replaying adapter on the client's session (replay wins if both are set)."""
+    if replay:
+        adapter = ReplayAdapter(Fixtures(Path(replay)), client.BASE_URL)
+    elif record:
+        current = client.session.get_adapter("https://")
+        adapter = RecordingAdapter(Fixtures(Path(record)), client.BASE_URL, pool_connections=1,
+                                   pool_maxsize=getattr(current, "_pool_maxsize", client.max_workers), max_retries=0)
+    else:
+        return
+    client.session.mount("https://", adapter)
+    client.session.mount("http://", adapter)
+
+
+# ---- mock server ----
+class MockAPI:
+    """What the mock server answers and how badly it behaves; thread-safe counters."""
+
+    def __init__(self, fixtures: Optional[Fixtures] = None, canvas: Optional[Any] = None,
+                 latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0, error_status: int = 503,
+                 fail_first: int = 0, retry_after: Optional[int] = None, page_size: int = 0, seed: int = 7):
+        self.fixtures = fixtures
+        self.canvas = canvas
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.fail_first = fail_first
+        self.retry_after = retry_after
+        self.page_size = max(0, page_size)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.pages: Dict[str, List[Dict]] = {}       # shelf id -> all items, for mock nextTokens
+        self.bodies: Dict[str, Tuple[int, Dict[str, str], bytes]] = {}  # paginated canvases by fixture key
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.attempts: Dict[str, int] = {}
+            self.stats = {"requests": 0, "statuses": {}, "errors": 0, "dropped": 0, "not_modified": 0,
+                          "bytes": 0, "inflight": 0, "max_inflight": 0, "paths": {}}
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return mls_json.loads(mls_json.dumps(self.stats))
+
+    # -- request accounting --
+    def begin(self, path: str) -> None:
+        with self.lock:
+            s = self.stats
+            s["requests"] += 1
+            s["inflight"] += 1
+            s["max_inflight"] = max(s["max_inflight"], s["inflight"])
+            s["paths"][path] = s["paths"].get(path, 0) + 1
+
+    def end(self, status: Optional[int], nbytes: int) -> None:
+        with self.lock:
+            s = self.stats
+            s["inflight"] -= 1
+            s["bytes"] += nbytes
+            if status is None:
+                s["dropped"] += 1
+            else:
+                s["statuses"][str(status)] = s["statuses"].get(str(status), 0) + 1
+                s["not_modified"] += status == 304
+
+    def delay(self) -> float:
+        with self.lock:
+            return max(0.0, self.latency + (self.rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0))
+
+    def inject_error(self, key: str) -> bool:
+        """True when this request should fail (first --fail-first attempts per URL, then --error-rate)."""
+        with self.lock:
+            n = self.attempts[key] = self.attempts.get(key, 0) + 1
+            fail = n <= self.fail_first or (self.error_rate > 0 and self.rng.random() < self.error_rate)
+            if fail:
+                self.stats["errors"] += 1
+            return fail
+
+    # -- content --
+    def lookup(self, path: str, params: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        if path.startswith(ART_PATH):
+            # Not a decodable picture, only JPEG magic plus a per-URL payload (stable ETag)
+            return 200, {"Content-Type": "image/jpeg"}, b"\xff\xd8\xff\xe0" + hashlib.sha1(path.encode("utf-8")).digest()
+        fx = self.fixtures.load(path, params) if self.fixtures else None
+        token = params.get("nextToken", "")
+        if fx is None and path.startswith("/shelves/") and token.startswith("mock:"):
+            return self._shelf_page(path[len("/shelves/"):], token)
+        is_canvas = path.startswith("/canvases/")
+        if fx is not None:
+            if not (is_canvas and self.page_size and fx.status == 200):
+                return fx.status, fx.headers, fx.body
+            key = Fixtures.key(path, params)
+            with self.lock:
+                hit = self.bodies.get(key)
+            if hit is None:
+                hit = (200, fx.headers, mls_json.dumps(self._paginate(mls_json.loads(fx.body))))
+                with self.lock:
+                    self.bodies[key] = hit
+            return hit
+        if is_canvas and self.canvas is not None:
+            with self.lock:
+                hit = self.bodies.get("canvas")
+            if hit is None:
+                hit = (200, {"Content-Type": "application/json"}, mls_json.dumps(self._paginate(self.canvas)))
+                with self.lock:
+                    self.bodies["canvas"] = hit
+            return hit
+        return 404, {"Content-Type": "application/json"}, mls_json.dumps({"errors": [{"title": f"no mock for {path}"}]})
+
+    def _paginate(self, canvas: Any) -> Any:
+        """Cut every shelf longer than page_size to its first page plus a mock nextToken (copy)."""
+        if not self.page_size or not isinstance(canvas, dict):
+            return canvas
+        canvas = mls_json.loads(mls_json.dumps(canvas))
+        for shelf in canvas.get("data", {}).get("canvas", {}).get("shelves", []):
+            items = shelf.get("items") or []
+            if shelf.get("id") and not shelf.get("nextToken") and len(items) > self.page_size:
+                with self.lock:
+                    self.pages[shelf["id"]] = items
+                shelf["items"] = items[:self.page_size]
+                shelf["nextToken"] = f"mock:{self.page_size}"
+        return canvas
+
+    def _shelf_page(self, shelf_id: str, token: str) -> Tuple[int, Dict[str, str], bytes]:
+        with self.lock:
+            items = self.pages.get(shelf_id)
+        offset = token[len("mock:"):]
+        if items is None or not offset.isdigit():
+            return 404, {"Content-Type": "application/json"}, mls_json.dumps({"errors": [{"title": "unknown token"}]})
+        start = int(offset)
+        shelf: Dict[str, Any] = {"id": shelf_id, "items": items[start:start + self.page_size]}
+        if start + self.page_size < len(items):
+            shelf["nextToken"] = f"mock:{start + self.page_size}"
+        return 200, {"Content-Type": "application/json"}, mls_json.dumps({"data": {"shelf": shelf}})
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    api: MockAPI
+    quiet = True
+    protocol_version = "HTTP/1.1"    # keep-alive, so the client's connection pool behaves as upstream
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == "/_mock/stats":
+            return self._send(200, {"Content-Type": "application/json"}, mls_json.dumps(self.api.snapshot(), pretty=True))
+        if parts.path == "/_mock/reset":
+            self.api.reset()
+            return self._send(200, {"Content-Type": "text/plain"}, b"reset\n")
+        params = dict(parse_qsl(parts.query, keep_blank_values=True))
+        api = self.api
+        api.begin(parts.path)
+        status, nbytes = None, 0
+        try:
+            time.sleep(api.delay())
+            if api.inject_error(Fixtures.key(parts.path, params)):
+                if api.error_status == 0:  # drop the connection without an answer
+                    self.close_connection = True
+                    return
+                headers = {"Content-Type": "application/json"}
+                if api.retry_after is not None:
+                    headers["Retry-After"] = str(api.retry_after)
+                status, body = api.error_status, mls_json.dumps({"errors": [{"status": str(api.error_status)}]})
+                nbytes = self._send(status, headers, body)
+                return
+            status, headers, body = api.lookup(parts.path, params)
+            headers = {k: v for k, v in headers.items() if k.lower() not in _WIRE_HEADERS}
+            if status == 200:
+                etag = CaseInsensitiveDict(headers).get("ETag")
+                if not etag:
+                    etag = headers["ETag"] = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+                if self.headers.get("If-None-Match") == etag:
+                    status, body = 304, b""
+            nbytes = self._send(status, headers, body)
+        finally:
+            api.end(status, nbytes)
+
+    def _send(self, status: int, headers: Dict[str, str], body: bytes) -> int:
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        return len(body)
+
+    def log_message(self, fmt, *args):
+        if not self.quiet:
+            super().log_message(fmt, *args)
+
+
+def serve(api: MockAPI, host: str = "127.0.0.1", port: int = MOCK_PORT, quiet: bool = True) -> ThreadingHTTPServer:
+    handler = type("Handler", (MockHandler,), {"api": api, "quiet": quiet})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def rehost_art(canvas: Any, base_url: str) -> Any:
+    """Copy of `canvas` with every Apple CDN artwork URL pointing at base_url + ART_PATH."""
+    prefix = base_url.rstrip("/") + ART_PATH
+    return mls_json.loads(mls_json.dumps(canvas).replace(ART_CDN.encode("utf-8"), prefix.encode("utf-8")))
+
+
+def _load_canvas(args: argparse.Namespace) -> Optional[Any]:
+    if args.canvas:
+        from mls_archive import read_snapshot
+        return read_snapshot(Path(args.canvas))
+    if args.synthetic:
+        sys.path.insert(0, str(Path(__file__).resolve().parent / "benchmarks"))
+        from synthetic_canvas import make_canvas
+        return make_canvas(args.synthetic, args.seed)
+    return None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Record/replay fixtures and a mock Apple TV API server")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sv = sub.add_parser("serve", help="Serve fixtures / a canvas over HTTP (point --base-url at it)")
+    sv.add_argument("--fixtures", help="Fixture directory written by --record")
+    sv.add_argument("--canvas", help="Canvas for every /canvases/... request without a fixture "
+                                     "(raw_canvas.json or an archived .json.gz/.json.zst snapshot)")
+    sv.add_argument("--synthetic", type=int, default=0, metavar="N",
+                    help="Without --canvas: serve a synthetic canvas of N events (benchmarks/synthetic_canvas.py)")
+    sv.add_argument("--host", default="127.0.0.1")
+    sv.add_argument("--port", type=int, default=int(os.environ.get("MOCK_PORT") or MOCK_PORT))
+    sv.add_argument("--latency-ms", type=float, default=0, help="Delay added to every response")
+    sv.add_argument("--jitter-ms", type=float, default=0, help="± random part of the delay")
+    sv.add_argument("--error-rate", type=float, default=0, help="Fraction of requests answered with --error-status")
+    sv.add_argument("--error-status", type=int, default=503, help="Injected status; 0 drops the connection instead")
+    sv.add_argument("--fail-first", type=int, default=0, metavar="N", help="Fail the first N attempts of every URL")
+    sv.add_argument("--retry-after", type=int, help="Retry-After seconds sent with injected errors")
+    sv.add_argument("--page-size", type=int, default=0,
+                    help="Split canvas shelves into pages of N items behind mock nextTokens (0 = as recorded)")
+    sv.add_argument("--seed", type=int, default=7)
+    sv.add_argument("--art", action="store_true",
+                    help="Point the canvas's artwork URLs at this server and answer them with placeholder images")
+    sv.add_argument("--verbose", action="store_true", help="Log every request")
+    ls = sub.add_parser("list", help="Show recorded fixtures")
+    ls.add_argument("fixtures")
+    args = ap.parse_args()
+
+    if args.cmd == "list":
+        entries = Fixtures(Path(args.fixtures)).entries()
+        for fx in entries:
+            query = "&".join(f"{k}={v}" for k, v in sorted(fx.params.items()))
+            print(f"{fx.status}  {fx.path}{'?' + query if query else ''}")
+        print(f"📼 {len(entries)} fixtures in {args.fixtures}")
+        return
+
+    if not (args.fixtures or args.canvas or args.synthetic):
+        ap.error("serve needs --fixtures, --canvas or --synthetic")
+    api = MockAPI(Fixtures(Path(args.fixtures)) if args.fixtures else None, _load_canvas(args),
+                  args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, args.fail_first,
+                  args.retry_after, args.page_size, args.seed)
+    server = serve(api, args.host, args.port, quiet=not args.verbose)
+    if args.art and api.canvas is not None:
+        api.canvas = rehost_art(api.canvas, f"http://{args.host}:{server.server_port}")
+    print(f"🧪 mock Apple TV API on http://{args.host}:{server.server_port} "
+          f"(latency {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, errors {args.error_rate:.0%}"
+          f"{f', first {args.fail_first} per URL' if args.fail_first else ''}, page size {args.page_size or 'as is'})",
+          flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
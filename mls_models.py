@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Typed records shared by the scraper and the exporter.
+
+- Match:   one SportingEvent as parsed from the Apple TV canvas (mls_schedule.json rows)
+- Summary: one exportable live event (what the M3U/XMLTV writers consume)
+
+Both are slotted dataclasses: field aliases (shortTitle/short_title,
+sportName/sport, ...) are resolved once in from_canvas_item/from_dict, and
+kickoff/end are parsed to UTC datetimes at construction. to_dict/from_dict
+round-trip losslessly; the datetimes are derived and not serialised.
+"""
+
+import functools
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+
+# -------------------- Time & duration --------------------
+# Feeds repeat the same ISO spelling for every event, so the string parser
+# tries the variant that last succeeded first (all variants agree on any string
+# they accept), and parsed strings are memoized (kickoffs repeat across
+# Match/Summary). Dict keys are always tried in priority order.
+
+_TIME_KEYS = ("gameKickOffStartTime","kickoff","start","startTime","iso","utc","epoch","ms","millis")
+
+def _coerce_time_value(v) -> str:
+    """
+    Accept ISO string, epoch sec/ms, or dict containing those -> ISO with Z when possible.
+    """
+    def _to_iso(val):
+        try:
+            if isinstance(val, (int, float)):
+                sec = float(val) / (1000.0 if val >= 1_000_000_000_000 else 1.0)
+                dt = datetime.fromtimestamp(sec, tz=timezone.utc)
+                return dt.isoformat().replace("+00:00","Z")
+            if isinstance(val, str):
+                return val.strip()
+        except Exception:
+            pass
+        return ""
+
+    if v is None or v == "": return ""
+    if isinstance(v, (str, int, float)): return _to_iso(v)
+    if isinstance(v, dict):
+        for k in _TIME_KEYS:
+            if k in v:
+                iso = _to_iso(v[k]); 
+                if iso: return iso
+        for vv in v.values():
+            iso = _coerce_time_value(vv)
+            if iso: return iso
+    return ""
+
+def _iso_z(s: str) -> datetime:
+    if not s.endswith("Z"): raise ValueError(s)
+    return datetime.fromisoformat(s.replace("Z","+00:00")).astimezone(timezone.utc)
+
+def _iso_any(s: str) -> datetime:
+    dt = datetime.fromisoformat(s)
+    return dt.astimezone(timezone.utc) if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+def _strptime_variant(fmt: str):
+    return lambda s: datetime.strptime(s, fmt).replace(tzinfo=timezone.utc)
+
+_ISO_VARIANTS = (_iso_z, _iso_any, _strptime_variant("%Y-%m-%dT%H:%M:%S"), _strptime_variant("%Y-%m-%d %H:%M:%S"))
+_iso_variant_hint = 0
+
+@functools.lru_cache(maxsize=8192)
+def _parse_time_string(s: str) -> Optional[datetime]:
+    global _iso_variant_hint
+    hint = _iso_variant_hint
+    order = (hint,) + tuple(i for i in range(len(_ISO_VARIANTS)) if i != hint)
+    for i in order:
+        try:
+            dt = _ISO_VARIANTS[i](s)
+        except Exception:
+            continue
+        _iso_variant_hint = i
+        return dt
+    return None
+
+def parse_event_time(iso_like) -> Optional[datetime]:
+    if iso_like is None or iso_like == "": return None
+    if isinstance(iso_like, dict):
+        iso_like = _coerce_time_value(iso_like) or ""
+        if not iso_like: return None
+    if isinstance(iso_like, (int, float)):
+        try:
+            sec = float(iso_like) / (1000.0 if iso_like >= 1_000_000_000_000 else 1.0)
+            return datetime.fromtimestamp(sec, tz=timezone.utc)
+        except Exception:
+            return None
+    return _parse_time_string(str(iso_like).strip())
+
+DEFAULT_EVENT_SECONDS = 7200
+
+def to_epoch(dt: Optional[datetime]) -> Optional[int]:
+    return int(dt.timestamp()) if dt is not None else None
+
+_DURATION_KEYS = ("ms","millis","milliseconds","durationMs","durationMS","duration_ms","durationMsValue",
+                  "s","sec","seconds","durationS","duration_s","secondsValue")
+
+def _normalize_duration_seconds(v) -> int:
+    """
+    Convert duration fields (seconds or milliseconds or dicts containing them) -> integer seconds.
+    >= 10^7 -> treat as ms. Returns 0 if unknown.
+    """
+    try:
+        if v is None: return 0
+        if isinstance(v, (int, float)): val = float(v)
+        elif isinstance(v, str) and v.strip(): val = float(v.strip())
+        elif isinstance(v, dict):
+            for k in _DURATION_KEYS:
+                if k in v: return _normalize_duration_seconds(v[k])
+            for vv in v.values():
+                sec = _normalize_duration_seconds(vv)
+                if sec: return sec
+            return 0
+        else:
+            return 0
+        return int(val // 1000) if val >= 10_000_000 else int(val)
+    except Exception:
+        return 0
+
+
+# -------------------- Match --------------------
+
+# Always present in mls_schedule.json rows (possibly null), in this order
+_MATCH_BASE_KEYS = (
+    "event_id", "title", "short_title", "league", "league_abbr", "sport", "venue",
+    "url", "airing_type", "badge", "event_time", "end_time",
+)
+
+# Canonical field -> keys to read, first key present wins (legacy/camelCase spellings)
+_MATCH_SOURCES = {
+    "short_title": ("shortTitle", "short_title"),
+    "sport": ("sportName", "sport"),
+    "hero_description": ("heroDescription", "hero_description"),
+    "duration": ("duration", "duration_s"),
+}
+
+def _image_subset(obj: Dict, keys) -> Optional[Dict]:
+    out = {k: obj.get(k) for k in keys if obj.get(k)}
+    return out or None
+
+@dataclass(slots=True)
+class Match:
+    event_id: Optional[str] = None
+    title: Optional[str] = None
+    short_title: Optional[str] = None
+    league: Optional[str] = None
+    league_abbr: Optional[str] = None
+    sport: Optional[str] = None
+    venue: Optional[str] = None
+    url: Optional[str] = None
+    airing_type: Optional[str] = None
+    badge: Optional[str] = None
+    event_time: Any = None
+    end_time: Any = None
+    images: Optional[Dict] = None
+    team1_name: Optional[str] = None
+    team1_abbr: Optional[str] = None
+    team1_id: Optional[str] = None
+    team2_name: Optional[str] = None
+    team2_abbr: Optional[str] = None
+    team2_id: Optional[str] = None
+    team1_images: Optional[Dict] = None
+    team2_images: Optional[Dict] = None
+    playable_id: Optional[str] = None
+    playable_type: Optional[str] = None
+    playable_images: Optional[Dict] = None
+    deep_link: Optional[str] = None
+    deep_link_full: Optional[str] = None
+    type: Optional[str] = None
+    duration: Any = None
+    hero_description: Optional[str] = None
+    # Derived (not serialised)
+    start_dt: Optional[datetime] = field(default=None, init=False, repr=False, compare=False)
+    end_dt: Optional[datetime] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.start_dt = parse_event_time(self.event_time)
+        self.end_dt = parse_event_time(self.end_time)
+
+    @classmethod
+    def from_canvas_item(cls, item: Dict) -> "Match":
+        """Normalize one canvas SportingEvent item."""
+        m = cls(
+            event_id=item.get("id"),
+            title=item.get("title"),
+            short_title=item.get("shortTitle"),
+            league=item.get("leagueName"),
+            league_abbr=item.get("leagueAbbreviation"),
+            sport=item.get("sportName"),
+            venue=item.get("venueName"),
+            url=item.get("url"),
+            airing_type=item.get("airingType"),
+            badge=item.get("badge"),
+            event_time=item.get("eventTime"),
+            end_time=item.get("endAirTime"),
+        )
+
+        # Images/Artwork
+        images = {}
+        for src, key in (("images", "main"), ("artwork", "artwork"), ("thumbnails", "thumbnails"),
+                         ("coverArt", "coverArt"), ("previewFrame", "previewFrame")):
+            if item.get(src):
+                images[key] = item[src]
+        m.images = images or None
+
+        # Teams
+        competitors = item.get("competitors", [])
+        if len(competitors) >= 2:
+            team1 = competitors[0]; team2 = competitors[1]
+            m.team1_name = team1.get("name"); m.team1_abbr = team1.get("abbreviation"); m.team1_id = team1.get("id")
+            m.team2_name = team2.get("name"); m.team2_abbr = team2.get("abbreviation"); m.team2_id = team2.get("id")
+            m.team1_images = _image_subset(team1, ("images", "artwork", "logo"))
+            m.team2_images = _image_subset(team2, ("images", "artwork", "logo"))
+
+        # Playables
+        playables = item.get("playables", [])
+        if playables:
+            p = playables[0]
+            m.playable_id = p.get("id")
+            m.playable_type = p.get("type")
+            playable_imgs = _image_subset(p, ("images", "artwork")) or {}
+            # canonicalMetadata.images.contentImage.url - the composite image with team logos!
+            canonical = p.get("canonicalMetadata", {})
+            if canonical.get("images", {}).get("contentImage", {}).get("url"):
+                playable_imgs["contentImage"] = canonical["images"]["contentImage"]["url"]
+            m.playable_images = playable_imgs or None
+
+        # Deep link
+        if m.url:
+            m.deep_link = f"https://tv.apple.com{m.url}"
+            if m.playable_id:
+                m.deep_link_full = f"{m.deep_link}?playableId={quote(m.playable_id, safe='')}"
+        return m
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "Match":
+        """Build from a mls_schedule.json row (or any dict using the legacy key spellings)."""
+        kwargs = {}
+        for f in fields(cls):
+            if not f.init:
+                continue
+            v = None
+            for src in _MATCH_SOURCES.get(f.name, (f.name,)):
+                if src in d:
+                    v = d[src]
+                    break
+            kwargs[f.name] = v
+        return cls(**kwargs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {k: getattr(self, k) for k in _MATCH_BASE_KEYS}
+        for f in fields(self):
+            if f.init and f.name not in out:
+                v = getattr(self, f.name)
+                if v is not None:
+                    out[f.name] = v
+        return out
+
+    @property
+    def is_live_with_teams(self) -> bool:
+        return (self.airing_type or "").strip().lower() == "live" and bool(self.team1_name) and bool(self.team2_name)
+
+    def image_fields(self) -> Dict[str, Any]:
+        return {"playable_images": self.playable_images, "images": self.images,
+                "team1_images": self.team1_images, "team2_images": self.team2_images}
+
+
+# -------------------- Summary --------------------
+
+@dataclass(slots=True)
+class Summary:
+    title: str = ""
+    short_title: str = ""
+    sport_name: str = "Soccer"
+    type: str = "SportingEvent"
+    hero_description: str = ""
+    home_team: str = ""
+    away_team: str = ""
+    start_time: str = ""
+    end_time: str = ""
+    duration_s: int = 0
+    venue: str = ""
+    primary_playable_id: str = ""
+    primary_url: str = ""
+    deeplink_url: str = ""
+    images: Optional[Dict] = None
+    team1_images: Optional[Dict] = None
+    team2_images: Optional[Dict] = None
+    playable_images: Optional[Dict] = None
+    image_src: Optional[str] = None
+    icon_url: Optional[str] = None
+    # Derived (not serialised). start_ts/stop_ts are UTC epoch seconds resolved once
+    # here; stop falls back to start + duration, else + 2h. Writers use these.
+    start_dt: Optional[datetime] = field(default=None, init=False, repr=False, compare=False)
+    end_dt: Optional[datetime] = field(default=None, init=False, repr=False, compare=False)
+    start_ts: Optional[int] = field(default=None, init=False, repr=False, compare=False)
+    stop_ts: Optional[int] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.start_dt = parse_event_time(self.start_time)
+        self.end_dt = parse_event_time(self.end_time)
+        self.start_ts = to_epoch(self.start_dt)
+        if self.end_dt is not None:
+            self.stop_ts = to_epoch(self.end_dt)
+        elif self.start_ts is not None:
+            self.stop_ts = self.start_ts + (self.duration_s if self.duration_s and self.duration_s > 0 else DEFAULT_EVENT_SECONDS)
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "Summary":
+        return cls(**{f.name: d[f.name] for f in fields(cls) if f.init and f.name in d})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.init}
+
+    def image_fields(self) -> Dict[str, Any]:
+        return {"playable_images": self.playable_images, "images": self.images,
+                "team1_images": self.team1_images, "team2_images": self.team2_images}
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Versioned, atomic artifact publishing.
+
+Layout under the output directory (what NGINX serves):
+
+    releases/20261016T204712Z/   one complete set of artifacts per run
+    current -> releases/<version> swapped with one rename
+    mls.m3u -> current/mls.m3u    stable top-level names (relative symlinks)
+    guide.xml -> current/guide.xml
+    PINNED                        set by rollback; new runs are built but not published
+
+A run builds into releases/.staging-*, seeded with hardlinks to the current
+release so unchanged artifacts (and their mtimes/ETags) carry over at no cost;
+writers replace files via rename, never in place, so older releases stay intact.
+Publishing renames the staging dir into place and swaps `current`, so clients
+always see a matching M3U/XMLTV pair. A run whose served files all match the
+latest release is not published (only its hidden state files are carried
+over), so the newest `keep` releases are distinct versions.
+
+    python mls_publish.py list
+    python mls_publish.py rollback [VERSION]   # previous release by default; pins it
+    python mls_publish.py unpin                # resume publishing new runs
+"""
+
+import os, sys, shutil, filecmp, argparse
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+RELEASES = "releases"
+CURRENT = "current"
+PINNED = "PINNED"
+KEEP_RELEASES = 5
+# Written straight to the root every run (also failed ones), never versioned
+UNVERSIONED = frozenset({"run_metrics.json", "metrics.prom", PINNED})
+
+
+class Publisher:
+    def __init__(self, root: Path, keep: int = KEEP_RELEASES):
+        self.root = Path(root)
+        self.keep = max(1, int(keep))
+        self.releases = self.root / RELEASES
+
+    # ---- state ----
+    def versions(self) -> List[str]:
+        """Published versions, oldest first."""
+        if not self.releases.is_dir():
+            return []
+        return sorted(p.name for p in self.releases.iterdir() if p.is_dir() and not p.name.startswith("."))
+
+    def current(self) -> Optional[str]:
+        try:
+            return Path(os.readlink(self.root / CURRENT)).name
+        except OSError:
+            return None
+
+    def pinned(self) -> Optional[str]:
+        try:
+            return (self.root / PINNED).read_text(encoding="utf-8").strip() or None
+        except OSError:
+            return None
+
+    # ---- build ----
+    def stage(self) -> Path:
+        """New staging dir seeded with hardlinks to the current release (or legacy flat files)."""
+        self.releases.mkdir(parents=True, exist_ok=True)
+        staging = self.releases / f".staging-{os.getpid()}-{_version_stamp()}"
+        staging.mkdir()
+        cur = self.current()
+        src = self.releases / cur if cur else self.root
+        for f in src.iterdir():
+            if f.is_file() and not f.is_symlink() and f.name not in UNVERSIONED:
+                _link_or_copy(f, staging / f.name)
+        return staging
+
+    def discard(self, staging: Path) -> None:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    def publish(self, staging: Path) -> Optional[str]:
+        """
+        Move `staging` into releases/<version> and, unless pinned, swap `current` to it.
+        Returns the new version (also when pinned; it is then kept but not live), or
+        None when nothing served changed and the staging dir was discarded.
+        """
+        same = self._same_as_latest(staging)
+        if same is not None:
+            for f in staging.iterdir():  # hidden state (export manifest) only; not served
+                if f.name.startswith(".") and f.is_file() and not _same_file(f, same / f.name):
+                    os.replace(f, same / f.name)
+            self.discard(staging)
+            self.prune()
+            return None
+        version = _version_stamp()
+        while (self.releases / version).exists():
+            version += "_"
+        os.rename(staging, self.releases / version)
+        if self.pinned():
+            print(f"📌 Release {version} built but not published (pinned to {self.pinned()})")
+        else:
+            self.activate(version)
+        self.prune()
+        return version
+
+    def _same_as_latest(self, staging: Path) -> Optional[Path]:
+        """The latest release (live, or newest while pinned) if `staging` serves exactly the same files."""
+        versions = self.versions()
+        ref = versions[-1] if self.pinned() and versions else self.current()
+        if ref is None or not (self.releases / ref).is_dir():
+            return None
+        ref_dir = self.releases / ref
+        def served(d: Path):
+            return {f.name for f in d.iterdir() if f.is_file() and not f.name.startswith(".") and f.name not in UNVERSIONED}
+        names = served(staging)
+        if names != served(ref_dir):
+            return None
+        return ref_dir if all(_same_file(staging / n, ref_dir / n) for n in names) else None
+
+    # ---- swap ----
+    def activate(self, version: str) -> None:
+        target = self.releases / version
+        if not target.is_dir():
+            raise FileNotFoundError(f"no release {version} under {self.releases}")
+        _atomic_symlink(Path(RELEASES) / version, self.root / CURRENT)
+        self._link_top_level(target)
+
+    def _link_top_level(self, release: Path) -> None:
+        """Point root/<name> at current/<name> for every served file; drop names the release lacks."""
+        names = {f.name for f in release.iterdir()
+                 if f.is_file() and not f.name.startswith(".") and f.name not in UNVERSIONED}
+        for name in names:
+            link = self.root / name
+            want = Path(CURRENT) / name
+            if link.is_symlink() and Path(os.readlink(link)) == want:
+                continue
+            _atomic_symlink(want, link)  # also replaces legacy flat files
+        for p in self.root.iterdir():
+            if p.is_symlink() and p.name != CURRENT and Path(os.readlink(p)).parts[:1] == (CURRENT,) and p.name not in names:
+                p.unlink()
+
+    def rollback(self, version: Optional[str] = None) -> str:
+        """Activate `version` (default: the release before current) and pin it."""
+        versions = self.versions()
+        if version is None:
+            cur = self.current()
+            older = [v for v in versions if cur is None or v < cur]
+            if not older:
+                raise RuntimeError("no older release to roll back to")
+            version = older[-1]
+        self.activate(version)
+        (self.root / PINNED).write_text(version + "\n", encoding="utf-8")
+        return version
+
+    def unpin(self) -> Optional[str]:
+        """Resume publishing; the newest release goes live again. Returns it."""
+        try:
+            (self.root / PINNED).unlink()
+        except FileNotFoundError:
+            pass
+        versions = self.versions()
+        if versions:
+            self.activate(versions[-1])
+            return versions[-1]
+        return None
+
+    def prune(self) -> List[str]:
+        """Delete releases beyond the newest `keep` (never the live or pinned one) and stale staging dirs."""
+        keep = set(self.versions()[-self.keep:]) | {self.current(), self.pinned()}
+        removed = []
+        for v in self.versions():
+            if v not in keep:
+                shutil.rmtree(self.releases / v, ignore_errors=True)
+                removed.append(v)
+        for p in self.releases.glob(".staging-*"):
+            pid = p.name.split("-")[1]
+            if pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+                shutil.rmtree(p, ignore_errors=True)
+        return removed
+
+
+def _version_stamp() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:  # filesystems without hardlinks
+        shutil.copy2(src, dst)
+
+
+def _same_file(a: Path, b: Path) -> bool:
+    """Same inode (carried-over hardlink) or same bytes."""
+    try:
+        return os.path.samefile(a, b) or filecmp.cmp(a, b, shallow=False)
+    except OSError:
+        return False
+
+
+def _atomic_symlink(target: Path, link: Path) -> None:
+    tmp = link.with_name(f".{link.name}.lnk")
+    try:
+        tmp.unlink()
+    except FileNotFoundError:
+        pass
+    os.symlink(target, tmp)
+    os.replace(tmp, link)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Inspect / roll back published MLS artifact releases")
+    ap.add_argument("--out-dir", default=os.environ.get("OUTPUT_DIR") or str(Path(__file__).parent / "out"))
+    ap.add_argument("--keep", type=int, default=int(os.environ.get("KEEP_RELEASES") or KEEP_RELEASES))
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list", help="Show releases, the live one and any pin")
+    rb = sub.add_parser("rollback", help="Make an older release live and pin it")
+    rb.add_argument("version", nargs="?")
+    sub.add_parser("unpin", help="Publish new runs again (newest release goes live)")
+    args = ap.parse_args()
+
+    pub = Publisher(Path(args.out_dir), keep=args.keep)
+    if args.cmd == "list":
+        cur, pin = pub.current(), pub.pinned()
+        for v in pub.versions():
+            marks = (" ← live" if v == cur else "") + (" 📌" if v == pin else "")
+            print(f"{v}{marks}")
+        if not pub.versions():
+            print("(no releases)")
+    elif args.cmd == "rollback":
+        try:
+            v = pub.rollback(args.version)
+        except (RuntimeError, FileNotFoundError) as e:
+            print(f"❌ {e}"); sys.exit(1)
+        print(f"⏪ Live release is now {v} (pinned; run 'unpin' to resume publishing)")
+    elif args.cmd == "unpin":
+        v = pub.unpin()
+        print(f"▶️  Unpinned; live release is {v or '(none)'}")
+
+
+if __name__ == "__main__":
+    main()
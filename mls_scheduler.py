@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MLS Deeplink — adaptive refresh scheduler
+=========================================
+Replaces the once-a-day sleep loop. After every run it reads the kickoff /
+end times in every *schedule.json (one per channel) and picks the next wake-up:
+
+- inside a match window (kickoff - PRE .. end + POST): every GAMEDAY minutes
+- elsewhere on a day with matches:                     every MATCHDAY minutes
+- otherwise:                                            the daily RUN_AT
+- never later than the start of the next match window
+
+Plus random jitter, exponential backoff after failed runs, an flock-based
+run lock (overlapping/manual runs are skipped, not queued) and a hard
+per-run timeout that kills the whole generator process group.
+
+--daemon keeps the pipeline resident instead of spawning scripts/generate.sh:
+one interpreter, one MLSAPIClient (pooled TLS session + response cache) and
+the exporter's compiled tables/caches are reused by every refresh. Runs
+are bounded by the client's request budget and, like subprocess runs, by
+RUN_TIMEOUT_S: a run past it is abandoned and, since a thread cannot be
+killed, the scheduler re-execs itself (keeping its schedule) to drop it.
+
+Either mode listens on a Unix control socket (CONTROL_SOCKET):
+    python mls_scheduler.py --trigger refresh   # run now, reply when done
+    python mls_scheduler.py --trigger status    # last run / next wake-up
+
+Configuration comes from the environment (see README) or flags.
+"""
+
+import os, sys, time, json, fcntl, random, signal, socket, argparse, threading, subprocess, socketserver
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from mls_models import Match
+
+REPO_ROOT = Path(__file__).resolve().parent
+RESUME_ENV = "MLS_SCHEDULER_RESUME"
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return float(default)
+
+
+def log(msg: str, log_file: Optional[Path]) -> None:
+    line = f"[scheduler] {datetime.now().astimezone().isoformat(timespec='seconds')} {msg}"
+    console = getattr(sys.stdout, "console", sys.stdout)  # past a --daemon run's output routing
+    print(line, file=console, flush=True)
+    if log_file:
+        try:
+            with open(log_file, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError:
+            pass
+
+
+def load_windows(schedule_paths: List[Path], pre: timedelta, post: timedelta) -> List[Tuple[datetime, datetime]]:
+    """Match windows (kickoff - pre, end + post) from schedule JSON files; end defaults to kickoff + 2h."""
+    rows = []
+    for path in schedule_paths:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        if isinstance(data, list):
+            rows.extend(data)
+    windows = []
+    for r in rows:
+        if not isinstance(r, dict):
+            continue
+        m = Match.from_dict(r)
+        if m.start_dt is None:
+            continue
+        end = m.end_dt if m.end_dt and m.end_dt > m.start_dt else m.start_dt + timedelta(hours=2)
+        windows.append((m.start_dt - pre, end + post))
+    return sorted(windows)
+
+
+def next_daily(now: datetime, run_at: str) -> datetime:
+    """Next occurrence of HH:MM in local time."""
+    hh, mm = (int(x) for x in run_at.split(":", 1))
+    local = now.astimezone()
+    cand = local.replace(hour=hh, minute=mm, second=0, microsecond=0)
+    if cand <= local:
+        cand = (local + timedelta(days=1)).replace(hour=hh, minute=mm, second=0, microsecond=0)
+    return cand.astimezone(timezone.utc)
+
+
+def next_run_at(now: datetime, windows: List[Tuple[datetime, datetime]], run_at: str,
+                gameday: timedelta, matchday: timedelta) -> Tuple[datetime, str]:
+    """Earliest of: daily RUN_AT, game-window cadence, match-day cadence, next window start."""
+    best, why = next_daily(now, run_at), "daily"
+    today = now.astimezone().date()
+    for ws, we in windows:
+        if ws <= now < we:
+            cand, reason = now + gameday, "in match window"
+        elif ws > now:
+            cand, reason = ws, "match window opens"
+        else:
+            continue
+        if cand < best:
+            best, why = cand, reason
+        if ws.astimezone().date() == today and now + matchday < best:
+            best, why = now + matchday, "match day"
+    return best, why
+
+
+@contextmanager
+def run_lock(lock_path: Path):
+    """Yield True while holding the exclusive run lock, False if another run holds it."""
+    lock_fd = os.open(lock_path, os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+    finally:
+        os.close(lock_fd)
+
+
+def run_generator(cmd: List[str], timeout: float, log_file: Optional[Path], lock_path: Path) -> Optional[bool]:
+    """Run the generator under an exclusive lock. Returns None if another run holds the lock."""
+    with run_lock(lock_path) as held:
+        if not held:
+            log("another run holds the lock; skipping", log_file)
+            return None
+        out = open(log_file, "a", encoding="utf-8") if log_file else None
+        try:
+            proc = subprocess.Popen(cmd, cwd=REPO_ROOT, stdout=out, stderr=subprocess.STDOUT,
+                                    start_new_session=True)
+            try:
+                rc = proc.wait(timeout=timeout if timeout > 0 else None)
+            except subprocess.TimeoutExpired:
+                log(f"run exceeded {timeout:.0f}s; killing", log_file)
+                os.killpg(proc.pid, signal.SIGTERM)
+                try:
+                    proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                    proc.wait()
+                return False
+        finally:
+            if out:
+                out.close()
+        log(f"finished generate (exit={rc})", log_file)
+        return rc == 0
+
+
+class _RunOutput:
+    """
+    sys.stdout/sys.stderr stand-in for --daemon, installed once: while a run is
+    active everything printed goes to the run's log file, otherwise to the
+    console. Unlike redirect_stdout nothing is swapped per run, so a run that
+    never returns cannot leave the process redirected; log() writes to the
+    console stream directly and is never captured.
+    """
+
+    def __init__(self, console):
+        self.console = console
+        self.target = None
+
+    def write(self, data: str) -> int:
+        target = self.target
+        try:
+            return (target or self.console).write(data)
+        except ValueError:  # the run's log file was closed under a straggling writer
+            return self.console.write(data)
+
+    def flush(self) -> None:
+        target = self.target
+        for stream in (target, self.console):
+            try:
+                if stream:
+                    stream.flush()
+            except ValueError:
+                pass
+
+    def __getattr__(self, name):
+        return getattr(self.console, name)
+
+
+class WarmPipeline:
+    """
+    In-process generator for --daemon: one MLSAPIClient (session, pool, cache) kept across runs.
+    Each run executes in a worker thread holding the run lock; past `timeout` it is abandoned
+    and `expired` is set, and the scheduler restarts itself to get rid of it (see main).
+    """
+
+    def __init__(self, out_dir: Path, timeout: float, log_file: Optional[Path], lock_path: Path):
+        import generate_mls  # deferred: the subprocess mode never pays for requests/exporter imports
+        self.gen = generate_mls
+        argv = ["--out-dir", str(out_dir), "--write-json"]
+        if timeout > 0:
+            argv += ["--budget", str(min(timeout, generate_mls.scraper.MLSAPIClient.RUN_BUDGET))]
+        self.args = generate_mls.build_parser().parse_args(argv)
+        self.client = generate_mls.build_client(self.args)
+        self.timeout = timeout
+        self.log_file = log_file
+        self.lock_path = lock_path
+        self.expired = False
+        self.stdout, self.stderr = _RunOutput(sys.stdout), _RunOutput(sys.stderr)
+        sys.stdout, sys.stderr = self.stdout, self.stderr
+
+    def __call__(self) -> Optional[bool]:
+        result: Dict = {}
+        worker = threading.Thread(target=self._run, args=(result,), name="warm-run", daemon=True)
+        worker.start()
+        worker.join(self.timeout if self.timeout > 0 else None)
+        if worker.is_alive():
+            # A thread cannot be killed: detach its output and let main() replace the process
+            self.stdout.target = self.stderr.target = None
+            self.expired = True
+            log(f"run exceeded {self.timeout:.0f}s; abandoning it", self.log_file)
+            return False
+        return result.get("ok")
+
+    def _run(self, result: Dict) -> None:
+        with run_lock(self.lock_path) as held:
+            if not held:
+                log("another run holds the lock; skipping", self.log_file)
+                result["ok"] = None
+                return
+            t0 = time.monotonic()
+            out = open(self.log_file, "a", encoding="utf-8") if self.log_file else None
+            self.stdout.target = self.stderr.target = out
+            try:
+                rc = self.gen.run(self.args, client=self.client)
+            except Exception as e:
+                log(f"run raised {type(e).__name__}: {e}", self.log_file)
+                rc = 1
+            finally:
+                if self.stdout.target is out:
+                    self.stdout.target = self.stderr.target = None
+                if out:
+                    out.close()
+            log(f"finished generate (exit={rc}) in {time.monotonic() - t0:.3f}s", self.log_file)
+            result["ok"] = rc == 0
+
+
+class SchedulerState:
+    """Shared between the timer loop and control-socket handlers."""
+
+    def __init__(self):
+        self.wake = threading.Event()
+        self.cond = threading.Condition()
+        self.started = 0
+        self.completed = 0
+        self.status: Dict = {"mode": None, "running": False, "last_ok": None, "last_run": None,
+                             "last_duration_s": None, "failures": 0, "next_run": None, "next_reason": None}
+
+    def snapshot(self) -> Dict:
+        with self.cond:
+            return dict(self.status, runs=self.completed)
+
+    def begin(self) -> None:
+        with self.cond:
+            self.started += 1
+            self.status.update(running=True, last_run=datetime.now().astimezone().isoformat(timespec="seconds"))
+
+    def end(self, ok: Optional[bool], duration: float, failures: int) -> None:
+        with self.cond:
+            self.completed += 1
+            self.status.update(running=False, last_ok=ok, last_duration_s=round(duration, 3), failures=failures)
+            self.cond.notify_all()
+
+    def request_refresh(self, timeout: float) -> Dict:
+        """Wake the loop and wait until a run that started after this request has finished."""
+        with self.cond:
+            target = self.started + 1
+            self.wake.set()
+            self.cond.wait_for(lambda: self.completed >= target, timeout=timeout if timeout > 0 else None)
+        return self.snapshot()
+
+
+def serve_control(path: Path, state: SchedulerState, timeout: float) -> socketserver.BaseServer:
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            cmd = self.rfile.readline().decode("utf-8", "replace").strip().lower()
+            if cmd == "refresh":
+                reply = state.request_refresh(timeout)
+            elif cmd == "status":
+                reply = state.snapshot()
+            else:
+                reply = {"error": f"unknown command {cmd!r}", "commands": ["refresh", "status"]}
+            self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    server = Server(str(path), Handler)
+    threading.Thread(target=server.serve_forever, name="control-socket", daemon=True).start()
+    return server
+
+
+def send_command(path: Path, cmd: str, timeout: float) -> str:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout if timeout > 0 else None)
+        sock.connect(str(path))
+        sock.sendall((cmd + "\n").encode("utf-8"))
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b"".join(chunks).decode("utf-8").strip()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Adaptive MLS refresh scheduler")
+    ap.add_argument("--output-dir", default=os.environ.get("OUTPUT_DIR", str(REPO_ROOT / "out")))
+    ap.add_argument("--log-file", default=os.environ.get("LOG_FILE", "/logs/generate.log"))
+    ap.add_argument("--run-at", default=os.environ.get("RUN_AT", "04:17"), help="Daily baseline HH:MM (local)")
+    ap.add_argument("--gameday-min", type=float, default=_env_float("REFRESH_GAMEDAY_MIN", 15))
+    ap.add_argument("--matchday-min", type=float, default=_env_float("REFRESH_MATCHDAY_MIN", 60))
+    ap.add_argument("--pre-hours", type=float, default=_env_float("REFRESH_PRE_HOURS", 3))
+    ap.add_argument("--post-hours", type=float, default=_env_float("REFRESH_POST_HOURS", 3))
+    ap.add_argument("--jitter-s", type=float, default=_env_float("REFRESH_JITTER_S", 60))
+    ap.add_argument("--backoff-max-min", type=float, default=_env_float("FAILURE_BACKOFF_MAX_MIN", 60))
+    ap.add_argument("--timeout-s", type=float, default=_env_float("RUN_TIMEOUT_S", 600), help="Hard per-run timeout (0 = none)")
+    ap.add_argument("--lock-file", default=os.environ.get("RUN_LOCK", "/tmp/mlsdeeplink.lock"))
+    ap.add_argument("--control-socket", default=os.environ.get("CONTROL_SOCKET", "/tmp/mlsdeeplink.sock"),
+                    help="Unix socket accepting 'refresh' / 'status' ('' = disabled)")
+    ap.add_argument("--daemon", action="store_true", default=os.environ.get("RUN_MODE", "").lower() == "daemon",
+                    help="Run the pipeline in-process with a warm session instead of spawning generate.sh")
+    ap.add_argument("--trigger", choices=("refresh", "status"), help="Send a command to a running scheduler and exit")
+    ap.add_argument("--once", action="store_true", help="Run once and exit")
+    args = ap.parse_args()
+
+    if args.trigger:
+        try:
+            print(send_command(Path(args.control_socket), args.trigger, args.timeout_s))
+        except OSError as e:
+            print(f"[scheduler] cannot reach {args.control_socket}: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    out_dir = Path(args.output_dir)
+    log_file = Path(args.log_file) if args.log_file else None
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if log_file:
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+    lock_path = Path(args.lock_file)
+    if args.daemon:
+        runner: Callable[[], Optional[bool]] = WarmPipeline(out_dir, args.timeout_s, log_file, lock_path)
+    else:
+        cmd = ["bash", str(REPO_ROOT / "scripts" / "generate.sh")]
+        runner = lambda: run_generator(cmd, args.timeout_s, log_file, lock_path)
+    gameday = timedelta(minutes=args.gameday_min)
+    matchday = timedelta(minutes=args.matchday_min)
+    pre, post = timedelta(hours=args.pre_hours), timedelta(hours=args.post_hours)
+    # After a restart that dropped an abandoned --daemon run: "failures:next wake-up epoch"
+    failures, resume_at = 0, None
+    resume = os.environ.pop(RESUME_ENV, "")
+    if resume:
+        try:
+            n, ts = resume.split(":", 1)
+            failures, resume_at = int(n), float(ts)
+        except ValueError:
+            pass
+
+    state = SchedulerState()
+    state.status["mode"] = "daemon" if args.daemon else "subprocess"
+    if args.control_socket and not args.once:
+        serve_control(Path(args.control_socket), state, args.timeout_s)
+        log(f"control socket at {args.control_socket}", log_file)
+
+    while True:
+        if resume_at is not None:
+            wait = resume_at - time.time()
+            resume_at = None
+            if wait > 0:
+                log(f"restarted; sleeping {wait:.0f}s until the planned run", log_file)
+                if state.wake.wait(wait):
+                    log("refresh requested via control socket", log_file)
+        state.wake.clear()
+        log("starting generate", log_file)
+        state.begin()
+        t0 = time.monotonic()
+        ok = runner()
+        if ok is False:
+            failures += 1
+        elif ok:
+            failures = 0
+        state.end(ok, time.monotonic() - t0, failures)
+        if args.once:
+            sys.exit(0 if ok else 1)
+
+        now = datetime.now(timezone.utc)
+        windows = load_windows(sorted(out_dir.glob("*schedule.json")), pre, post)
+        wake, why = next_run_at(now, windows, args.run_at, gameday, matchday)
+        if failures:
+            backoff = timedelta(seconds=min(args.backoff_max_min * 60, 60 * 2 ** (failures - 1)))
+            if now + backoff < wake:
+                wake, why = now + backoff, f"retry after failure #{failures}"
+        delay = max(60.0, (wake - now).total_seconds() + random.uniform(-args.jitter_s, args.jitter_s))
+        next_at = (now + timedelta(seconds=delay)).astimezone().isoformat(timespec="minutes")
+        with state.cond:
+            state.status.update(next_run=next_at, next_reason=why)
+        if getattr(runner, "expired", False):
+            # The abandoned run's thread may still be wedged (and hold the run lock):
+            # replace the process, keeping the schedule and failure count
+            log(f"restarting to drop the abandoned run (next ~{next_at})", log_file)
+            os.environ[RESUME_ENV] = f"{failures}:{time.time() + delay:.0f}"
+            os.execv(sys.executable, [sys.executable, os.path.abspath(sys.argv[0])] + sys.argv[1:])
+        log(f"sleeping {delay:.0f}s ({why}; next ~{next_at})", log_file)
+        if state.wake.wait(delay):
+            log("refresh requested via control socket", log_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistent event store (SQLite, stdlib).
+
+mls_schedule.json is one snapshot of the canvas. The store instead keeps
+every event ever seen, one row per (channel, event_id), upserted each run:
+new events are inserted, changed ones (kickoff moved, new deeplink, ...)
+rewritten, unchanged ones only get their last_seen bumped. Events Apple
+stops listing stay in the store, so a guide can still be built from them
+while they are inside its window.
+
+    store = EventStore(path)
+    store.upsert("mls", matches)                 # -> {"inserted": .., "updated": .., ...}
+    store.window("mls", since_ts, until_ts)      # Matches overlapping the window, by kickoff
+    store.backfill("mls", t, since_ts)           # kicked-off events no longer listed at t
+    store.by_team("Inter Miami", since_ts)
+
+Rows carry the full Match as JSON plus indexed columns (kickoff / end epoch
+seconds, team names, airing type) for the queries.
+"""
+
+import json, time, sqlite3, hashlib, argparse, os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import mls_json
+from mls_models import Match, DEFAULT_EVENT_SECONDS, to_epoch, _normalize_duration_seconds
+
+STORE_NAME = ".state/events.sqlite3"
+# Longest an event may run; bounds the kickoff range scanned for a window
+MAX_EVENT_SECONDS = 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    channel     TEXT NOT NULL,
+    event_id    TEXT NOT NULL,
+    kickoff_ts  INTEGER,
+    end_ts      INTEGER,
+    team1       TEXT,
+    team2       TEXT,
+    airing_type TEXT,
+    pos         INTEGER NOT NULL DEFAULT 0,
+    hash        TEXT NOT NULL,
+    data        TEXT NOT NULL,
+    first_seen  INTEGER NOT NULL,
+    last_seen   INTEGER NOT NULL,
+    updated     INTEGER NOT NULL,
+    PRIMARY KEY (channel, event_id)
+);
+CREATE INDEX IF NOT EXISTS events_kickoff ON events (channel, kickoff_ts);
+CREATE INDEX IF NOT EXISTS events_team1 ON events (team1 COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS events_team2 ON events (team2 COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS events_airing ON events (airing_type, kickoff_ts);
+"""
+
+
+def _end_ts(m: Match, kickoff: Optional[int]) -> Optional[int]:
+    """End epoch seconds as the exporter derives it: end time, else kickoff + duration / +2h."""
+    end = to_epoch(m.end_dt)
+    if end is None and kickoff is not None:
+        dur = _normalize_duration_seconds(m.duration)
+        end = kickoff + (dur if dur > 0 else DEFAULT_EVENT_SECONDS)
+    return end
+
+
+class EventStore:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "EventStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def upsert(self, channel: str, matches: Iterable[Match], seen_at: Optional[int] = None) -> Dict[str, int]:
+        """Merge one run's matches for `channel`; returns inserted/updated/unchanged/skipped counts."""
+        now = int(seen_at if seen_at is not None else time.time())
+        known = dict(self.db.execute("SELECT event_id, hash FROM events WHERE channel = ?", (channel,)))
+        inserts, updates, touched = [], [], []
+        skipped = 0
+        for pos, m in enumerate(matches):
+            if not m.event_id:
+                skipped += 1
+                continue
+            data = json.dumps(m.to_dict(), ensure_ascii=False, sort_keys=True)
+            digest = hashlib.sha1(data.encode("utf-8")).hexdigest()
+            old = known.get(m.event_id)
+            if old == digest:
+                touched.append((now, pos, channel, m.event_id))
+                continue
+            kickoff = to_epoch(m.start_dt)
+            row = (kickoff, _end_ts(m, kickoff), m.team1_name, m.team2_name, m.airing_type,
+                   pos, digest, data, now, now)
+            if old is None:
+                inserts.append((channel, m.event_id) + row + (now,))
+            else:
+                updates.append(row + (channel, m.event_id))
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO events (channel, event_id, kickoff_ts, end_ts, team1, team2, airing_type,"
+                " pos, hash, data, last_seen, updated, first_seen) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)", inserts)
+            self.db.executemany(
+                "UPDATE events SET kickoff_ts=?, end_ts=?, team1=?, team2=?, airing_type=?, pos=?, hash=?,"
+                " data=?, last_seen=?, updated=? WHERE channel=? AND event_id=?", updates)
+            self.db.executemany("UPDATE events SET last_seen=?, pos=? WHERE channel=? AND event_id=?", touched)
+        return {"inserted": len(inserts), "updated": len(updates), "unchanged": len(touched), "skipped": skipped}
+
+    def window(self, channel: str, since_ts: int, until_ts: Optional[int] = None,
+               airing_type: Optional[str] = None) -> List[Match]:
+        """
+        Matches of `channel` still running at or after `since_ts` and kicking off
+        before `until_ts`, in kickoff order.
+        """
+        sql = "SELECT data FROM events WHERE channel = ? AND kickoff_ts >= ? AND kickoff_ts < ? AND end_ts >= ?"
+        params: list = [channel, since_ts - MAX_EVENT_SECONDS, until_ts if until_ts is not None else 1 << 62, since_ts]
+        if airing_type:
+            sql += " AND airing_type = ? COLLATE NOCASE"
+            params.append(airing_type)
+        sql += " ORDER BY kickoff_ts IS NULL, kickoff_ts, pos"
+        return [Match.from_dict(mls_json.loads(d)) for (d,) in self.db.execute(sql, params)]
+
+    def backfill(self, channel: str, listed_at: int, since_ts: int, include_listed: bool = False) -> List[Match]:
+        """
+        Matches Apple no longer listed at `listed_at` (last_seen before it) that had
+        already kicked off by then and are still running at or after `since_ts`, in
+        kickoff order. Unlisted future events are left out: they were cancelled or
+        moved. include_listed adds every match still listed at `listed_at`, for
+        building a guide from the store alone.
+        """
+        sql = ("SELECT data FROM events WHERE channel = ? AND ((last_seen < ? AND kickoff_ts >= ?"
+               " AND kickoff_ts <= ? AND end_ts >= ?)" + (" OR last_seen >= ?)" if include_listed else ")")
+               + " ORDER BY kickoff_ts IS NULL, kickoff_ts, pos")
+        params: list = [channel, listed_at, since_ts - MAX_EVENT_SECONDS, listed_at, since_ts]
+        if include_listed:
+            params.append(listed_at)
+        return [Match.from_dict(mls_json.loads(d)) for (d,) in self.db.execute(sql, params)]
+
+    def by_team(self, team: str, since_ts: Optional[int] = None, channel: Optional[str] = None) -> List[Match]:
+        """Every stored match a team plays in (case-insensitive name), by kickoff."""
+        sql = ("SELECT data FROM events WHERE (team1 = ? COLLATE NOCASE OR team2 = ? COLLATE NOCASE)"
+               " AND coalesce(kickoff_ts, 0) >= ?")
+        params: list = [team, team, since_ts or 0]
+        if channel:
+            sql += " AND channel = ?"
+            params.append(channel)
+        sql += " ORDER BY kickoff_ts"
+        return [Match.from_dict(mls_json.loads(d)) for (d,) in self.db.execute(sql, params)]
+
+    def last_seen(self, channel: str) -> Optional[int]:
+        """When `channel` was last upserted (its still-listed events carry this last_seen)."""
+        return self.db.execute("SELECT max(last_seen) FROM events WHERE channel = ?", (channel,)).fetchone()[0]
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.db.execute("SELECT channel, count(*) FROM events GROUP BY channel"))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Query the persistent MLS event store")
+    ap.add_argument("--store", default=os.environ.get("EVENT_STORE")
+                    or str(Path(os.environ.get("OUTPUT_DIR") or Path(__file__).parent / "out") / STORE_NAME))
+    ap.add_argument("--channel", default="mls")
+    ap.add_argument("--team", help="Matches for this team (any time unless --hours)")
+    ap.add_argument("--hours", type=float, help="Window from now - HOURS to now + HOURS")
+    args = ap.parse_args()
+
+    with EventStore(Path(args.store)) as store:
+        now = int(time.time())
+        if args.team:
+            rows = store.by_team(args.team, now - int(args.hours * 3600) if args.hours else None, args.channel)
+        else:
+            span = int((args.hours or 24) * 3600)
+            rows = store.window(args.channel, now - span, now + span)
+        print(f"📚 {args.store}: " + ", ".join(f"{c}={n}" for c, n in store.counts().items()))
+        for m in rows:
+            when = m.start_dt.astimezone().strftime("%Y-%m-%d %H:%M") if m.start_dt else "?"
+            print(f"  {when}  {m.title or m.short_title or m.event_id}  [{m.airing_type or '-'}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,17 +8,24 @@ Apple TV MLS Schedule Scraper — CLEAN OUTPUT (v2)
 - Keeps the same API flow/fields as your working version.
 """
 
-import sys, os, argparse, json, requests
+import sys, os, argparse, json, copy, hashlib, random, threading, time, requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional
 
-# --- Try to force UTF‑8 stdout if the terminal supports it (Py3.7+) ---
-try:
-    if hasattr(sys.stdout, "reconfigure"):
-        sys.stdout.reconfigure(encoding="utf-8")
-except Exception:
-    pass
+import mls_json
+from mls_archive import archive_from_env
+from mls_models import Match
+
+def force_utf8_stdout() -> None:
+    """Try to force UTF‑8 stdout if the terminal supports it (Py3.7+). Called by entry points, not on import."""
+    try:
+        if hasattr(sys.stdout, "reconfigure"):
+            sys.stdout.reconfigure(encoding="utf-8")
+    except Exception:
+        pass
 
 def _supports_utf8() -> bool:
     enc = getattr(sys.stdout, "encoding", None) or ""
@@ -67,18 +74,155 @@ def _symbols(use_emoji: bool):
         "party": "[DONE]",
     }
 
-def _normalize_event_time(val):
-    """Return an ISO8601-like string for event_time regardless of schema or None if unknown."""
-    if isinstance(val, str):
-        return val
-    if isinstance(val, dict):
-        for k in ("iso8601", "string", "utc", "value", "start", "time"):
-            v = val.get(k)
-            if isinstance(v, str):
-                return v
-    return None
 OUT_DIR = Path(__file__).parent / 'out'
-OUT_DIR.mkdir(parents=True, exist_ok=True)
+
+
+class ResponseCache:
+    """
+    On-disk conditional-request cache: one <key>.body + <key>.json (meta) pair per URL.
+    - Entries younger than `ttl` are served without touching the network.
+    - Older entries are revalidated with If-None-Match / If-Modified-Since.
+    - Total body size is capped at `max_bytes`; least recently used entries go first.
+    """
+
+    def __init__(self, cache_dir: Path, ttl: float = 300, max_bytes: int = 64 * 1024 * 1024):
+        self.dir = Path(cache_dir)
+        self.ttl = float(ttl)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key_for(url: str, params: Optional[Dict] = None) -> str:
+        raw = url + "?" + "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+    def _paths(self, key: str):
+        return self.dir / f"{key}.json", self.dir / f"{key}.body"
+
+    def load(self, key: str) -> Optional[Dict]:
+        meta_path, body_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            meta["body"] = body_path.read_bytes()
+            return meta
+        except Exception:
+            return None
+
+    def is_fresh(self, entry: Dict) -> bool:
+        return (time.time() - float(entry.get("stored_at", 0))) < self.ttl
+
+    def conditional_headers(self, entry: Optional[Dict]) -> Dict[str, str]:
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, key: str, url: str, body: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        meta_path, body_path = self._paths(key)
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "sha256": hashlib.sha256(body).hexdigest(),
+            "size": len(body),
+            "stored_at": time.time(),
+        }
+        with self._lock:
+            body_path.write_bytes(body)
+            meta_path.write_text(json.dumps(meta), encoding="utf-8")
+            self._evict(keep=key)
+
+    def touch(self, key: str) -> None:
+        """Mark an entry as revalidated (resets its TTL and LRU position)."""
+        meta_path, body_path = self._paths(key)
+        with self._lock:
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                meta["stored_at"] = time.time()
+                meta_path.write_text(json.dumps(meta), encoding="utf-8")
+                os.utime(body_path, None)
+            except Exception:
+                pass
+
+    def mark_used(self, key: str) -> None:
+        """Bump an entry's LRU position on a fresh hit without extending its TTL."""
+        _, body_path = self._paths(key)
+        with self._lock:
+            try:
+                os.utime(body_path, None)
+            except OSError:
+                pass
+
+    def _evict(self, keep: str) -> None:
+        bodies = []
+        for bp in self.dir.glob("*.body"):
+            try:
+                st = bp.stat()
+                bodies.append((st.st_mtime, st.st_size, bp))
+            except OSError:
+                pass
+        total = sum(size for _, size, _ in bodies)
+        for _, size, bp in sorted(bodies):
+            if total <= self.max_bytes:
+                break
+            if bp.stem == keep:
+                continue
+            for path in (bp, bp.with_suffix(".json")):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            total -= size
+
+
+class TransportStats:
+    """Thread-safe per-request latency and retry counters for one client."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.bytes = 0
+        self.latencies: List[float] = []
+        self.statuses: Dict[int, int] = {}
+
+    def record(self, latency: float, status: Optional[int], nbytes: int = 0) -> None:
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            self.bytes += nbytes
+            if status is not None:
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def add_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def add_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+
+    def summary(self) -> Dict:
+        with self._lock:
+            lat = sorted(self.latencies)
+        def pct(p):
+            return round(lat[min(len(lat) - 1, int(p * len(lat)))], 3) if lat else 0.0
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "bytes": self.bytes,
+            "statuses": dict(self.statuses),
+            "latency_p50_s": pct(0.50),
+            "latency_p95_s": pct(0.95),
+            "latency_max_s": round(lat[-1], 3) if lat else 0.0,
+            "latency_total_s": round(sum(lat), 3),
+        }
 
 
 class MLSAPIClient:
@@ -90,8 +234,54 @@ class MLSAPIClient:
     UTSK = "6e3013c6d6fae3c2::::::9b5dc2888bdb9b92"
     UTSCF = "OjAAAAEAAAAAAAIAEAAAACMAKwAtAA~~"
 
-    def __init__(self):
+    # Shelf pagination: shelves are fetched concurrently, each following its own
+    # nextToken chain. MAX_SHELF_PAGES guards against upstream token loops.
+    SHELF_WORKERS = 6
+    MAX_SHELF_PAGES = 50
+
+    # Transport: statuses worth retrying, backoff = min(cap, base * 2^attempt) with full jitter
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    MAX_RETRIES = 3
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 8.0
+    CONNECT_TIMEOUT = 5.0
+    READ_TIMEOUT = 15.0
+    RUN_BUDGET = 120.0
+
+    def __init__(self, max_workers: int = SHELF_WORKERS, cache: Optional[ResponseCache] = None,
+                 max_retries: int = MAX_RETRIES, connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT, budget: float = RUN_BUDGET,
+                 channel: Optional[str] = None, referer: Optional[str] = None, pool_size: Optional[int] = None,
+                 base_url: Optional[str] = None):
+        if base_url:  # e.g. a local mls_mock.py server
+            self.BASE_URL = base_url.rstrip("/")
+        self.max_workers = max(1, int(max_workers))
+        self.cache = cache
+        self.max_retries = max(0, int(max_retries))
+        self.connect_timeout = float(connect_timeout)
+        self.read_timeout = float(read_timeout)
+        self.budget = float(budget)
+        self.deadline: Optional[float] = None
+        self.stats = TransportStats()
+        # False once a fetch returned the exact bytes we already had (304, fresh hit or same body)
+        self.changed = True
+        # sha256 of every body behind the last canvas (canvas + shelf pages), see canvas_digest()
+        self.body_hashes: List[str] = []
+        # Outcome of the last canvas request: HTTP status (None on transport failure / fresh cache hit)
+        # and how the cache answered it ("off", "fresh", "revalidated", "miss")
+        self.last_status: Optional[int] = None
+        self.last_cache: str = "off"
+        self.canvas_status: Optional[int] = None
+        self.canvas_cache: str = "off"
+        self.channel = channel or self.MLS_CHANNEL
+        # Per-channel Referer, sent with each request so sibling clients can share one session
+        self.headers: Dict[str, str] = {"Referer": referer} if referer else {}
         self.session = requests.Session()
+        # One pooled adapter sized to the worker pool so concurrent shelf pages reuse connections
+        # (retries are handled in _request so they can be counted and budgeted)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size or self.max_workers, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self.session.headers.update({
             "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
             "Accept": "application/json",
@@ -99,6 +289,24 @@ class MLSAPIClient:
             "Referer": "https://tv.apple.com/us/channel/mls-season-pass/tvs.sbd.7000",
         })
 
+    def for_channel(self, channel: str, referer: Optional[str] = None) -> "MLSAPIClient":
+        """
+        A client for another canvas that shares this one's session (connection pool)
+        and response cache but keeps its own run state, so channels can be fetched concurrently.
+        """
+        if channel == self.channel and (not referer or self.headers.get("Referer") == referer):
+            return self
+        sibling = copy.copy(self)
+        sibling.channel = channel
+        sibling.headers = {"Referer": referer} if referer else dict(self.headers)
+        sibling.stats = TransportStats()
+        sibling.deadline = None
+        sibling.changed = True
+        sibling.body_hashes = []
+        sibling.last_status, sibling.last_cache = None, "off"
+        sibling.canvas_status, sibling.canvas_cache = None, "off"
+        return sibling
+
     def get_default_params(self) -> Dict:
         return {
             "caller": "web",
@@ -110,12 +318,90 @@ class MLSAPIClient:
             "utscf": self.UTSCF,
         }
 
-    def get_channel_canvas(self) -> Optional[Dict]:
-        url = f"{self.BASE_URL}/canvases/channels/{self.MLS_CHANNEL}"
+    def start_budget(self) -> None:
+        """Start the wall-clock budget shared by every request of one run."""
+        self.deadline = time.monotonic() + self.budget if self.budget > 0 else None
+
+    def _remaining(self) -> Optional[float]:
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def _backoff(self, attempt: int, response=None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(self.BACKOFF_MAX, float(retry_after))
+        return random.uniform(0, min(self.BACKOFF_MAX, self.BACKOFF_BASE * (2 ** attempt)))
+
+    def _request(self, url: str, params: Dict, headers: Optional[Dict] = None):
+        """
+        GET with retries on connection errors/timeouts and RETRY_STATUSES.
+        Returns the final Response (any status) or None when every attempt failed
+        or the run budget ran out.
+        """
+        attempt = 0
+        while True:
+            remaining = self._remaining()
+            if remaining is not None and remaining <= 0:
+                print(f"[X] Error: request budget of {self.budget:.0f}s exhausted")
+                self.stats.add_failure()
+                return None
+            read_timeout = self.read_timeout if remaining is None else max(0.1, min(self.read_timeout, remaining))
+            t0 = time.monotonic()
+            response = None
+            try:
+                response = self.session.get(url, params=params, headers={**self.headers, **(headers or {})},
+                                            timeout=(self.connect_timeout, read_timeout))
+                self.stats.record(time.monotonic() - t0, response.status_code, len(response.content))
+                if response.status_code not in self.RETRY_STATUSES:
+                    return response
+                error = f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.stats.record(time.monotonic() - t0, None)
+                error = str(e)
+            if attempt >= self.max_retries:
+                print(f"[X] Error: {error} (gave up after {attempt + 1} attempts)")
+                self.stats.add_failure()
+                return response
+            delay = self._backoff(attempt, response)
+            remaining = self._remaining()
+            if remaining is not None and delay >= remaining:
+                print(f"[X] Error: {error} (no budget left to retry)")
+                self.stats.add_failure()
+                return response
+            self.stats.add_retry()
+            time.sleep(delay)
+            attempt += 1
+
+    def _get_json(self, url: str, params: Dict) -> Optional[Dict]:
+        key = entry = None
+        if self.cache:
+            key = self.cache.key_for(url, params)
+            entry = self.cache.load(key)
+            if entry and self.cache.is_fresh(entry):
+                self.last_status, self.last_cache = None, "fresh"
+                self.cache.mark_used(key)
+                self._note_body(entry["body"], entry)
+                return mls_json.loads(entry["body"])
         try:
-            response = self.session.get(url, params=self.get_default_params(), timeout=15)
+            headers = self.cache.conditional_headers(entry) if self.cache else {}
+            response = self._request(url, params, headers)
+            self.last_status = response.status_code if response is not None else None
+            self.last_cache = "off" if not self.cache else ("revalidated" if self.last_status == 304 and entry else "miss")
+            if response is None:
+                return None
+            if response.status_code == 304 and entry:
+                self.cache.touch(key)
+                self._note_body(entry["body"], entry)
+                return mls_json.loads(entry["body"])
             if response.status_code == 200:
-                return response.json()
+                body = response.content
+                digest = self._note_body(body)
+                if self.cache:
+                    if not (entry and entry.get("sha256") == digest):
+                        self.changed = True
+                    self.cache.store(key, url, body, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+                else:
+                    self.changed = True
+                return mls_json.loads(body)
             else:
                 print(f"[X] Error: HTTP {response.status_code}")
                 return None
@@ -123,7 +409,71 @@ class MLSAPIClient:
             print(f"[X] Error: {e}")
             return None
 
-    def parse_canvas(self, canvas_data: Dict) -> List[Dict]:
+    def _note_body(self, body: bytes, entry: Optional[Dict] = None) -> str:
+        digest = (entry or {}).get("sha256") or hashlib.sha256(body).hexdigest()
+        self.body_hashes.append(digest)
+        return digest
+
+    def canvas_digest(self) -> str:
+        """Content hash of the last canvas's bodies, independent of the cache and of page fetch order."""
+        return hashlib.sha256("\n".join(sorted(self.body_hashes)).encode("ascii")).hexdigest()
+
+    def get_channel_canvas(self, paginate: bool = True) -> Optional[Dict]:
+        url = f"{self.BASE_URL}/canvases/channels/{self.channel}"
+        self.changed = False
+        self.body_hashes = []
+        self.stats = TransportStats()
+        self.start_budget()
+        canvas = self._get_json(url, self.get_default_params())
+        self.canvas_status, self.canvas_cache = self.last_status, self.last_cache
+        if canvas and paginate:
+            self.expand_shelves(canvas)
+        return canvas
+
+    def fetch_shelf_pages(self, shelf: Dict) -> List[Dict]:
+        """Follow one shelf's nextToken chain and return the items of every extra page."""
+        shelf_id = shelf.get("id")
+        token = shelf.get("nextToken")
+        if not shelf_id or not token:
+            return []
+        url = f"{self.BASE_URL}/shelves/{shelf_id}"
+        items: List[Dict] = []
+        seen_tokens = set()
+        while token and token not in seen_tokens and len(seen_tokens) < self.MAX_SHELF_PAGES:
+            seen_tokens.add(token)
+            params = self.get_default_params()
+            params["nextToken"] = token
+            page = self._get_json(url, params)
+            if not page:
+                break
+            data = page.get("data", {})
+            page_shelf = data.get("shelf") or data
+            items.extend(page_shelf.get("items", []))
+            token = page_shelf.get("nextToken")
+        return items
+
+    def expand_shelves(self, canvas_data: Dict) -> int:
+        """
+        Fetch the remaining pages of every paginated shelf concurrently and append
+        them to the shelf's inline items (in place). Returns the number of items added.
+        Total time is bounded by the slowest shelf, not the sum of all shelves.
+        """
+        shelves = canvas_data.get("data", {}).get("canvas", {}).get("shelves", [])
+        paged = [s for s in shelves if s.get("id") and s.get("nextToken")]
+        if not paged:
+            return 0
+        added = 0
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(paged))) as pool:
+            futures = {pool.submit(self.fetch_shelf_pages, s): s for s in paged}
+            for fut in as_completed(futures):
+                shelf = futures[fut]
+                extra = fut.result()
+                shelf["items"] = list(shelf.get("items", [])) + extra
+                shelf.pop("nextToken", None)
+                added += len(extra)
+        return added
+
+    def parse_canvas(self, canvas_data: Dict) -> List[Match]:
         matches = []
         seen_ids = set()
         shelves = canvas_data.get("data", {}).get("canvas", {}).get("shelves", [])
@@ -140,154 +490,136 @@ class MLSAPIClient:
                         matches.append(match)
         return matches
 
-    def _parse_canvas_item(self, item: Dict) -> Optional[Dict]:
+    def _parse_canvas_item(self, item: Dict) -> Optional[Match]:
         try:
-            match = {
-                "event_id": item.get("id"),
-                "title": item.get("title"),
-                "short_title": item.get("shortTitle"),
-                "league": item.get("leagueName"),
-                "league_abbr": item.get("leagueAbbreviation"),
-                "sport": item.get("sportName"),
-                "venue": item.get("venueName"),
-                "url": item.get("url"),
-                "airing_type": item.get("airingType"),
-                "badge": item.get("badge"),
-                "event_time": item.get("eventTime"),
-                "end_time": item.get("endAirTime"),
-            }
-
-            # Images/Artwork
-            images = {}
-            if item.get("images"):
-                images["main"] = item["images"]
-            if item.get("artwork"):
-                images["artwork"] = item["artwork"]
-            if item.get("thumbnails"):
-                images["thumbnails"] = item["thumbnails"]
-            if item.get("coverArt"):
-                images["coverArt"] = item["coverArt"]
-            if item.get("previewFrame"):
-                images["previewFrame"] = item["previewFrame"]
-            if images:
-                match["images"] = images
-
-            # Teams
-            competitors = item.get("competitors", [])
-            if len(competitors) >= 2:
-                team1 = competitors[0]; team2 = competitors[1]
-                match["team1_name"] = team1.get("name"); match["team1_abbr"] = team1.get("abbreviation"); match["team1_id"] = team1.get("id")
-                match["team2_name"] = team2.get("name"); match["team2_abbr"] = team2.get("abbreviation"); match["team2_id"] = team2.get("id")
-                
-                # Team images
-                if team1.get("images") or team1.get("artwork") or team1.get("logo"):
-                    match["team1_images"] = {k: v for k, v in {
-                        "images": team1.get("images"),
-                        "artwork": team1.get("artwork"),
-                        "logo": team1.get("logo")
-                    }.items() if v}
-                if team2.get("images") or team2.get("artwork") or team2.get("logo"):
-                    match["team2_images"] = {k: v for k, v in {
-                        "images": team2.get("images"),
-                        "artwork": team2.get("artwork"),
-                        "logo": team2.get("logo")
-                    }.items() if v}
-
-            # Playables
-            playables = item.get("playables", [])
-            if playables:
-                p = playables[0]
-                match["playable_id"] = p.get("id")
-                match["playable_type"] = p.get("type")
-                
-                # Playable images - including the special contentImage composite
-                playable_imgs = {}
-                if p.get("images"):
-                    playable_imgs["images"] = p["images"]
-                if p.get("artwork"):
-                    playable_imgs["artwork"] = p["artwork"]
-                
-                # Extract canonicalMetadata.images.contentImage.url - the composite image with team logos!
-                canonical = p.get("canonicalMetadata", {})
-                if canonical.get("images", {}).get("contentImage", {}).get("url"):
-                    playable_imgs["contentImage"] = canonical["images"]["contentImage"]["url"]
-                
-                if playable_imgs:
-                    match["playable_images"] = playable_imgs
-
-            # Deep link
-            if match["url"]:
-                match["deep_link"] = f"https://tv.apple.com{match['url']}"
-                if match.get("playable_id"):
-                    from urllib.parse import quote
-                    encoded = quote(match["playable_id"], safe="")
-                    match["deep_link_full"] = f"{match['deep_link']}?playableId={encoded}"
-
-            return match
+            return Match.from_canvas_item(item)
         except Exception as e:
             print(f"[X] Parse error: {e}")
             return None
 
-def print_match(match: Dict, index: int, SYM: Dict[str, str]):
+def add_client_args(ap: argparse.ArgumentParser) -> None:
+    """Fetch/transport/cache flags shared by every entry point that builds an MLSAPIClient."""
+    ap.add_argument("--no-paginate", action="store_true", help="Only use items inlined in the first page of each shelf")
+    ap.add_argument("--workers", type=int, default=MLSAPIClient.SHELF_WORKERS, help="Concurrent shelf page fetches")
+    ap.add_argument("--no-cache", action="store_true", help="Disable the on-disk HTTP response cache")
+    ap.add_argument("--cache-dir", default=str(OUT_DIR / '.http_cache'))
+    ap.add_argument("--cache-ttl", type=float, default=300, help="Seconds a cached response is reused without revalidating")
+    ap.add_argument("--cache-max-mb", type=float, default=64, help="Size cap for the response cache (LRU eviction)")
+    ap.add_argument("--retries", type=int, default=MLSAPIClient.MAX_RETRIES, help="Retries per request on errors/retryable statuses")
+    ap.add_argument("--connect-timeout", type=float, default=MLSAPIClient.CONNECT_TIMEOUT)
+    ap.add_argument("--read-timeout", type=float, default=MLSAPIClient.READ_TIMEOUT)
+    ap.add_argument("--budget", type=float, default=MLSAPIClient.RUN_BUDGET, help="Total seconds allowed for all requests (0 = unlimited)")
+    ap.add_argument("--base-url", default=os.environ.get("MLS_API_BASE_URL") or MLSAPIClient.BASE_URL,
+                    help="API root (point at a local `mls_mock.py serve` to run offline)")
+    ap.add_argument("--record", default=os.environ.get("MLS_RECORD_DIR") or None, metavar="DIR",
+                    help="Save every response (status, headers, body) as a fixture in DIR (see mls_mock.py)")
+    ap.add_argument("--replay", default=os.environ.get("MLS_REPLAY_DIR") or None, metavar="DIR",
+                    help="Answer every request from the fixtures in DIR, without network access")
+
+def client_from_args(args: argparse.Namespace, channels: int = 1) -> MLSAPIClient:
+    """`channels` sizes the shared connection pool for that many concurrent canvases (see for_channel)."""
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache(Path(args.cache_dir), ttl=args.cache_ttl, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    client = MLSAPIClient(max_workers=args.workers, cache=cache, max_retries=args.retries,
+                          connect_timeout=args.connect_timeout, read_timeout=args.read_timeout,
+                          budget=args.budget, pool_size=args.workers * max(1, channels), base_url=args.base_url)
+    if args.record or args.replay:
+        import mls_mock
+        mls_mock.install(client, record=args.record, replay=args.replay)
+    return client
+
+def print_transport_summary(client: MLSAPIClient, SYM: Dict[str, str]) -> None:
+    ts = client.stats.summary()
+    print(f"{SYM['info']} Transport: {ts['requests']} requests, {ts['retries']} retries, {ts['failures']} failures, "
+          f"{ts['bytes']} bytes, latency p50={ts['latency_p50_s']}s p95={ts['latency_p95_s']}s max={ts['latency_max_s']}s")
+
+def sort_matches(matches: List[Match]) -> List[Match]:
+    """Sort by kickoff; events without a usable time go last."""
+    return sorted(matches, key=lambda m: (m.start_dt is None, m.start_dt or datetime.min))
+
+def print_match(match: Match, index: int, SYM: Dict[str, str]):
     bar = "=" * 70
     print(f"\n{bar}\nMatch #{index}\n{bar}")
 
-    title = match.get("title") or match.get("short_title")
+    title = match.title or match.short_title
     if title:
         print(f"{SYM['star']} {title}")
 
-    team1_name = match.get("team1_name"); team1_abbr = match.get("team1_abbr")
-    team2_name = match.get("team2_name"); team2_abbr = match.get("team2_abbr")
+    team1_name = match.team1_name; team1_abbr = match.team1_abbr
+    team2_name = match.team2_name; team2_abbr = match.team2_abbr
     if team1_name and team2_name:
         print(f"   {team1_name} ({team1_abbr}) vs {team2_name} ({team2_abbr})")
 
-    league = match.get("league") or match.get("league_abbr")
-    sport = match.get("sport")
+    league = match.league or match.league_abbr
+    sport = match.sport
     if league:
         print(f"{SYM['trophy']}  {league}" + (f" - {sport}" if sport else ""))
 
-    if match.get("venue"):
-        print(f"{SYM['pin']} {match['venue']}")
+    if match.venue:
+        print(f"{SYM['pin']} {match.venue}")
 
-    badge = match.get("badge")
-    airing_type = match.get("airing_type")
-    event_time = match.get("event_time")
+    badge = match.badge
+    airing_type = match.airing_type
+    event_time = match.event_time
 
     if badge:
         lab = f"{badge}" + (f" ({airing_type})" if airing_type else "")
         print(lab)
 
     if event_time:
-        try:
-            dt = datetime.fromisoformat(event_time.replace("Z", "+00:00"))
+        dt = match.start_dt
+        if dt:
             print(f"{SYM['time']} {dt.strftime('%A, %B %d, %Y at %I:%M %p %Z')}")
-        except Exception:
+        else:
             print(f"{SYM['time']} {event_time}")
 
-    print(f"\n{SYM['id']} Event ID: {match.get('event_id')}")
-    if match.get("playable_id"):
-        playable = match["playable_id"]
+    print(f"\n{SYM['id']} Event ID: {match.event_id}")
+    if match.playable_id:
+        playable = match.playable_id
         print(f"{SYM['film']} {playable[:60]}{'...' if len(playable) > 60 else ''}")
 
     # Display images if available
-    if match.get("images"):
-        print(f"\n🖼️  Images available: {', '.join(match['images'].keys())}")
-    if match.get("team1_images"):
-        print(f"   Team 1 images: {', '.join(match['team1_images'].keys())}")
-    if match.get("team2_images"):
-        print(f"   Team 2 images: {', '.join(match['team2_images'].keys())}")
-    if match.get("playable_images"):
-        print(f"   Playable images: {', '.join(match['playable_images'].keys())}")
-
-    if match.get("deep_link"):
-        link = match["deep_link"]
+    if match.images:
+        print(f"\n🖼️  Images available: {', '.join(match.images.keys())}")
+    if match.team1_images:
+        print(f"   Team 1 images: {', '.join(match.team1_images.keys())}")
+    if match.team2_images:
+        print(f"   Team 2 images: {', '.join(match.team2_images.keys())}")
+    if match.playable_images:
+        print(f"   Playable images: {', '.join(match.playable_images.keys())}")
+
+    if match.deep_link:
+        link = match.deep_link
         print(f"\n{SYM['link']} {link[:100]}{'...' if len(link) > 100 else ''}")
 
+SCRAPE_STATE = OUT_DIR / '.scrape_state.json'
+
+def _scrape_state_matches(canvas_sha: str) -> bool:
+    """True when out/mls_schedule.json is intact and was written from a canvas with this digest."""
+    try:
+        state = json.loads(SCRAPE_STATE.read_text(encoding="utf-8"))
+        schedule = (OUT_DIR / 'mls_schedule.json').read_bytes()
+    except (OSError, ValueError):
+        return False
+    return state.get("canvas_sha256") == canvas_sha and state.get("schedule_sha256") == hashlib.sha256(schedule).hexdigest()
+
+def _save_scrape_state(canvas_sha: str, schedule: bytes) -> None:
+    state = {"canvas_sha256": canvas_sha, "schedule_sha256": hashlib.sha256(schedule).hexdigest()}
+    SCRAPE_STATE.write_text(json.dumps(state), encoding="utf-8")
+
 def main():
     ap = argparse.ArgumentParser(description="MLS canvas scraper with clean UTF‑8/ASCII output")
     ap.add_argument("--no-emoji", action="store_true", help="Use ASCII-only symbols")
+    add_client_args(ap)
+    ap.add_argument("--force", action="store_true", help="Re-parse and re-write outputs even if upstream is unchanged")
+    ap.add_argument("--event-store", help="Also upsert the parsed matches into this SQLite event store (mls_store.py)")
+    ap.add_argument("--pretty-json", action="store_true", help="Indent raw_canvas.json / mls_schedule.json (default compact)")
+    ap.add_argument("--no-archive", action="store_true", help="Do not add the canvas to the snapshot archive (mls_archive.py)")
     args = ap.parse_args()
 
+    force_utf8_stdout()
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
     SYM = _symbols(use_emoji=not args.no_emoji)
 
     bar = "=" * 70
@@ -295,18 +627,32 @@ def main():
     print(f" {SYM['trophy']} Apple TV MLS Schedule Scraper {SYM['trophy']}")
     print(bar); print()
 
-    client = MLSAPIClient()
+    client = client_from_args(args)
 
     print("Fetching MLS channel data...")
-    canvas = client.get_channel_canvas()
+    canvas = client.get_channel_canvas(paginate=not args.no_paginate)
+    print_transport_summary(client, SYM)
     if not canvas:
         print(f"{SYM['err']} Failed to fetch data"); return
     print(f"{SYM['done']} Success!\n")
 
+    # Skip only when the schedule on disk is the one this scraper wrote from this exact canvas
+    # (the HTTP cache is shared with generate_mls, and a run may have died before writing it)
+    canvas_sha = client.canvas_digest()
+    if not args.force and _scrape_state_matches(canvas_sha):
+        print(f"{SYM['info']} Upstream canvas unchanged; keeping existing out/mls_schedule.json")
+        return
+
     print("Saving raw canvas...")
-    with open(OUT_DIR / 'raw_canvas.json', "w", encoding="utf-8") as f:
-        json.dump(canvas, f, indent=2, ensure_ascii=False)
-    print(f"{SYM['done']} Saved: out/raw_canvas.json\n")
+    data, secs = mls_json.timed_dumps(canvas, args.pretty_json)
+    (OUT_DIR / 'raw_canvas.json').write_bytes(data)
+    print(f"{SYM['done']} Saved: out/raw_canvas.json ({len(data) / 1024:.1f} KiB, {secs * 1000:.1f} ms, {mls_json.BACKEND})")
+    if not args.no_archive:
+        archive = archive_from_env(OUT_DIR)
+        snap = archive.put(canvas)
+        archive.prune()
+        print(f"{SYM['done']} Snapshot {snap.sha256[:12]} {'stored' if snap.new else 'already archived'}: {archive.path(snap)}")
+    print()
 
     print("Parsing matches from canvas...")
     matches = client.parse_canvas(canvas)
@@ -317,44 +663,46 @@ def main():
 
     print("="*70); print(" MATCHES"); print("="*70)
 
-    def safe_sort(m):
-        t = _normalize_event_time(m.get("event_time"))
-        return t or "9999-12-31T23:59:59Z"
-
-    sorted_matches = sorted(matches, key=safe_sort)
+    sorted_matches = sort_matches(matches)
     for i, match in enumerate(sorted_matches, 1):
         print_match(match, i, SYM)
 
     print("\n" + "="*70); print("Saving data..."); print("="*70)
-    with open(OUT_DIR / 'mls_schedule.json', "w", encoding="utf-8") as f:
-        json.dump(sorted_matches, f, indent=2, ensure_ascii=False)
-    print(f"{SYM['done']} Saved: out/mls_schedule.json")
+    data, secs = mls_json.timed_dumps([m.to_dict() for m in sorted_matches], args.pretty_json)
+    (OUT_DIR / 'mls_schedule.json').write_bytes(data)
+    _save_scrape_state(canvas_sha, data)
+    print(f"{SYM['done']} Saved: out/mls_schedule.json ({len(data) / 1024:.1f} KiB, {secs * 1000:.1f} ms, {mls_json.BACKEND})")
+    if args.event_store:
+        from mls_store import EventStore
+        with EventStore(Path(args.event_store)) as store:
+            c = store.upsert("mls", sorted_matches)
+        print(f"{SYM['done']} Event store {args.event_store}: {c['inserted']} new, {c['updated']} changed, {c['unchanged']} unchanged")
 
     print("\n" + "="*70); print(" RAW CANVAS SUMMARY"); print("="*70)
     print(f"{SYM['book']} Total matches: {len(matches)}")
 
-    live = [m for m in matches if (m.get("airing_type") or "").lower() == "live"]
+    live = [m for m in matches if (m.airing_type or "").lower() == "live"]
     if live:
         print(f"{SYM['live']} Live: {len(live)}")
 
-    upcoming = [m for m in matches if m.get("airing_type") in ["Upcoming", "Future"]]
+    upcoming = [m for m in matches if m.airing_type in ["Upcoming", "Future"]]
     if upcoming:
         print(f"{SYM['time']} Upcoming: {len(upcoming)}")
 
     teams = set()
     for m in matches:
-        if m.get("team1_name"): teams.add(m["team1_name"])
-        if m.get("team2_name"): teams.add(m["team2_name"])
+        if m.team1_name: teams.add(m.team1_name)
+        if m.team2_name: teams.add(m.team2_name)
     print(f"{SYM['soccer']} Teams: {len(teams)}")
 
-    leagues = set(m.get("league") for m in matches if m.get("league"))
+    leagues = set(m.league for m in matches if m.league)
     if leagues:
         print(f"{SYM['star']} Leagues: {', '.join(leagues)}")
 
     # Image statistics
-    matches_with_images = sum(1 for m in matches if m.get("images"))
-    matches_with_team_images = sum(1 for m in matches if m.get("team1_images") or m.get("team2_images"))
-    matches_with_playable_images = sum(1 for m in matches if m.get("playable_images"))
+    matches_with_images = sum(1 for m in matches if m.images)
+    matches_with_team_images = sum(1 for m in matches if m.team1_images or m.team2_images)
+    matches_with_playable_images = sum(1 for m in matches if m.playable_images)
     
     print(f"\n🖼️  Images:")
     print(f"   Matches with event images: {matches_with_images}/{len(matches)}")
@@ -32,16 +32,9 @@ fi
 OUTPUT_DIR="${OUTPUT_DIR:-$REPO_ROOT/out}"
 mkdir -p "$OUTPUT_DIR"
 
-# Run pipeline with unbuffered py output
-"$PY_BIN" -u scrape_mls_schedule.py
-"$PY_BIN" -u export_mls_outputs.py
-
-# Ensure expected artifacts exist in repo out/, then copy into OUTPUT_DIR (no-op if same)
-for f in guide.xml mls.m3u mls_schedule.json raw_canvas.json; do
-  if [ -f "out/$f" ] && [ "$OUTPUT_DIR" != "$REPO_ROOT/out" ]; then
-    cp -f "out/$f" "$OUTPUT_DIR/$f"
-  fi
-done
+# Run pipeline (scrape + export in one process) with unbuffered py output,
+# writing straight into OUTPUT_DIR; JSON copies are kept for /out consumers
+"$PY_BIN" -u generate_mls.py --out-dir "$OUTPUT_DIR" --write-json
 
 echo "✅ Artifacts in $OUTPUT_DIR:"
 ls -1 "$OUTPUT_DIR" || true
@@ -0,0 +1,58 @@
+#!/usr/bin/env bash
+# End-to-end smoke test, offline: generate_mls.py against the local mock API
+# (mls_mock.py) with shelf pagination and artwork, then again unchanged, then
+# from the fixtures recorded on the first run.
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+PY_BIN="${PY_BIN:-python3}"
+TMP="$(mktemp -d)"
+MOCK_PID=""
+cleanup() {
+  [ -n "$MOCK_PID" ] && kill "$MOCK_PID" 2>/dev/null || true
+  rm -rf "$TMP"
+}
+trap cleanup EXIT
+fail() { echo "❌ $*" >&2; [ -f "$TMP/run.log" ] && tail -n 30 "$TMP/run.log" >&2; exit 1; }
+
+OUT="$TMP/out"
+ART_URL="http://smoke.invalid/art"
+
+"$PY_BIN" -u mls_mock.py serve --synthetic 300 --page-size 20 --art --port 0 > "$TMP/mock.log" 2>&1 &
+MOCK_PID=$!
+BASE_URL=""
+for _ in $(seq 50); do
+  BASE_URL="$(grep -o 'http://[0-9.]*:[0-9]*' "$TMP/mock.log" | head -n 1 || true)"
+  [ -n "$BASE_URL" ] && break
+  sleep 0.1
+done
+[ -n "$BASE_URL" ] || { cat "$TMP/mock.log" >&2; fail "mock server did not start"; }
+echo "🧪 mock API at $BASE_URL"
+
+generate() {
+  "$PY_BIN" -u generate_mls.py --out-dir "$OUT" --no-cache --no-emoji --art-base-url "$ART_URL" "$@" > "$TMP/run.log" 2>&1 \
+    || fail "generate_mls.py $* exited non-zero"
+}
+
+# 1) fresh run: every shelf page fetched, a release published, posters mirrored
+generate --base-url "$BASE_URL" --record "$TMP/fixtures"
+grep -q "Published release" "$TMP/run.log" || fail "first run published no release"
+OUTPUT_DIR="$OUT" scripts/validate.sh
+pages="$("$PY_BIN" -c 'import json, sys, urllib.request
+stats = json.load(urllib.request.urlopen(sys.argv[1] + "/_mock/stats"))
+print(sum(n for p, n in stats["paths"].items() if p.startswith("/shelves/")))' "$BASE_URL")"
+[ "$pages" -gt 0 ] || fail "no shelf pages were requested"
+ls "$OUT"/art/*.jpg > /dev/null 2>&1 || fail "no artwork mirrored into $OUT/art"
+grep -q "$ART_URL/" "$OUT/mls.m3u" || fail "M3U logos do not point at $ART_URL"
+echo "✅ first run: $pages shelf pages, $(ls "$OUT"/art/*.jpg | wc -l) posters mirrored"
+
+# 2) same upstream: nothing to publish
+generate --base-url "$BASE_URL"
+grep -q "no new release" "$TMP/run.log" || fail "unchanged second run published a release"
+echo "✅ second run: unchanged"
+
+# 3) replay the recorded fixtures without the server
+kill "$MOCK_PID"; wait "$MOCK_PID" 2>/dev/null || true; MOCK_PID=""
+generate --replay "$TMP/fixtures"
+grep -q "no new release" "$TMP/run.log" || fail "replayed run differs from the recorded one"
+echo "✅ replay: matches the recorded run"